@@ -0,0 +1,133 @@
+"""
+Async ASGI variant of the observation read routes.
+
+Serves GET /api/observations/<id> and GET /api/observations/filter from
+Starlette on an async SQLAlchemy engine (aiosqlite locally), so one process
+can hold thousands of concurrent connections instead of one per worker thread.
+It shares the models and the filter logic with the Flask app; writes stay on
+the WSGI deployment.
+
+Run with: uvicorn asgi:app --host 0.0.0.0 --port 5001
+"""
+import os
+import contextlib
+import jwt
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from werkzeug.datastructures import MultiDict
+from app.db import DATABASE_URL, Base, engine
+from app.routes.filtering import filter_records
+import app.partitions as partitions
+import app.rollups as rollups
+import app.search as search
+import app.changes as changes
+import app.ingest as ingest
+import app.migrations as migrations
+import app.statement_cache as statement_cache
+import app.entitlements as entitlements
+from app.revocation import revocations
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def async_database_url(url):
+    """Maps the sync DATABASE_URL onto its async driver."""
+    scheme, rest = url.split("://", 1)
+    base = scheme.split("+", 1)[0]
+    return f"{ASYNC_DRIVERS.get(base, scheme)}://{rest}"
+
+def _jwt_claims(request):
+    """
+    Validates the bearer token the way flask_jwt_extended does for access
+    tokens. Returns (claims, None) or (None, error response).
+    """
+    header = request.headers.get("Authorization", "")
+    if not header.startswith("Bearer "):
+        return None, JSONResponse({"msg": "Missing Authorization Header"}, status_code=401)
+    try:
+        claims = jwt.decode(
+            header[len("Bearer "):],
+            os.getenv("JWT_SECRET_KEY", "super-secret-key-change-me"),
+            algorithms=["HS256"],
+        )
+    except jwt.ExpiredSignatureError:
+        return None, JSONResponse({"msg": "Token has expired"}, status_code=401)
+    except jwt.InvalidTokenError as e:
+        return None, JSONResponse({"msg": str(e)}, status_code=422)
+    if claims.get("type") != "access":
+        return None, JSONResponse({"msg": "Only non-refresh tokens are allowed"}, status_code=422)
+    return claims, None
+
+def _is_revoked(session, claims):
+    """Runs through AsyncSession.run_sync, so a sync or bloom-hit lookup stays off the event loop."""
+    return revocations.is_revoked(claims.get("jti"), session)
+
+def get_asgi_app(database_url=None):
+    async_engine = create_async_engine(async_database_url(database_url or DATABASE_URL))
+    statement_cache.install(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def get_obs(request):
+        claims, error = _jwt_claims(request)
+        if error:
+            return error
+        current_user = claims["sub"]
+        obs_id = request.path_params["obs_id"]
+
+        async with AsyncSessionLocal() as db:
+            if await db.run_sync(_is_revoked, claims):
+                return JSONResponse({"msg": "Token has been revoked"}, status_code=401)
+            obs = await db.run_sync(partitions.get, obs_id)
+            if not obs:
+                return JSONResponse({"error": "Not found"}, status_code=404)
+
+            # Access control: the token's entitlement claims, or a subscription lookup
+            if obs.product_id:
+                allowed = await db.run_sync(entitlements.allows, claims, current_user, obs.product_id)
+                if not allowed:
+                    return JSONResponse({"error": "Forbidden: Subscription required"}, status_code=403)
+
+            return JSONResponse(obs.to_dict())
+
+    async def filter_observations(request):
+        args = MultiDict(list(request.query_params.multi_items()))
+        try:
+            async with AsyncSessionLocal() as db:
+                output = await db.run_sync(filter_records, args)
+            return JSONResponse(output)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        except NotImplementedError as e:
+            return JSONResponse({"error": str(e)}, status_code=501)
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, status_code=500)
+
+    async def health(request):
+        return JSONResponse({"status": "ok"})
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        # Same schema as the WSGI app; creating it here keeps a standalone ASGI deploy working
+        Base.metadata.create_all(bind=engine)
+        migrations.upgrade(engine)
+        rollups.install(engine)
+        search.install(engine)
+        changes.install(engine)
+        ingest.install(engine)
+        yield
+        await async_engine.dispose()
+
+    app = Starlette(
+        routes=[
+            Route("/api/observations/filter", filter_observations, methods=["GET"]),
+            Route("/api/observations/{obs_id:int}", get_obs, methods=["GET"]),
+            Route("/health", health, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+    app.state.async_engine = async_engine
+    return app
@@ -0,0 +1,141 @@
+"""
+Observation change feed.
+
+observation_changes is an append-only log with a monotonic sequence number,
+written by triggers on every insert, update and delete of an observation
+(including partitioned tables and bulk statements). ChangeSignal wakes
+long-polling readers in this process as soon as a session that wrote
+something commits.
+"""
+import threading
+from sqlalchemy import Column, Integer, String, DateTime, event, text, inspect
+from sqlalchemy.orm import Session
+from app.db import Base
+from app.rollups import TRIGGER_DIALECTS
+from app.routes.observation import ObservationId, as_utc_naive
+
+CHANGES_TABLE = "observation_changes"
+
+class ObservationChange(Base):
+    __tablename__ = CHANGES_TABLE
+
+    seq = Column(Integer, primary_key=True)
+    observation_id = Column(ObservationId, nullable=False)
+    op = Column(String(10), nullable=False)  # insert / update / delete
+    changed_at = Column(DateTime(timezone=True))
+
+    # AUTOINCREMENT so sequence numbers are never reused
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    def to_dict(self):
+        return {
+            "seq": self.seq,
+            "observation_id": self.observation_id,
+            "op": self.op,
+            "changed_at": as_utc_naive(self.changed_at).isoformat() if self.changed_at else None,
+        }
+
+class ChangeSignal:
+    """
+    Generation counter plus condition variable. Readers take current() before
+    querying and wait(generation) afterwards, so a commit landing in between
+    is never missed.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._generation = 0
+
+    def current(self):
+        with self._condition:
+            return self._generation
+
+    def notify(self):
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+    def wait(self, generation, timeout):
+        """Blocks until a newer generation or the timeout. Returns True if woken by a change."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._generation != generation, timeout)
+
+signal = ChangeSignal()
+
+def _log(row, op):
+    return (
+        f"INSERT INTO {CHANGES_TABLE} (observation_id, op, changed_at) "
+        f"VALUES ({row}.id, '{op}', CURRENT_TIMESTAMP);"
+    )
+
+CHANGES_FUNCTION = "observation_changes_trigger"
+
+def _postgresql_functions():
+    # Sequence numbers are drawn as the row is logged. Logging at commit under
+    # one transaction-level lock makes them become visible in order, so a
+    # reader that has seen seq N never misses a lower one later. Writers only
+    # queue behind each other for the append itself, not for their whole
+    # transaction.
+    return [
+        f"CREATE OR REPLACE FUNCTION {CHANGES_FUNCTION}() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN "
+        f"PERFORM pg_advisory_xact_lock(hashtext('{CHANGES_TABLE}')); "
+        f"IF TG_OP = 'INSERT' THEN {_log('NEW', 'insert')} "
+        f"ELSIF TG_OP = 'UPDATE' THEN {_log('NEW', 'update')} "
+        f"ELSE {_log('OLD', 'delete')} END IF; "
+        f"RETURN NULL; END $$",
+        # Earlier versions held the lock from the first write through a statement trigger
+        "DROP FUNCTION IF EXISTS observation_changes_lock() CASCADE",
+    ]
+
+def trigger_ddl(table_name, dialect_name="sqlite"):
+    """Statements creating the triggers that log changes to `table_name`."""
+    if dialect_name == "postgresql":
+        # Constraint triggers cannot be replaced in place
+        return _postgresql_functions() + [
+            f"DROP TRIGGER IF EXISTS {table_name}_changes_{op} ON {table_name}" for op in ("insert", "update", "delete")
+        ] + [
+            f"CREATE CONSTRAINT TRIGGER {table_name}_changes_{op} AFTER {op.upper()} ON {table_name} "
+            f"DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION {CHANGES_FUNCTION}()"
+            for op in ("insert", "update", "delete")
+        ]
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table_name}_changes_insert AFTER INSERT ON {table_name} "
+        f"BEGIN {_log('NEW', 'insert')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table_name}_changes_update AFTER UPDATE ON {table_name} "
+        f"BEGIN {_log('NEW', 'update')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table_name}_changes_delete AFTER DELETE ON {table_name} "
+        f"BEGIN {_log('OLD', 'delete')} END",
+    ]
+
+def install_triggers(conn, table_name):
+    for statement in trigger_ddl(table_name, conn.dialect.name):
+        conn.execute(text(statement))
+
+def install(engine):
+    import app.partitions as partitions
+    if engine.dialect.name not in TRIGGER_DIALECTS:
+        return
+    with engine.begin() as conn:
+        for table_name in inspect(conn).get_table_names():
+            if table_name == "observations" or partitions.is_partition_table(table_name):
+                install_triggers(conn, table_name)
+
+# Any session that flushed or ran a DML statement wakes the long-pollers on commit
+
+@event.listens_for(Session, "after_flush")
+def _mark_flush(session, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+@event.listens_for(Session, "after_commit")
+def _notify_on_commit(session):
+    if session.info.pop("wrote", False):
+        signal.notify()
+
+@event.listens_for(Session, "after_rollback")
+def _clear_on_rollback(session):
+    session.info.pop("wrote", None)
@@ -0,0 +1,66 @@
+"""
+Product entitlements carried in access tokens.
+
+Access tokens embed the caller's subscribed product ids ("ent") and the
+user's token version ("tv") when they are issued, so get_obs can authorize
+from the token alone. Changing a user's subscriptions bumps
+users.token_version: tokens with an older tv no longer have their ent claim
+trusted and fall back to a Subscription lookup until the client refreshes.
+The current version per identity is cached in-process for
+USER_CACHE_TTL_SECONDS, so the steady state needs no database access.
+"""
+import os
+from sqlalchemy import select, update, bindparam
+from app.routes.observation import User, Subscription, normalize_email
+from app.user_cache import UserCache
+
+ENTITLEMENTS_CLAIM = "ent"
+VERSION_CLAIM = "tv"
+
+versions = UserCache(
+    ttl_seconds=float(os.getenv("USER_CACHE_TTL_SECONDS", "30")),
+    max_entries=int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000")),
+)
+
+# Built once so every request reuses the compiled statements
+ENTITLED_PRODUCTS = select(Subscription.product_id).where(Subscription.user_id == bindparam("identity")).distinct()
+TOKEN_VERSION = select(User.token_version).where(User.email_normalized == bindparam("email"))
+SUBSCRIPTION_EXISTS = select(Subscription.id).where(
+    Subscription.user_id == bindparam("identity"),
+    Subscription.product_id == bindparam("product_id"),
+).limit(1)
+
+def entitled_products(db, identity):
+    return sorted(db.scalars(ENTITLED_PRODUCTS, {"identity": identity}))
+
+def current_version(db, identity):
+    """users.token_version for `identity` (0 if there is no such user), cached."""
+    version = versions.get(identity)
+    if version is None:
+        version = db.scalar(TOKEN_VERSION, {"email": normalize_email(identity)}) or 0
+        versions.put(identity, version)
+    return version
+
+def claims_for(db, identity):
+    """additional_claims for create_access_token."""
+    return {
+        ENTITLEMENTS_CLAIM: entitled_products(db, identity),
+        VERSION_CLAIM: current_version(db, identity),
+    }
+
+def bump_version(db, identity):
+    """
+    Marks the entitlement claims in already issued tokens as stale. The caller
+    commits, then calls versions.invalidate(identity).
+    """
+    db.execute(update(User).where(User.email_normalized == normalize_email(identity)).values(token_version=User.token_version + 1))
+
+def has_subscription(db, identity, product_id):
+    return db.scalar(SUBSCRIPTION_EXISTS, {"identity": identity, "product_id": product_id}) is not None
+
+def allows(db, claims, identity, product_id):
+    """True if `identity` may read `product_id`: from the token when it is current, else from the database."""
+    entitled = claims.get(ENTITLEMENTS_CLAIM)
+    if entitled is not None and product_id in entitled and claims.get(VERSION_CLAIM) == current_version(db, identity):
+        return True
+    return has_subscription(db, identity, product_id)
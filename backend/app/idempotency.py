@@ -0,0 +1,133 @@
+"""
+Idempotency-Key support for POST endpoints.
+
+The first request with a given key runs normally and its response is kept in
+a bounded in-process store (LRU capped at IDEMPOTENCY_MAX_KEYS, entries expire
+after IDEMPOTENCY_TTL_SECONDS). A retry with the same key and body gets the
+stored response back without running the view. A concurrent duplicate waits
+for the first request to finish and then gets its response. Reusing a key with
+a different body is rejected with 422.
+"""
+import functools
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import request, jsonify, make_response, Response
+
+HEADER = "Idempotency-Key"
+IN_FLIGHT_WAIT_SECONDS = 10
+
+class _Entry:
+    __slots__ = ("fingerprint", "created", "done", "status", "body", "mimetype")
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.created = time.monotonic()
+        self.done = threading.Event()
+        self.status = None
+        self.body = None
+        self.mimetype = None
+
+class IdempotencyStore:
+    def __init__(self, max_entries=10000, ttl_seconds=86400):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        # Insertion order == age order, so expired entries sit at the front
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry.created < self.ttl_seconds:
+                break
+            del self._entries[key]
+        # Over capacity, the oldest finished entries go first. Running ones are
+        # skipped, not waited on: there are at most as many as concurrent requests.
+        excess = len(self._entries) - self.max_entries + 1
+        if excess <= 0:
+            return
+        finished = []
+        for key, entry in self._entries.items():
+            if entry.done.is_set():
+                finished.append(key)
+                if len(finished) == excess:
+                    break
+        for key in finished:
+            del self._entries[key]
+
+    def begin(self, key, fingerprint):
+        """
+        Returns (entry, is_new). is_new means the caller owns the key and must
+        call complete() or abandon().
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._evict(now)
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.created < self.ttl_seconds:
+                return entry, False
+            entry = _Entry(fingerprint)
+            self._entries[key] = entry
+            return entry, True
+
+    def complete(self, entry, status, body, mimetype):
+        entry.status, entry.body, entry.mimetype = status, body, mimetype
+        entry.done.set()
+
+    def abandon(self, key, entry):
+        """Forgets a failed attempt so the client can retry with the same key."""
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        entry.done.set()
+
+    def __len__(self):
+        return len(self._entries)
+
+store = IdempotencyStore(
+    max_entries=int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000")),
+    ttl_seconds=int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400")),
+)
+
+def _replay(entry):
+    response = Response(entry.body, status=entry.status, mimetype=entry.mimetype)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+def idempotent(view):
+    """Decorator honouring the Idempotency-Key header on a view."""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+
+        scoped_key = f"{request.method} {request.path} {key}"
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+        entry, is_new = store.begin(scoped_key, fingerprint)
+
+        if not is_new:
+            if entry.fingerprint != fingerprint:
+                return jsonify({"error": "Idempotency-Key reused with a different request body"}), 422
+            if not entry.done.wait(IN_FLIGHT_WAIT_SECONDS):
+                return jsonify({"error": "A request with this Idempotency-Key is still in progress"}), 409
+            if entry.status is None:
+                return jsonify({"error": "The original request failed; retry it"}), 409
+            return _replay(entry)
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            store.abandon(scoped_key, entry)
+            raise
+        if response.status_code >= 500:
+            store.abandon(scoped_key, entry)
+        else:
+            store.complete(entry, response.status_code, response.get_data(), response.mimetype)
+        return response
+
+    return wrapper
@@ -0,0 +1,215 @@
+"""
+Observation ingest with optional natural-key deduplication.
+
+The same scene (satellite_id + timestamp + coordinates) is often re-sent by
+different ground stations. With OBSERVATION_DEDUP=true a unique index on that
+natural key is created on `observations` and on every monthly partition, and
+ingest becomes INSERT ... ON CONFLICT DO UPDATE ... RETURNING id: a re-sent
+scene updates the stored row and hands back its id in the same round trip,
+without reading first. Fields the new copy leaves empty keep their stored
+values. The table triggers keep rollups, the change feed and search in step on
+both the insert and the update branch.
+
+Rows missing any part of the key (e.g. no coordinates) are never treated as
+duplicates, since NULLs are distinct in a unique index. A table whose index
+could not be built because it already holds duplicates gets plain inserts
+until dedupe_observations.py has been run and the app restarted.
+"""
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+from sqlalchemy import func, text, inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.exc import IntegrityError
+from app.routes.observation import ObservationRecord, ObservationIndex, parse_spectral_indices, as_utc_naive
+import app.partitions as partitions
+
+NATURAL_KEY = ("satellite_id", "timestamp", "coordinates")
+
+# Fields a client may send when creating an observation
+INSERTABLE = ("timestamp", "timezone", "coordinates", "satellite_id", "spectral_indices", "notes", "product_id")
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+UPSERT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+def dedup_enabled():
+    return os.getenv("OBSERVATION_DEDUP", "").lower() in ("1", "true", "yes")
+
+def index_name(table_name):
+    return f"ux_{table_name}_natural_key"
+
+# Tables known to have the natural-key index; an index, once built, stays
+_indexed_tables = set()
+
+def install_index(conn, table_name):
+    conn.execute(text(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name(table_name)} "
+        f"ON {table_name} ({', '.join(NATURAL_KEY)})"
+    ))
+    _indexed_tables.add(table_name)
+
+def has_index(conn, table_name):
+    """Whether ON CONFLICT on the natural key can target `table_name`."""
+    if table_name not in _indexed_tables:
+        if not any(i["name"] == index_name(table_name) for i in inspect(conn).get_indexes(table_name)):
+            return False
+        _indexed_tables.add(table_name)
+    return True
+
+def collapse_duplicates(conn, table_name):
+    """
+    Deletes every row that repeats the natural key of an older row (lowest id
+    wins), so the unique index can be built. Returns the number removed.
+    """
+    duplicates = (
+        f"SELECT id FROM {table_name} WHERE {' AND '.join(f'{c} IS NOT NULL' for c in NATURAL_KEY)} "
+        f"AND id NOT IN (SELECT MIN(id) FROM {table_name} GROUP BY {', '.join(NATURAL_KEY)})"
+    )
+    conn.execute(text(f"DELETE FROM {ObservationIndex.__tablename__} WHERE observation_id IN ({duplicates})"))
+    return conn.execute(text(f"DELETE FROM {table_name} WHERE id IN ({duplicates})")).rowcount
+
+def observation_tables(conn):
+    names = inspect(conn).get_table_names()
+    return ["observations"] + [n for n in names if partitions.is_partition_table(n)]
+
+def install(engine):
+    """Creates the natural-key indexes on startup when dedup is enabled."""
+    if not dedup_enabled() or engine.dialect.name not in UPSERT_INSERTS:
+        return
+    with engine.connect() as conn:
+        table_names = observation_tables(conn)
+    for table_name in table_names:
+        try:
+            with engine.begin() as conn:
+                install_index(conn, table_name)
+        except IntegrityError:
+            logging.getLogger(__name__).error(
+                "%s already holds duplicate scenes, so it gets plain inserts; run dedupe_observations.py "
+                "to collapse them before natural-key deduplication can be enforced", table_name
+            )
+
+def parse_timestamp(value):
+    """
+    An ISO 8601 string (or datetime) as a datetime, converted to UTC when it
+    carries an offset. Raises ValueError for anything else.
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError("'timestamp' must be an ISO 8601 string.")
+    if not isinstance(value, datetime):
+        raise ValueError("'timestamp' must be an ISO 8601 string.")
+    if value.tzinfo is not None:
+        # SQLite keeps only the wall-clock time, so store every timestamp in UTC
+        value = value.astimezone(timezone.utc)
+    return value
+
+def normalize(data):
+    """
+    Validates one incoming observation and returns a row ready for a Core
+    insert. Raises ValueError for unknown fields or a malformed timestamp.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("An observation must be an object.")
+    unknown = sorted(set(data) - set(INSERTABLE))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    row = dict(data)
+
+    if row.get("timestamp"):
+        row["timestamp"] = parse_timestamp(row["timestamp"])
+    else:
+        row["timestamp"] = datetime.now(timezone.utc)
+    if isinstance(row.get("spectral_indices"), dict):
+        row["spectral_indices"] = ",".join(
+            f"{band}={v}" for band, v in parse_spectral_indices(row["spectral_indices"]).items()
+        )
+    return row
+
+def _upsert_statement(table, rows, dialect_name):
+    """
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING id plus the natural key.
+    RETURNING order is not guaranteed for it (and SQLAlchemy cannot sort it on
+    PostgreSQL), so callers match ids back to rows by natural key.
+    """
+    statement = UPSERT_INSERTS[dialect_name](table)
+    updatable = {c for row in rows for c in row} - set(NATURAL_KEY)
+    # A no-op assignment still lets RETURNING report the existing row's id
+    set_ = {c: func.coalesce(statement.excluded[c], table.c[c]) for c in updatable} or {"id": table.c.id}
+    return statement.on_conflict_do_update(
+        index_elements=[table.c[c] for c in NATURAL_KEY], set_=set_
+    ).returning(table.c.id, *(table.c[c] for c in NATURAL_KEY))
+
+def _natural_key(row):
+    return tuple(as_utc_naive(v) if isinstance(v, datetime) else v for v in (row.get(c) for c in NATURAL_KEY))
+
+def _group_repeats(rows, positions):
+    """
+    Splits positions into rows sharing a full natural key, grouped by key in
+    first-seen order, and single rows missing part of it, which never conflict.
+    PostgreSQL refuses to upsert one row twice in a statement, so each scene
+    is sent once.
+    """
+    keyed, loose = {}, []
+    for position in positions:
+        natural = _natural_key(rows[position])
+        if None in natural:
+            loose.append([position])
+        else:
+            keyed.setdefault(natural, []).append(position)
+    return keyed, loose
+
+def _merge(rows, group, columns):
+    """One row for a group of repeats: the last non-null value of each column, as the upsert would keep."""
+    return {
+        c: next((rows[p][c] for p in reversed(group) if rows[p].get(c) is not None), None)
+        for c in columns
+    }
+
+def write_rows(db, rows):
+    """
+    Inserts (or, with dedup, upserts) normalized rows with one statement per
+    target table and returns their ids in input order.
+    """
+    by_table = defaultdict(list)
+    for position, row in enumerate(rows):
+        key = partitions.partition_key(row["timestamp"]) if partitions.enabled() else None
+        by_table[key].append(position)
+
+    # Every row in one executemany needs the same columns
+    columns = {c for row in rows for c in row}
+    dialect_name = db.get_bind().dialect.name
+    upsert = dedup_enabled() and dialect_name in UPSERT_INSERTS
+    ids = [None] * len(rows)
+    for key, positions in by_table.items():
+        table = ObservationRecord.__table__ if key is None else partitions.ensure_partition(db, key)
+        if upsert and has_index(db.connection(), table.name):
+            keyed, loose = _group_repeats(rows, positions)
+        else:
+            keyed, loose = {}, [[p] for p in positions]
+        if keyed:
+            batch = [_merge(rows, group, columns) for group in keyed.values()]
+            for returned in db.execute(_upsert_statement(table, batch, dialect_name), batch):
+                for position in keyed[_natural_key(returned._mapping)]:
+                    ids[position] = returned.id
+        if loose:
+            batch = [_merge(rows, group, columns) for group in loose]
+            result = db.execute(table.insert().returning(table.c.id, sort_by_parameter_order=True), batch)
+            for (position,), (obs_id,) in zip(loose, result):
+                ids[position] = obs_id
+
+    # Typed index rows follow the spectral_indices text of rows that sent one
+    indexed = {ids[p]: row["spectral_indices"] for p, row in enumerate(rows) if row.get("spectral_indices") is not None}
+    if indexed:
+        db.execute(ObservationIndex.__table__.delete().where(ObservationIndex.observation_id.in_(list(indexed))))
+        index_rows = [
+            {"observation_id": obs_id, "band": band, "value": value}
+            for obs_id, spectral in indexed.items()
+            for band, value in parse_spectral_indices(spectral).items()
+        ]
+        if index_rows:
+            db.execute(ObservationIndex.__table__.insert(), index_rows)
+    return ids
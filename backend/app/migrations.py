@@ -0,0 +1,82 @@
+"""
+Additive schema upgrades applied on startup.
+
+Base.metadata.create_all only creates missing tables, so a column added to an
+existing model never reaches databases created before it. add_missing_columns()
+compares every model table with the live schema and issues ALTER TABLE ... ADD
+COLUMN for the gaps. New NOT NULL columns must declare a server_default so
+existing rows get a value.
+
+upgrade() runs that, then the data backfills new columns depend on, then
+creates model indexes missing from existing tables.
+"""
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+from app.db import Base
+
+logger = logging.getLogger(__name__)
+
+def _default_sql(column):
+    default = column.server_default.arg
+    if hasattr(default, "text"):
+        return default.text
+    return "'" + str(default).replace("'", "''") + "'"
+
+def add_missing_columns(engine, metadata=Base.metadata):
+    """Adds model columns missing from existing tables. Returns 'table.column' names added."""
+    added = []
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        existing_tables = set(inspector.get_table_names())
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                if column.server_default is not None:
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                    ddl += f" DEFAULT {_default_sql(column)}"
+                conn.execute(text(ddl))
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+def backfill_email_normalized(engine):
+    """Fills users.email_normalized for rows written before the column existed. Returns the row count."""
+    with engine.begin() as conn:
+        if not inspect(conn).has_table("users"):
+            return 0
+        return conn.execute(text(
+            "UPDATE users SET email_normalized = lower(trim(email)) WHERE email_normalized IS NULL"
+        )).rowcount
+
+def add_missing_indexes(engine, metadata=Base.metadata):
+    """Creates model indexes missing from existing tables. Returns the index names created."""
+    created = []
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in present:
+                continue
+            try:
+                with engine.begin() as conn:
+                    index.create(conn)
+                created.append(index.name)
+            except IntegrityError:
+                # A unique index over data that already violates it, e.g. two users whose emails
+                # differ only in case; they have to be merged by hand before it can be built
+                logger.error("Could not create unique index %s on %s: duplicate values", index.name, table.name)
+    return created
+
+def upgrade(engine, metadata=Base.metadata):
+    add_missing_columns(engine, metadata)
+    backfill_email_normalized(engine)
+    add_missing_indexes(engine, metadata)
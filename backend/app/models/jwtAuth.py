@@ -4,7 +4,7 @@ US-16: JWT Token Management via Website
 """
 import random
 import string
-from datetime import datetime
+from datetime import datetime, timezone
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask import request, jsonify, g
 from flask_jwt_extended import (
@@ -12,64 +12,44 @@ from flask_jwt_extended import (
     create_refresh_token,
     jwt_required, 
     get_jwt_identity,
-    get_jwt
+    get_jwt,
+    decode_token
 )
 from datetime import timedelta
 import pyotp
 import qrcode
 import io
 import base64
-from app.routes.observation import User, get_db
-
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import os
+from sqlalchemy import select, update
+from app.routes.observation import User, get_db, find_user, normalize_email
+import app.user_cache as user_cache
+import app.entitlements as entitlements
+import app.revocation as revocation
+import app.otp_store as otp_store
+import app.otp_delivery as otp_delivery
 
 def generate_otp():
     return ''.join(random.choices(string.digits, k=6))
 
 def send_email_otp(to_email, otp, subject="Your OTP Code"):
-    # 1. Log to file/console for backup/dev access (keep this for now so dev doesn't break if SMTP fails)
-    print(f"\n{'='*30}")
-    print(f"[EMAIL] To: {to_email}")
-    print(f"Subject: {subject}")
-    print(f"Body: Your verification code is: {otp}")
-    print(f"{'='*30}\n")
-    try:
-        with open("backend_otp.txt", "w") as f:
-            f.write(otp)
-    except:
-        pass
-
-    # 2. Attempt Real SMTP Sending
-    smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    sender_email = os.getenv("SMTP_EMAIL")
-    sender_password = os.getenv("SMTP_PASSWORD")
-
-    if not sender_email or not sender_password:
-        print("SMTP Credentials not set in .env. Skipping real email send.")
-        return
-
-    try:
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = to_email
-        msg['Subject'] = subject
-
-        body = f"Hello,\n\nYour GeoScope Verification Code is: {otp}\n\nThis code expires in 10 minutes."
-        msg.attach(MIMEText(body, 'plain'))
-
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        text = msg.as_string()
-        server.sendmail(sender_email, to_email, text)
-        server.quit()
-        print(f"✅ Real email sent successfully to {to_email}")
-    except Exception as e:
-        print(f"❌ Failed to send real email: {e}")
+    """Queues the OTP for delivery; never blocks the request (see app.otp_delivery)."""
+    otp_delivery.dispatcher.deliver(to_email, subject, otp)
+
+def otp_failure(outcome):
+    """Error response for an OTP that did not verify."""
+    if outcome == otp_store.EXPIRED:
+        return jsonify({"msg": "OTP expired, request a new code"}), 400
+    if outcome == otp_store.LOCKED:
+        return jsonify({"msg": "Too many attempts, request a new code"}), 429
+    return jsonify({"msg": "Invalid OTP"}), 400
+
+def issue_access_token(db, email):
+    """Access token carrying the user's product entitlements as claims."""
+    return create_access_token(
+        identity=email,
+        expires_delta=timedelta(hours=1),
+        additional_claims=entitlements.claims_for(db, email)
+    )
 
 def register(app):
     """
@@ -96,7 +76,7 @@ def register(app):
                 return jsonify({"msg": "All fields are required"}), 400
 
             # Check if user already exists
-            existing_user = db.query(User).filter(User.email == email).first()
+            existing_user = find_user(db, email)
             if existing_user:
                 return jsonify({"msg": "User with this email already exists"}), 409
 
@@ -113,13 +93,12 @@ def register(app):
                 password=hashed_password, 
                 first_name=first_name,
                 last_name=last_name,
-                is_2fa_enabled=0,
-                is_verified=0,
-                otp_code=otp,
-                otp_created_at=datetime.utcnow()
+                is_2fa_enabled=False,
+                is_verified=False
             )
             db.add(new_user)
             db.commit()
+            otp_store.get_store().issue(email, "signup", otp)
 
             # Send OTP
             send_email_otp(email, otp, "Verify your GeoScope Account")
@@ -144,21 +123,22 @@ def register(app):
             email = data.get("email")
             otp = data.get("otp")
 
-            user = db.query(User).filter(User.email == email).first()
+            user = find_user(db, email)
             if not user:
                 return jsonify({"msg": "User not found"}), 404
+            email = user.email
 
-            if user.otp_code != otp:
-                return jsonify({"msg": "Invalid OTP"}), 400
-                
-            # Ideally check expiry here (e.g. < 10 mins)
-            
-            user.is_verified = 1
-            user.otp_code = None # Clear OTP
+            # Checks expiry and attempt count, and consumes the code
+            outcome = otp_store.get_store().verify(email, "signup", otp)
+            if outcome != otp_store.OK:
+                return otp_failure(outcome)
+
+            user.is_verified = True
             db.commit()
+            user_cache.cache.invalidate(email)
 
             # Generate Tokens
-            access_token = create_access_token(identity=email, expires_delta=timedelta(hours=1))
+            access_token = issue_access_token(db, email)
             refresh_token = create_refresh_token(identity=email, expires_delta=timedelta(days=30))
 
             return jsonify({
@@ -185,21 +165,19 @@ def register(app):
             password = request.json.get("password")
             
             # Validate credentials
-            user = db.query(User).filter(User.email == email).first()
+            user = find_user(db, email)
             
             if not user or not check_password_hash(user.password, password):
                 return jsonify({"msg": "Bad email or password"}), 401
+            email = user.email  # Stored spelling, so tokens and OTP keys don't depend on client casing
 
             # Generate OTP for Login
             if email == "testuser@geoscope.com":
                 otp = "123456"
             else:
                 otp = generate_otp()
-            user.otp_code = otp
-            user.otp_created_at = datetime.utcnow()
-            db.commit()
+            otp_store.get_store().issue(email, "login", otp)
 
-            # Send OTP
             # Send OTP
             send_email_otp(email, otp, "Login Access Code")
 
@@ -224,16 +202,14 @@ def register(app):
             email = data.get("email")
             otp = data.get("otp")
 
-            user = db.query(User).filter(User.email == email).first()
+            user = find_user(db, email)
             if not user:
                 return jsonify({"msg": "User not found"}), 404
+            email = user.email
 
-            if user.otp_code != otp:
-                 return jsonify({"msg": "Invalid OTP"}), 400
-
-            # Clear OTP
-            user.otp_code = None
-            db.commit()
+            outcome = otp_store.get_store().verify(email, "login", otp)
+            if outcome != otp_store.OK:
+                return otp_failure(outcome)
 
             # Check if Authenticator App 2FA is enabled
             if user.is_2fa_enabled:
@@ -244,10 +220,7 @@ def register(app):
                 }), 200
 
             # If no TOTP, fully logged in
-            access_token = create_access_token(
-                identity=email,
-                expires_delta=timedelta(hours=1)
-            )
+            access_token = issue_access_token(db, email)
             refresh_token = create_refresh_token(
                 identity=email,
                 expires_delta=timedelta(days=30)
@@ -270,10 +243,7 @@ def register(app):
         """
         try:
             current_user_email = get_jwt_identity()
-            new_access_token = create_access_token(
-                identity=current_user_email,
-                expires_delta=timedelta(hours=1)
-            )
+            new_access_token = issue_access_token(get_db(), current_user_email)
             return jsonify({
                 "access_token": new_access_token
             }), 200
@@ -285,14 +255,17 @@ def register(app):
     def validate_token():
         """
         US-16: Token validation endpoint
+        ?mode=stateless checks only the signature and claims (no user lookup);
+        otherwise the user profile comes from the per-process cache.
         """
         try:
             current_user_email = get_jwt_identity()
             jwt_data = get_jwt()
-            
-            db = get_db()
-            user = db.query(User).filter(User.email == current_user_email).first()
-            user_data = user.to_dict() if user else current_user_email
+
+            if request.args.get("mode") == "stateless":
+                user_data = current_user_email
+            else:
+                user_data = user_cache.get_profile(get_db(), current_user_email) or current_user_email
 
             return jsonify({
                 "valid": True,
@@ -306,6 +279,50 @@ def register(app):
                 "msg": str(e)
             }), 401
 
+    @app.route('/logout', methods=['POST'])
+    @jwt_required(verify_type=False)
+    def logout():
+        """
+        Revokes the presented token (access or refresh). A call made with the
+        access token may pass {"refresh_token": ...} to revoke both at once.
+        """
+        try:
+            db = get_db()
+            tokens = [get_jwt()]
+            refresh_token = (request.get_json(silent=True) or {}).get("refresh_token")
+            if refresh_token:
+                try:
+                    tokens.append(decode_token(refresh_token))
+                except Exception:
+                    return jsonify({"msg": "Invalid refresh token"}), 400
+                if tokens[-1]["sub"] != tokens[0]["sub"]:
+                    return jsonify({"msg": "Refresh token belongs to another user"}), 403
+
+            for claims in tokens:
+                revocation.revocations.revoke(
+                    db, claims["jti"], claims["sub"], datetime.fromtimestamp(claims["exp"], timezone.utc)
+                )
+            db.commit()
+            return jsonify({"msg": "Logged out"}), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    if isinstance(otp_delivery.dispatcher.sink, otp_delivery.MemorySink):
+        @app.route('/dev/otp-outbox', methods=['GET'])
+        def otp_outbox():
+            """
+            Latest OTP sent to ?email= (only with OTP_DELIVERY=memory in a testing or
+            debug app, for the verify_*.py scripts).
+            """
+            # Debug mode is only known once app.run() starts, so this is checked per request
+            if not (app.testing or app.debug):
+                return jsonify({"msg": "Not found"}), 404
+            otp_delivery.dispatcher.flush(timeout=5)
+            message = otp_delivery.dispatcher.sink.latest(request.args.get("email"))
+            if message is None:
+                return jsonify({"msg": "No OTP sent to this address"}), 404
+            return jsonify(message._asdict()), 200
+
     @app.route('/protected', methods=['GET'])
     @jwt_required()
     def protected():
@@ -331,13 +348,14 @@ def register(app):
         try:
             db = get_db()
             email = get_jwt_identity()
-            user = db.query(User).filter(User.email == email).first()
+            user = find_user(db, email)
             if not user:
                 return jsonify({"msg": "User not found"}), 404
             
             secret = pyotp.random_base32()
             user.otp_secret = secret
             db.commit()
+            user_cache.cache.invalidate(email)
             
             totp = pyotp.TOTP(secret)
             provisioning_uri = totp.provisioning_uri(name=email, issuer_name="GeoScope")
@@ -366,9 +384,10 @@ def register(app):
             otp_code = data.get("otp_code")
             setup_mode = data.get("setup_mode", False)
             
-            user = db.query(User).filter(User.email == email).first()
+            user = find_user(db, email)
             if not user:
                 return jsonify({"msg": "User not found"}), 404
+            email = user.email
             
             secret = user.otp_secret
             if not secret:
@@ -377,11 +396,12 @@ def register(app):
             totp = pyotp.TOTP(secret)
             if totp.verify(otp_code):
                 if setup_mode:
-                    user.is_2fa_enabled = 1
+                    user.is_2fa_enabled = True
                     db.commit()
+                    user_cache.cache.invalidate(email)
                 
                 # Create tokens
-                access_token = create_access_token(identity=email, expires_delta=timedelta(hours=1))
+                access_token = issue_access_token(db, email)
                 refresh_token = create_refresh_token(identity=email, expires_delta=timedelta(days=30))
                 
                 return jsonify({
@@ -403,15 +423,16 @@ def register(app):
         try:
             db = get_db()
             email = get_jwt_identity()
-            user = db.query(User).filter(User.email == email).first()
+            user = find_user(db, email)
             if not user:
                 return jsonify({"msg": "User not found"}), 404
             
             # Optional: Verify password or OTP before disabling
             
-            user.is_2fa_enabled = 0
+            user.is_2fa_enabled = False
             user.otp_secret = None
             db.commit()
+            user_cache.cache.invalidate(email)
             
             return jsonify({"msg": "2FA disabled successfully"}), 200
         except Exception as e:
@@ -426,16 +447,8 @@ def register(app):
         try:
             db = get_db()
             email = get_jwt_identity()
-            user = db.query(User).filter(User.email == email).first()
-            
-            if not user:
-                return jsonify({"msg": "User not found"}), 404
-            
-            data = request.json
-            if "first_name" in data:
-                user.first_name = data["first_name"]
-            if "last_name" in data:
-                user.last_name = data["last_name"]
+            data = request.json or {}
+            changes = {k: data[k] for k in ("first_name", "last_name") if k in data}
             # Optional: Allow email update, but might need re-verification logic. For now, allow simple update.
             # if "email" in data and data["email"] != user.email:
             #     # Check if email taken
@@ -444,12 +457,29 @@ def register(app):
             #         return jsonify({"msg": "Email already in use"}), 409
             #     user.email = data["email"]
             #     # Token invalidation logic would be needed if identity changes
-            
-            db.commit()
-            
+
+            if changes:
+                # One UPDATE ... RETURNING instead of a SELECT followed by an UPDATE, on
+                # the account find_user resolves to (the oldest of any case duplicates)
+                oldest = (
+                    select(User.id).where(User.email_normalized == normalize_email(email))
+                    .order_by(User.id).limit(1).scalar_subquery()
+                )
+                user = db.execute(
+                    update(User).where(User.id == oldest).values(**changes).returning(User)
+                ).scalar_one_or_none()
+                profile = user.to_dict() if user else None
+                db.commit()
+                user_cache.cache.invalidate(email)
+            else:
+                profile = user_cache.get_profile(db, email)
+
+            if profile is None:
+                return jsonify({"msg": "User not found"}), 404
+
             return jsonify({
                 "msg": "Profile updated successfully",
-                "user": user.to_dict()
+                "user": profile
             }), 200
             
         except Exception as e:
@@ -495,7 +525,7 @@ def register(app):
             name = user_info.get('name', 'Google User')
             
             # Find or create user
-            user = db.query(User).filter(User.email == email).first()
+            user = find_user(db, email)
             
             if not user:
                 # Create a new user from Google info
@@ -508,21 +538,21 @@ def register(app):
                     password="", # No password for OAuth users
                     first_name=first_name,
                     last_name=last_name,
-                    is_2fa_enabled=0
+                    is_2fa_enabled=False
                 )
                 db.add(user)
                 db.commit()
                 db.refresh(user)
 
             # Generate JWTs
-            access_token = create_access_token(identity=user.email, expires_delta=timedelta(hours=1))
+            access_token = issue_access_token(db, user.email)
             refresh_token = create_refresh_token(identity=user.email, expires_delta=timedelta(days=30))
 
             # Redirect to Frontend
             frontend_callback = os.getenv("FRONTEND_CALLBACK_URL", "http://127.0.0.1:8001/auth/google/callback")
             
             from flask import redirect
-            return redirect(f"{frontend_callback}?access_token={access_token}&refresh_token={refresh_token}&email={user.email}&is_2fa_enabled={user.is_2fa_enabled}&first_name={user.first_name}")
+            return redirect(f"{frontend_callback}?access_token={access_token}&refresh_token={refresh_token}&email={user.email}&is_2fa_enabled={int(user.is_2fa_enabled)}&first_name={user.first_name}")
             
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -0,0 +1,70 @@
+"""
+Precompiled OpenAPI spec.
+
+Flasgger builds the spec by walking every route docstring. We do that once,
+after all routes are registered, write the result to static/openapi.json and
+serve those bytes from memory with an ETag and a long-lived Cache-Control.
+"""
+import hashlib
+import json
+import os
+from flask import request, Response
+
+SPEC_ENDPOINT = "apispec_1"
+DEFAULT_SPEC_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static", "openapi.json")
+DEFAULT_MAX_AGE = 86400
+
+
+def build_spec(app, swagger):
+    """Generates the spec dict for the given app (needs all routes registered)."""
+    with app.test_request_context():
+        return swagger.get_apispecs(SPEC_ENDPOINT)
+
+
+def dump_spec(spec):
+    """Stable serialization so the ETag only changes when the spec does."""
+    return json.dumps(spec, sort_keys=True, indent=2).encode("utf-8")
+
+
+def write_spec(body, path=None):
+    path = path or os.getenv("OPENAPI_SPEC_PATH", DEFAULT_SPEC_PATH)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(body)
+    os.replace(tmp_path, path)
+    return path
+
+
+def register(app, swagger):
+    """
+    Compiles the spec once and replaces Flasgger's per-request spec view.
+    Must be called after every other module has registered its routes.
+    """
+    body = dump_spec(build_spec(app, swagger))
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    max_age = int(os.getenv("OPENAPI_MAX_AGE", DEFAULT_MAX_AGE))
+
+    try:
+        app.config["OPENAPI_SPEC_PATH"] = write_spec(body)
+    except OSError as e:
+        # Read-only deploys still get the in-memory copy
+        app.logger.warning("Could not write OpenAPI spec: %s", e)
+
+    app.config["OPENAPI_SPEC_ETAG"] = etag
+
+    def serve_spec():
+        response = Response(body, mimetype="application/json")
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        return response.make_conditional(request)
+
+    app.view_functions[f"flasgger.{SPEC_ENDPOINT}"] = serve_spec
+
+
+if __name__ == "__main__":
+    # Build step: python -m app.openapi
+    from run import get_app
+    app = get_app()
+    print(f"OpenAPI spec written to {app.config.get('OPENAPI_SPEC_PATH')}")
@@ -0,0 +1,121 @@
+"""
+Delivery of one-time passwords.
+
+Routes hand a message to `dispatcher.deliver()`, which only enqueues it; a
+background thread passes it to the configured sink, so a slow SMTP server
+never holds up a login request. OTP_DELIVERY selects the sink:
+
+  smtp    send through SMTP_SERVER/SMTP_PORT with SMTP_EMAIL/SMTP_PASSWORD
+  log     write the code to the application log (dev)
+  memory  keep the latest messages in process; readable by the tests and,
+          through GET /dev/otp-outbox, by the verify_*.py scripts
+
+Without OTP_DELIVERY, smtp is used when SMTP credentials are set, else log.
+"""
+import logging
+import os
+import queue
+import smtplib
+import threading
+from collections import deque, namedtuple
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+logger = logging.getLogger(__name__)
+
+OTPMessage = namedtuple("OTPMessage", "to subject code")
+
+class SMTPSink:
+    def __init__(self, server, port, sender, password):
+        self.server = server
+        self.port = port
+        self.sender = sender
+        self.password = password
+
+    def send(self, message):
+        msg = MIMEMultipart()
+        msg['From'] = self.sender
+        msg['To'] = message.to
+        msg['Subject'] = message.subject
+        body = f"Hello,\n\nYour GeoScope Verification Code is: {message.code}\n\nThis code expires in 10 minutes."
+        msg.attach(MIMEText(body, 'plain'))
+
+        with smtplib.SMTP(self.server, self.port, timeout=30) as server:
+            server.starttls()
+            server.login(self.sender, self.password)
+            server.sendmail(self.sender, message.to, msg.as_string())
+        logger.info("OTP email sent to %s", message.to)
+
+class LogSink:
+    def send(self, message):
+        logger.warning("[EMAIL] To: %s | Subject: %s | Code: %s", message.to, message.subject, message.code)
+
+class MemorySink:
+    def __init__(self, maxlen=1000):
+        self.messages = deque(maxlen=maxlen)
+
+    def send(self, message):
+        self.messages.append(message)
+
+    def latest(self, email):
+        """Most recent message sent to `email`, or None."""
+        for message in reversed(self.messages):
+            if message.to == email:
+                return message
+        return None
+
+class Dispatcher:
+    """Hands messages to the sink on a background thread."""
+
+    def __init__(self, sink, maxsize=1000):
+        self.sink = sink
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="otp-delivery", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            message = self._queue.get()
+            try:
+                self.sink.send(message)
+            except Exception:
+                logger.exception("Failed to deliver OTP to %s", message.to)
+            finally:
+                self._queue.task_done()
+
+    def deliver(self, to, subject, code):
+        """Queues a message without blocking; returns False if the queue is full."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(OTPMessage(to, subject, code))
+            return True
+        except queue.Full:
+            logger.error("OTP delivery queue full; dropped message to %s", to)
+            return False
+
+    def flush(self, timeout=None):
+        """Waits until queued messages have been handed to the sink (tests, shutdown)."""
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(lambda: self._queue.unfinished_tasks == 0, timeout)
+
+def create_sink():
+    kind = os.getenv("OTP_DELIVERY", "").lower()
+    sender = os.getenv("SMTP_EMAIL")
+    password = os.getenv("SMTP_PASSWORD")
+    if not kind:
+        kind = "smtp" if sender and password else "log"
+    if kind == "memory":
+        return MemorySink()
+    if kind == "smtp":
+        return SMTPSink(
+            os.getenv("SMTP_SERVER", "smtp.gmail.com"), int(os.getenv("SMTP_PORT", "587")), sender, password
+        )
+    return LogSink()
+
+dispatcher = Dispatcher(create_sink())
@@ -0,0 +1,139 @@
+"""
+Expiring one-time-password store.
+
+Email OTPs used to live in users.otp_code / otp_created_at, so every login
+attempt wrote to the users table and codes never expired. They now live here,
+keyed by (email, purpose), hashed, with a TTL (OTP_TTL_SECONDS) and a cap on
+wrong guesses (OTP_MAX_ATTEMPTS); a code is consumed by its first successful
+check.
+
+OTP_STORE selects the backend:
+  sqlite (default)  its own SQLite file (OTP_DATABASE_URL), shared by every
+                    worker on the host; expired rows are swept periodically
+  memory            per-process dict, for single-process dev and tests
+"""
+import hashlib
+import os
+import threading
+import time
+from sqlalchemy import create_engine, MetaData, Table, Column, String, Float, Integer, delete, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+# verify() outcomes
+OK = "ok"
+INVALID = "invalid"
+EXPIRED = "expired"
+LOCKED = "locked"
+MISSING = "missing"
+
+def _digest(email, purpose, code):
+    return hashlib.sha256(f"{email}\0{purpose}\0{code}".encode()).hexdigest()
+
+class MemoryOTPStore:
+    def __init__(self, ttl_seconds=600, max_attempts=5):
+        self.ttl_seconds = ttl_seconds
+        self.max_attempts = max_attempts
+        self._entries = {}  # (email, purpose) -> [digest, expires_at, attempts]
+        self._lock = threading.Lock()
+
+    def issue(self, email, purpose, code):
+        """Stores a new code for (email, purpose), replacing any pending one."""
+        now = time.time()
+        with self._lock:
+            self._entries = {k: v for k, v in self._entries.items() if v[1] > now}
+            self._entries[(email, purpose)] = [_digest(email, purpose, code), now + self.ttl_seconds, 0]
+
+    def verify(self, email, purpose, code):
+        with self._lock:
+            entry = self._entries.get((email, purpose))
+            if entry is None:
+                return MISSING
+            if entry[1] <= time.time():
+                del self._entries[(email, purpose)]
+                return EXPIRED
+            entry[2] += 1
+            if entry[2] > self.max_attempts:
+                del self._entries[(email, purpose)]
+                return LOCKED
+            if entry[0] != _digest(email, purpose, code):
+                return INVALID
+            del self._entries[(email, purpose)]
+            return OK
+
+class SQLiteOTPStore:
+    SWEEP_SECONDS = 60
+
+    def __init__(self, url="sqlite:///otp.db", ttl_seconds=600, max_attempts=5):
+        self.ttl_seconds = ttl_seconds
+        self.max_attempts = max_attempts
+        self.engine = create_engine(url, connect_args={"check_same_thread": False})
+        metadata = MetaData()
+        self.table = Table(
+            "otp_codes", metadata,
+            Column("email", String(120), primary_key=True),
+            Column("purpose", String(20), primary_key=True),
+            Column("code_hash", String(64), nullable=False),
+            Column("expires_at", Float, nullable=False, index=True),  # epoch seconds
+            Column("attempts", Integer, nullable=False, default=0),
+        )
+        metadata.create_all(self.engine)
+        self._next_sweep = 0.0
+
+    def _key(self, email, purpose):
+        return (self.table.c.email == email) & (self.table.c.purpose == purpose)
+
+    def issue(self, email, purpose, code):
+        now = time.time()
+        values = {"code_hash": _digest(email, purpose, code), "expires_at": now + self.ttl_seconds, "attempts": 0}
+        statement = sqlite_insert(self.table).values(email=email, purpose=purpose, **values)
+        with self.engine.begin() as conn:
+            conn.execute(statement.on_conflict_do_update(index_elements=["email", "purpose"], set_=values))
+            if now >= self._next_sweep:
+                conn.execute(delete(self.table).where(self.table.c.expires_at <= now))
+                self._next_sweep = now + self.SWEEP_SECONDS
+
+    def verify(self, email, purpose, code):
+        with self.engine.begin() as conn:
+            # Count the attempt and read the entry in one statement, so parallel guesses all count
+            row = conn.execute(
+                update(self.table).where(self._key(email, purpose))
+                .values(attempts=self.table.c.attempts + 1)
+                .returning(self.table.c.code_hash, self.table.c.expires_at, self.table.c.attempts)
+            ).first()
+            if row is None:
+                return MISSING
+            if row.expires_at <= time.time():
+                conn.execute(delete(self.table).where(self._key(email, purpose)))
+                return EXPIRED
+            if row.attempts > self.max_attempts:
+                conn.execute(delete(self.table).where(self._key(email, purpose)))
+                return LOCKED
+            if row.code_hash != _digest(email, purpose, code):
+                return INVALID
+            # Single use: only one verifier can delete the row
+            consumed = conn.execute(
+                delete(self.table).where(self._key(email, purpose), self.table.c.code_hash == row.code_hash)
+            ).rowcount
+            return OK if consumed else MISSING
+
+# Next to run.py rather than in whatever directory the process started from
+DEFAULT_DATABASE_URL = f"sqlite:///{os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'otp.db')}"
+
+def create_store():
+    ttl_seconds = int(os.getenv("OTP_TTL_SECONDS", "600"))
+    max_attempts = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+    if os.getenv("OTP_STORE", "sqlite").lower() == "memory":
+        return MemoryOTPStore(ttl_seconds, max_attempts)
+    return SQLiteOTPStore(os.getenv("OTP_DATABASE_URL", DEFAULT_DATABASE_URL), ttl_seconds, max_attempts)
+
+# Created on first use, so importing the app never creates a database file
+store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    global store
+    if store is None:
+        with _store_lock:
+            if store is None:
+                store = create_store()
+    return store
@@ -0,0 +1,260 @@
+"""
+Opt-in monthly partitioning of observation storage.
+
+With OBSERVATION_PARTITIONING=monthly, new observations are written to one
+table per calendar month (observations_p202410, ...) instead of the single
+`observations` table. Ids encode their month (YYYYMM * PARTITION_ID_SPAN + n),
+so a lookup by id goes straight to one table, a start_date/end_date query only
+touches the months overlapping the range, and expiring old data drops whole
+tables. Rows already in `observations` stay there and are still read.
+"""
+import contextlib
+import functools
+import os
+import re
+from datetime import datetime, timezone
+from sqlalchemy import Table, MetaData, Column, Index, select, union_all, text, inspect, bindparam
+from sqlalchemy.exc import OperationalError, ProgrammingError, IntegrityError
+from app.routes.observation import ObservationRecord, ObservationIndex, parse_spectral_indices
+import app.rollups as rollups
+import app.changes as changes
+import app.search as search
+
+PARTITION_ID_SPAN = 10**9
+PARTITION_PREFIX = "observations_p"
+_PARTITION_NAME = re.compile(rf"^{PARTITION_PREFIX}(\d{{6}})$")
+
+# Partition tables live outside Base.metadata so create_all/drop_all leave them alone
+partition_metadata = MetaData()
+
+
+def enabled():
+    return os.getenv("OBSERVATION_PARTITIONING", "").lower() == "monthly"
+
+
+def partition_key(ts):
+    """Month key for a timestamp, e.g. 202410."""
+    return ts.year * 100 + ts.month
+
+
+def table_name(key):
+    return f"{PARTITION_PREFIX}{key}"
+
+
+def partition_for_id(obs_id):
+    """Month key encoded in a partitioned id, or None for rows in `observations`."""
+    if obs_id >= PARTITION_ID_SPAN:
+        return obs_id // PARTITION_ID_SPAN
+    return None
+
+
+def is_partition_table(name):
+    return bool(_PARTITION_NAME.match(name))
+
+
+def partition_table(key):
+    """Table object for a month, mirroring the observations columns."""
+    name = table_name(key)
+    if name in partition_metadata.tables:
+        return partition_metadata.tables[name]
+    columns = [
+        Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable)
+        for c in ObservationRecord.__table__.columns
+    ]
+    return Table(
+        name, partition_metadata, *columns,
+        Index(f"ix_{name}_timestamp", "timestamp"),
+        sqlite_autoincrement=True,
+    )
+
+
+def existing_partitions(db):
+    """Sorted month keys of the partition tables present in the database."""
+    keys = []
+    for name in inspect(db.connection()).get_table_names():
+        match = _PARTITION_NAME.match(name)
+        if match:
+            keys.append(int(match.group(1)))
+    return sorted(keys)
+
+
+def ensure_partition(db, key):
+    """
+    Creates the month table on first use, with its triggers, search index and
+    natural-key index, and starts its ids at YYYYMM * span.
+    """
+    table = partition_table(key)
+    conn = db.connection()
+    if inspect(conn).has_table(table.name):
+        # Already set up; DDL on every write would lock out concurrent writers on PostgreSQL
+        return table
+    sqlite = conn.dialect.name == "sqlite"
+    try:
+        # pysqlite does not handle SAVEPOINT reliably; elsewhere a failed CREATE aborts the transaction
+        with contextlib.nullcontext() if sqlite else conn.begin_nested():
+            table.create(bind=conn)
+    except (OperationalError, ProgrammingError, IntegrityError):
+        # Another worker created it between the check and the CREATE, and set it up
+        if not inspect(conn).has_table(table.name):
+            raise
+        return table
+    if conn.dialect.name in rollups.TRIGGER_DIALECTS:
+        rollups.install_triggers(conn, table.name)
+        changes.install_triggers(conn, table.name)
+    if search.available(conn):
+        search.install_index(conn, table.name)
+    import app.ingest as ingest
+    if ingest.dedup_enabled() and conn.dialect.name in ingest.UPSERT_INSERTS:
+        ingest.install_index(conn, table.name)
+    _start_ids(conn, table.name, key * PARTITION_ID_SPAN)
+    return table
+
+
+def _start_ids(conn, name, base):
+    """Makes the table's next generated id base + 1 unless it is already past it."""
+    if conn.dialect.name == "postgresql":
+        conn.execute(
+            text(f"SELECT setval(pg_get_serial_sequence(:name, 'id'), GREATEST(:base, (SELECT COALESCE(MAX(id), 0) FROM {name})))"),
+            {"name": name, "base": base},
+        )
+        return
+    conn.execute(
+        text(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT :name, :base "
+            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"
+        ),
+        {"name": name, "base": base},
+    )
+
+
+def _parse_date(value):
+    """A timestamp or ISO 8601 string as a datetime in UTC (naive ones are UTC), or None."""
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc)
+    return value
+
+
+def tables_for_range(db, start_date=None, end_date=None):
+    """Partition tables overlapping [start_date, end_date]; open ends are unbounded."""
+    start = _parse_date(start_date) if start_date else None
+    end = _parse_date(end_date) if end_date else None
+    low = partition_key(start) if start else None
+    high = partition_key(end) if end else None
+    return [
+        partition_table(key) for key in existing_partitions(db)
+        if (low is None or key >= low) and (high is None or key <= high)
+    ]
+
+
+def _write_indices(db, obs_id, spectral_indices):
+    """Mirrors ObservationRecord's typed index rows for a partitioned record."""
+    db.execute(ObservationIndex.__table__.delete().where(ObservationIndex.observation_id == obs_id))
+    rows = [
+        {"observation_id": obs_id, "band": band, "value": value}
+        for band, value in parse_spectral_indices(spectral_indices).items()
+    ]
+    if rows:
+        db.execute(ObservationIndex.__table__.insert(), rows)
+
+
+def _table_for_id(db, obs_id):
+    key = partition_for_id(obs_id)
+    if key is None:
+        return ObservationRecord.__table__
+    if key not in existing_partitions(db):
+        return None
+    return partition_table(key)
+
+
+@functools.lru_cache(maxsize=256)
+def _select_by_id(table):
+    """SELECT of one row by :id, built once per table so lookups reuse the compiled statement."""
+    return select(table).where(table.c.id == bindparam("id"))
+
+
+def get(db, obs_id):
+    """Loads an observation by id from whichever table holds it (detached record)."""
+    key = partition_for_id(obs_id)
+    if key is None:
+        return db.get(ObservationRecord, obs_id)
+    table = _table_for_id(db, obs_id)
+    if table is None:
+        return None
+    row = db.execute(_select_by_id(table), {"id": obs_id}).first()
+    return ObservationRecord(**row._mapping) if row else None
+
+
+def update(db, obs_id, values):
+    """
+    Updates a partitioned observation in place. Returns the affected row count,
+    or raises ValueError if the new timestamp belongs to a different month.
+    """
+    table = _table_for_id(db, obs_id)
+    if table is None:
+        return 0
+    values = {k: v for k, v in values.items() if k in table.c and k != "id"}
+    if values.get("timestamp"):
+        ts = _parse_date(values["timestamp"])
+        if ts is None or partition_key(ts) != partition_for_id(obs_id):
+            raise ValueError("timestamp would move the record to another partition")
+        values["timestamp"] = ts
+    if not values:
+        return 1 if get(db, obs_id) else 0
+    updated = db.execute(table.update().where(table.c.id == obs_id).values(**values)).rowcount
+    if updated and "spectral_indices" in values:
+        _write_indices(db, obs_id, values["spectral_indices"])
+    return updated
+
+
+def delete(db, obs_id):
+    table = _table_for_id(db, obs_id)
+    if table is None:
+        return 0
+    db.execute(ObservationIndex.__table__.delete().where(ObservationIndex.observation_id == obs_id))
+    return db.execute(table.delete().where(table.c.id == obs_id)).rowcount
+
+
+def filtered_rows(db, build_conditions, start_date=None, end_date=None):
+    """
+    Runs the same filter over `observations` plus the overlapping month tables
+    as one UNION ALL and returns detached ObservationRecord objects.
+    `build_conditions(columns)` returns the WHERE clauses for a table's columns.
+    """
+    tables = [ObservationRecord.__table__] + tables_for_range(db, start_date, end_date)
+    selects = [select(t).where(*build_conditions(t.c)) for t in tables]
+    statement = selects[0] if len(selects) == 1 else union_all(*selects)
+    return [ObservationRecord(**row._mapping) for row in db.execute(statement)]
+
+
+def drop_before(db, cutoff):
+    """
+    Expires every month strictly older than the month containing `cutoff` by
+    dropping its table and its spectral index rows. Returns the dropped table
+    names.
+    """
+    cutoff_key = partition_key(_parse_date(cutoff))
+    dropped = []
+    conn = db.connection()
+    for key in existing_partitions(db):
+        if key < cutoff_key:
+            table = partition_table(key)
+            if conn.dialect.name in rollups.TRIGGER_DIALECTS:
+                rollups.subtract_table(conn, table.name)
+            if search.available(conn):
+                search.drop_index(conn, table.name)
+            # A recreated month hands out the same ids, which must not inherit these rows
+            conn.execute(ObservationIndex.__table__.delete().where(
+                ObservationIndex.observation_id >= key * PARTITION_ID_SPAN,
+                ObservationIndex.observation_id < (key + 1) * PARTITION_ID_SPAN,
+            ))
+            table.drop(bind=conn)
+            if conn.dialect.name == "sqlite":
+                conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": table.name})
+            partition_metadata.remove(table)
+            dropped.append(table.name)
+    return dropped
@@ -0,0 +1,77 @@
+"""
+In-process publish/subscribe fan-out for observation events.
+
+Each subscriber owns a bounded queue. Publishing never blocks: when a slow
+consumer's queue is full its oldest event is dropped (and counted), so one
+stalled client can't back up ingest or the other subscribers. Subscribers are
+indexed by product_id, so a publish only visits clients of that product.
+"""
+import threading
+from collections import defaultdict, deque
+
+DEFAULT_QUEUE_SIZE = 100
+
+class Subscriber:
+    def __init__(self, product_ids, maxsize=DEFAULT_QUEUE_SIZE):
+        self.product_ids = frozenset(product_ids)
+        # deque(maxlen) evicts the oldest entry itself; append/popleft are atomic
+        self.events = deque(maxlen=maxsize)
+        self.dropped = 0
+        self._ready = threading.Event()
+
+    def offer(self, event):
+        """Enqueues without blocking, evicting the oldest event if full."""
+        if len(self.events) == self.events.maxlen:
+            self.dropped += 1
+        self.events.append(event)
+        self._ready.set()
+
+    def get(self, timeout=None):
+        """Next event, or None if nothing arrived within the timeout."""
+        while True:
+            try:
+                return self.events.popleft()
+            except IndexError:
+                pass
+            self._ready.clear()
+            if self.events:
+                continue  # offered between popleft and clear
+            if not self._ready.wait(timeout):
+                return None
+
+class Broker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_product = defaultdict(set)
+        self._count = 0
+
+    def subscribe(self, product_ids, maxsize=DEFAULT_QUEUE_SIZE):
+        subscriber = Subscriber(product_ids, maxsize)
+        with self._lock:
+            for product_id in subscriber.product_ids:
+                self._by_product[product_id].add(subscriber)
+            self._count += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            for product_id in subscriber.product_ids:
+                subscribers = self._by_product.get(product_id)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._by_product[product_id]
+            self._count -= 1
+
+    def subscriber_count(self):
+        return self._count
+
+    def publish(self, product_id, event):
+        """Delivers to every subscriber of product_id; returns how many."""
+        with self._lock:
+            targets = tuple(self._by_product.get(product_id, ()))
+        for subscriber in targets:
+            subscriber.offer(event)
+        return len(targets)
+
+broker = Broker()
@@ -0,0 +1,161 @@
+"""
+JWT revocation by jti.
+
+revoked_tokens is the source of truth. Each process keeps a bloom filter of
+every revoked jti, refreshed incrementally at most every
+REVOCATION_SYNC_SECONDS, so a token that was never revoked - almost every
+request - is answered from memory. A sync reads rows with a higher seq plus
+every row revoked in the last REVOCATION_SYNC_WINDOW_SECONDS: on PostgreSQL
+seqs are drawn before commit, so a lower seq can become visible after a
+higher one has been read. Only a bloom hit is confirmed
+against the table, and the answer is kept in a small exact LRU cache.
+Revocations made by this process are visible to it immediately; other
+processes see them after their next sync.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import Column, Integer, String, DateTime, Index, select, delete
+from app.db import Base, SessionLocal
+from app.routes.observation import as_utc_naive
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    seq = Column(Integer, primary_key=True)
+    jti = Column(String(64), nullable=False, unique=True)
+    identity = Column(String(120))
+    expires_at = Column(DateTime(timezone=True))  # Row can be purged once the token has expired anyway
+    revoked_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    # AUTOINCREMENT so a seq is never reused
+    __table_args__ = (Index("ix_revoked_tokens_expires_at", "expires_at"), {"sqlite_autoincrement": True})
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings; no deletes."""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class RevocationList:
+    def __init__(self, capacity=100000, sync_seconds=5, exact_cache_size=1024, window_seconds=60):
+        self.capacity = capacity
+        self.sync_seconds = sync_seconds
+        self.window_seconds = window_seconds
+        self.exact_cache_size = exact_cache_size
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity)
+        self._exact = OrderedDict()
+        self._last_seq = None
+        self._recent = set()  # Seqs already applied that the trailing window still returns
+        self._next_sync = 0.0
+
+    def _remember(self, jti, revoked):
+        self._exact[jti] = revoked
+        self._exact.move_to_end(jti)
+        while len(self._exact) > self.exact_cache_size:
+            self._exact.popitem(last=False)
+
+    def sync(self, db):
+        """
+        Adds revocations newer than the last seen seq or inside the trailing
+        window (all unexpired ones on first use or when full).
+        """
+        with self._lock:
+            rebuild = self._last_seq is None or self._bloom.count >= self.capacity
+            now = datetime.now(timezone.utc)
+            window_start = now - timedelta(seconds=self.window_seconds)
+            query = select(RevokedToken.seq, RevokedToken.jti, RevokedToken.revoked_at)
+            if rebuild:
+                query = query.where((RevokedToken.expires_at.is_(None)) | (RevokedToken.expires_at > now))
+            else:
+                query = query.where((RevokedToken.seq > self._last_seq) | (RevokedToken.revoked_at >= window_start))
+            rows = db.execute(query.order_by(RevokedToken.seq)).all()
+
+            if rebuild:
+                self._bloom = BloomFilter(max(self.capacity, 2 * len(rows)))
+                self._recent = set()
+                self._last_seq = 0
+            recent = set()
+            for seq, jti, revoked_at in rows:
+                if revoked_at is not None and as_utc_naive(revoked_at) >= as_utc_naive(window_start):
+                    recent.add(seq)
+                if seq in self._recent:
+                    continue
+                self._bloom.add(jti)
+                # A "not revoked" answer cached before this revocation is now wrong
+                self._exact.pop(jti, None)
+                self._last_seq = max(self._last_seq, seq)
+            self._recent = recent
+            self._next_sync = time.monotonic() + self.sync_seconds
+
+    def is_revoked(self, jti, db=None):
+        if not jti:
+            return False
+        own_session = None
+        try:
+            if self._last_seq is None or time.monotonic() >= self._next_sync:
+                db = db or (own_session := SessionLocal())
+                self.sync(db)
+            with self._lock:
+                if jti not in self._bloom:
+                    return False
+                cached = self._exact.get(jti)
+            if cached is not None:
+                return cached
+            db = db or (own_session := SessionLocal())
+            revoked = db.execute(select(RevokedToken.seq).where(RevokedToken.jti == jti)).first() is not None
+            with self._lock:
+                self._remember(jti, revoked)
+            return revoked
+        finally:
+            if own_session is not None:
+                own_session.close()
+
+    def revoke(self, db, jti, identity=None, expires_at=None):
+        """Records a revocation; the caller commits. Takes effect in this process at once."""
+        if db.execute(select(RevokedToken.seq).where(RevokedToken.jti == jti)).first() is None:
+            db.add(RevokedToken(jti=jti, identity=identity, expires_at=expires_at))
+        with self._lock:
+            self._bloom.add(jti)
+            self._remember(jti, True)
+
+    def clear(self):
+        """Drops the in-memory state; the next check resyncs from the table."""
+        with self._lock:
+            self._bloom = BloomFilter(self.capacity)
+            self._exact.clear()
+            self._recent = set()
+            self._last_seq = None
+
+revocations = RevocationList(
+    capacity=int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000")),
+    sync_seconds=float(os.getenv("REVOCATION_SYNC_SECONDS", "5")),
+    window_seconds=float(os.getenv("REVOCATION_SYNC_WINDOW_SECONDS", "60")),
+)
+
+def purge_expired(db):
+    """Deletes revocations of tokens that have expired anyway. Returns the row count."""
+    return db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.now(timezone.utc))).rowcount
@@ -0,0 +1,142 @@
+"""
+Daily observation rollups.
+
+observation_daily_rollups holds one row per satellite/product/day with the
+number of observations. Database triggers keep it current on every insert,
+update and delete, whichever code path issues them (single routes, bulk
+statements, partitioned tables), so dashboards read a few pre-aggregated rows
+instead of grouping the whole history. rebuild() recomputes it from scratch to
+fix drift.
+
+Missing satellite_id/product_id are stored as '' and 0 so they take part in
+the primary key.
+"""
+from sqlalchemy import Column, String, Integer, Index, text, inspect
+from app.db import Base
+
+ROLLUP_TABLE = "observation_daily_rollups"
+
+class DailyRollup(Base):
+    __tablename__ = ROLLUP_TABLE
+
+    satellite_id = Column(String(100), primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    day = Column(String(10), primary_key=True)  # YYYY-MM-DD (UTC)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (Index("ix_observation_daily_rollups_day", "day"),)
+
+    def to_dict(self):
+        return {
+            "satellite_id": self.satellite_id or None,
+            "product_id": self.product_id or None,
+            "day": self.day,
+            "count": self.count,
+        }
+
+# Databases the rollup and change-feed triggers are written for
+TRIGGER_DIALECTS = ("sqlite", "postgresql")
+
+ROLLUP_FUNCTION = "observation_rollup_trigger"
+
+def _day(row, dialect_name):
+    if dialect_name == "postgresql":
+        return f"to_char({row}.timestamp AT TIME ZONE 'UTC', 'YYYY-MM-DD')"
+    return f"date({row}.timestamp)"
+
+def _key(row, dialect_name="sqlite"):
+    return f"COALESCE({row}.satellite_id, ''), COALESCE({row}.product_id, 0), COALESCE({_day(row, dialect_name)}, '')"
+
+def _bump(row, delta, dialect_name="sqlite"):
+    return (
+        f"INSERT INTO {ROLLUP_TABLE} (satellite_id, product_id, day, count) "
+        f"VALUES ({_key(row, dialect_name)}, {delta}) "
+        f"ON CONFLICT (satellite_id, product_id, day) DO UPDATE SET count = {ROLLUP_TABLE}.count + ({delta});"
+    )
+
+def _prune(row, dialect_name="sqlite"):
+    return (
+        f"DELETE FROM {ROLLUP_TABLE} "
+        f"WHERE (satellite_id, product_id, day) = ({_key(row, dialect_name)}) AND count <= 0;"
+    )
+
+def _postgresql_function():
+    return (
+        f"CREATE OR REPLACE FUNCTION {ROLLUP_FUNCTION}() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN "
+        f"IF TG_OP <> 'INSERT' THEN {_bump('OLD', -1, 'postgresql')} {_prune('OLD', 'postgresql')} END IF; "
+        f"IF TG_OP <> 'DELETE' THEN {_bump('NEW', 1, 'postgresql')} END IF; "
+        f"RETURN NULL; END $$"
+    )
+
+def trigger_ddl(table_name, dialect_name="sqlite"):
+    """Statements creating the triggers that maintain the rollups from `table_name`."""
+    if dialect_name == "postgresql":
+        run = f"FOR EACH ROW EXECUTE FUNCTION {ROLLUP_FUNCTION}()"
+        return [
+            _postgresql_function(),
+            f"CREATE OR REPLACE TRIGGER {table_name}_rollup_insert AFTER INSERT ON {table_name} {run}",
+            f"CREATE OR REPLACE TRIGGER {table_name}_rollup_delete AFTER DELETE ON {table_name} {run}",
+            f"CREATE OR REPLACE TRIGGER {table_name}_rollup_update "
+            f"AFTER UPDATE OF satellite_id, product_id, timestamp ON {table_name} FOR EACH ROW "
+            f"WHEN (ROW({_key('OLD', dialect_name)}) IS DISTINCT FROM ROW({_key('NEW', dialect_name)})) "
+            f"EXECUTE FUNCTION {ROLLUP_FUNCTION}()",
+        ]
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table_name}_rollup_insert AFTER INSERT ON {table_name} "
+        f"BEGIN {_bump('NEW', 1)} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table_name}_rollup_delete AFTER DELETE ON {table_name} "
+        f"BEGIN {_bump('OLD', -1)} {_prune('OLD')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table_name}_rollup_update "
+        f"AFTER UPDATE OF satellite_id, product_id, timestamp ON {table_name} "
+        f"WHEN ({_key('OLD')}) IS NOT ({_key('NEW')}) "
+        f"BEGIN {_bump('OLD', -1)} {_prune('OLD')} {_bump('NEW', 1)} END",
+    ]
+
+def install_triggers(conn, table_name):
+    for statement in trigger_ddl(table_name, conn.dialect.name):
+        conn.execute(text(statement))
+
+def trigger_exists(conn, name):
+    if conn.dialect.name == "postgresql":
+        query = "SELECT tgname FROM pg_trigger WHERE tgname = :name"
+    else:
+        query = "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name = :name"
+    return conn.execute(text(query), {"name": name}).first() is not None
+
+def _source_tables(conn):
+    import app.partitions as partitions
+    names = inspect(conn).get_table_names()
+    return ["observations"] + [n for n in names if partitions.is_partition_table(n)]
+
+def _add_table(conn, table_name, sign):
+    conn.execute(text(
+        f"INSERT INTO {ROLLUP_TABLE} (satellite_id, product_id, day, count) "
+        f"SELECT {_key(table_name, conn.dialect.name)}, {sign}COUNT(*) FROM {table_name} WHERE true "
+        f"GROUP BY 1, 2, 3 "
+        f"ON CONFLICT (satellite_id, product_id, day) DO UPDATE SET count = {ROLLUP_TABLE}.count + excluded.count"
+    ))
+
+def rebuild(conn):
+    """Recomputes every rollup row from the observation tables."""
+    conn.execute(text(f"DELETE FROM {ROLLUP_TABLE}"))
+    for table_name in _source_tables(conn):
+        _add_table(conn, table_name, "")
+
+def subtract_table(conn, table_name):
+    """Removes a table's rows from the rollups, e.g. before dropping a partition."""
+    _add_table(conn, table_name, "-")
+    conn.execute(text(f"DELETE FROM {ROLLUP_TABLE} WHERE count <= 0"))
+
+def install(engine):
+    """
+    Creates the rollup triggers on startup. If they were missing (new or
+    recreated observations table), existing rows are rolled up once.
+    """
+    if engine.dialect.name not in TRIGGER_DIALECTS:
+        return
+    with engine.begin() as conn:
+        existing = trigger_exists(conn, "observations_rollup_insert")
+        for table_name in _source_tables(conn):
+            install_triggers(conn, table_name)
+        if not existing:
+            rebuild(conn)
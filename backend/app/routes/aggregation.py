@@ -0,0 +1,231 @@
+"""
+Server-side aggregation of observation statistics.
+"""
+from datetime import datetime
+from flask import request, jsonify, g
+from sqlalchemy import select, func, and_, union_all, String
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+from sqlalchemy.orm import aliased
+from app.db import reads_from_replica
+from app.routes.observation import ObservationRecord, ObservationIndex, SPECTRAL_BANDS, as_utc_naive
+from app.routes.filtering import build_conditions
+from app.rollups import DailyRollup
+import app.partitions as partitions
+
+GROUP_COLUMNS = ("satellite_id", "product_id", "timezone")
+
+BUCKET_FORMATS = {
+    "hour": "%Y-%m-%dT%H:00",
+    "day": "%Y-%m-%d",
+    "month": "%Y-%m",
+}
+
+# The same labels through PostgreSQL's to_char
+PG_BUCKET_FORMATS = {
+    "hour": 'YYYY-MM-DD"T"HH24:00',
+    "day": "YYYY-MM-DD",
+    "month": "YYYY-MM",
+}
+
+class time_bucket(FunctionElement):
+    """Truncates a timestamp column to an hour/day/month label."""
+    type = String()
+    inherit_cache = True
+    # The unit is part of the SQL text, so it has to be part of the cache key
+    _traverse_internals = FunctionElement._traverse_internals + [("unit", InternalTraversal.dp_string)]
+
+    def __init__(self, column, unit):
+        self.unit = unit
+        super().__init__(column)
+
+# The format is rendered inline rather than bound: PostgreSQL only matches the
+# SELECT expression to the GROUP BY one if both have the same SQL text.
+
+@compiles(time_bucket)
+def _time_bucket_strftime(element, compiler, **kw):
+    return f"strftime('{BUCKET_FORMATS[element.unit]}', {compiler.process(element.clauses, **kw)})"
+
+@compiles(time_bucket, "postgresql")
+def _time_bucket_to_char(element, compiler, **kw):
+    column = compiler.process(element.clauses, **kw)
+    return f"to_char({column} AT TIME ZONE 'UTC', '{PG_BUCKET_FORMATS[element.unit]}')"
+
+def get_db():
+    """Helper to get the current request's DB session"""
+    return g.db
+
+def _split(value):
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+def build_aggregate(group_by, metrics, args, partition_tables=()):
+    """
+    Builds one GROUP BY statement over observations and the given partition
+    tables. Raises ValueError for unknown group keys or metrics.
+    """
+    if partition_tables:
+        # Filters go inside each branch, so every table narrows its own rows by its own indexes
+        source = union_all(*(
+            select(table).where(*build_conditions(table.c, args))
+            for table in [ObservationRecord.__table__, *partition_tables]
+        )).subquery("observation_rows")
+        conditions = []
+    else:
+        source = ObservationRecord.__table__
+        conditions = build_conditions(source.c, args)
+    rows = source.c
+
+    group_exprs = []
+    for key in group_by:
+        if key in GROUP_COLUMNS:
+            group_exprs.append(rows[key].label(key))
+        elif key in BUCKET_FORMATS:
+            group_exprs.append(time_bucket(rows.timestamp, key).label(key))
+        else:
+            raise ValueError(f"Unknown group_by '{key}'")
+    if len([k for k in group_by if k in BUCKET_FORMATS]) > 1:
+        raise ValueError("Only one time bucket (hour, day or month) can be used")
+
+    metric_exprs = []
+    joins = []
+    for metric in metrics:
+        if metric == "count":
+            metric_exprs.append(func.count(rows.id).label("count"))
+        elif metric == "min_timestamp":
+            metric_exprs.append(func.min(rows.timestamp).label("min_timestamp"))
+        elif metric == "max_timestamp":
+            metric_exprs.append(func.max(rows.timestamp).label("max_timestamp"))
+        elif metric.startswith("mean_") and metric[5:] in SPECTRAL_BANDS:
+            # (observation_id, band) is the primary key, so the join adds at most one row per observation
+            band_rows = aliased(ObservationIndex)
+            joins.append((band_rows, and_(
+                band_rows.observation_id == rows.id,
+                band_rows.band == metric[5:],
+            )))
+            metric_exprs.append(func.avg(band_rows.value).label(metric))
+        else:
+            raise ValueError(f"Unknown metric '{metric}'")
+
+    statement = select(*group_exprs, *metric_exprs).select_from(source)
+    for target, onclause in joins:
+        statement = statement.outerjoin(target, onclause)
+    statement = statement.where(*conditions)
+    if group_exprs:
+        statement = statement.group_by(*group_exprs).order_by(*group_exprs)
+    return statement
+
+def register(app):
+    """
+    Registers the observation aggregation route.
+    """
+
+    @app.route('/api/observations/aggregate', methods=['GET'])
+    @reads_from_replica
+    def aggregate_observations():
+        """
+        Aggregate observations in the database
+        ---
+        parameters:
+          - name: group_by
+            in: query
+            type: string
+            required: false
+            description: Comma-separated satellite_id, product_id, timezone and one of hour/day/month
+          - name: metrics
+            in: query
+            type: string
+            required: false
+            description: Comma-separated count, min_timestamp, max_timestamp, mean_<band> (default count)
+          - name: satellite_id
+            in: query
+            type: string
+            required: false
+          - name: start_date
+            in: query
+            type: string
+            required: false
+          - name: end_date
+            in: query
+            type: string
+            required: false
+        responses:
+          200:
+            description: One row per group
+          400:
+            description: Unknown group key or metric
+        """
+        db = get_db()
+        group_by = _split(request.args.get('group_by'))
+        metrics = _split(request.args.get('metrics')) or ["count"]
+
+        try:
+            partition_tables = partitions.tables_for_range(
+                db, request.args.get('start_date'), request.args.get('end_date')
+            )
+            statement = build_aggregate(group_by, metrics, request.args, partition_tables)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        try:
+            rows = []
+            for row in db.execute(statement):
+                item = dict(row._mapping)
+                for key, value in item.items():
+                    if isinstance(value, datetime):
+                        item[key] = as_utc_naive(value).isoformat()
+                rows.append(item)
+            return jsonify(rows), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/observations/rollups', methods=['GET'])
+    @reads_from_replica
+    def get_rollups():
+        """
+        Pre-aggregated daily observation counts for dashboards
+        ---
+        parameters:
+          - name: satellite_id
+            in: query
+            type: string
+            required: false
+          - name: product_id
+            in: query
+            type: integer
+            required: false
+          - name: start_date
+            in: query
+            type: string
+            required: false
+            description: First day (YYYY-MM-DD), inclusive
+          - name: end_date
+            in: query
+            type: string
+            required: false
+            description: Last day (YYYY-MM-DD), inclusive
+        responses:
+          200:
+            description: One row per satellite, product and day
+        """
+        db = get_db()
+        try:
+            query = db.query(DailyRollup)
+            satellite_id = request.args.get('satellite_id')
+            product_id = request.args.get('product_id', type=int)
+            start_date = request.args.get('start_date')
+            end_date = request.args.get('end_date')
+
+            if satellite_id:
+                query = query.filter(DailyRollup.satellite_id == satellite_id)
+            if product_id is not None:
+                query = query.filter(DailyRollup.product_id == product_id)
+            if start_date:
+                query = query.filter(DailyRollup.day >= start_date[:10])
+            if end_date:
+                query = query.filter(DailyRollup.day <= end_date[:10])
+
+            rows = query.order_by(DailyRollup.day, DailyRollup.satellite_id, DailyRollup.product_id).all()
+            return jsonify([r.to_dict() for r in rows]), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
@@ -1,10 +1,103 @@
+from collections import defaultdict
 from flask import request, jsonify, g
-from app.routes.observation import ObservationRecord
+from sqlalchemy import select, func, literal
+from werkzeug.datastructures import MultiDict
+from app.db import reads_from_replica
+from app.routes.observation import ObservationRecord, ObservationIndex, parse_spectral_indices
+from app.routes.filtering import build_conditions
+import app.partitions as partitions
+import app.ingest as ingest
+import app.serialization as serialization
+
+# Largest batch accepted by a bulk POST
+MAX_BULK_INSERT = 1000
+
+# Columns a bulk PATCH may set
+BULK_UPDATABLE = ("timestamp", "timezone", "coordinates", "satellite_id", "spectral_indices", "notes", "product_id")
 
 def get_db():
     """Helper to get the current request's DB session"""
     return g.db
 
+def bad_request(message):
+    return jsonify({
+        "error": "Bad Request",
+        "message": message,
+        "code": 400
+    }), 400
+
+def bulk_targets(db, data):
+    """
+    Resolves a bulk request body into [(table, [where clauses])], one entry per
+    table the statement must run against.
+    Accepts {"ids": [...]} or {"filter": {satellite_id, product_id, timezone, start_date, end_date, <band>_min/max}}.
+    Raises ValueError for a missing or empty selector.
+    """
+    ids = data.get("ids")
+    criteria = data.get("filter")
+
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            raise ValueError("'ids' must be a non-empty list of numeric IDs.")
+        try:
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            raise ValueError("IDs must be numeric.")
+        by_partition = defaultdict(list)
+        for obs_id in ids:
+            by_partition[partitions.partition_for_id(obs_id)].append(obs_id)
+        targets = []
+        for key, key_ids in by_partition.items():
+            table = ObservationRecord.__table__ if key is None else partitions.partition_table(key)
+            if key is None or key in partitions.existing_partitions(db):
+                targets.append((table, [table.c.id.in_(key_ids)]))
+        return targets
+
+    if isinstance(criteria, dict):
+        args = MultiDict({k: str(v) for k, v in criteria.items() if v is not None})
+        if not build_conditions(ObservationRecord.__table__.c, args):
+            raise ValueError("'filter' must contain at least one recognised criterion.")
+        tables = [ObservationRecord.__table__] + partitions.tables_for_range(
+            db, args.get("start_date"), args.get("end_date")
+        )
+        return [(t, build_conditions(t.c, args)) for t in tables]
+
+    raise ValueError("Provide either 'ids' or 'filter'.")
+
+def dry_run_requested(data):
+    """
+    The dry_run flag: a JSON boolean in the body or ?dry_run=true.
+    Raises ValueError for any other body value, so "false" is not read as true.
+    """
+    value = data.get("dry_run", False)
+    if not isinstance(value, bool):
+        raise ValueError("'dry_run' must be true or false.")
+    return value or request.args.get("dry_run") == "true"
+
+def moves_partition(db, targets, timestamp):
+    """True if setting `timestamp` would move matching partitioned rows to another month."""
+    month = partitions.table_name(partitions.partition_key(timestamp))
+    return any(
+        table is not ObservationRecord.__table__ and table.name != month and count_matching(db, [(table, conditions)])
+        for table, conditions in targets
+    )
+
+def count_matching(db, targets):
+    return sum(
+        db.execute(select(func.count()).select_from(table).where(*conditions)).scalar()
+        for table, conditions in targets
+    )
+
+def _rewrite_indices(db, table, conditions, spectral_indices):
+    """Replaces the typed index rows of every matching record in two statements per band."""
+    matching_ids = select(table.c.id).where(*conditions)
+    db.execute(ObservationIndex.__table__.delete().where(ObservationIndex.observation_id.in_(matching_ids)))
+    for band, value in parse_spectral_indices(spectral_indices).items():
+        db.execute(ObservationIndex.__table__.insert().from_select(
+            ["observation_id", "band", "value"],
+            select(table.c.id, literal(band), literal(value)).where(*conditions),
+        ))
+
 def register(app):
     """
     Registers GeoScope Bulk Retrieval.
@@ -12,6 +105,7 @@ def register(app):
     """
 
     @app.route("/api/v1/bulk/insights", methods=["GET"])
+    @reads_from_replica
     def get_multiple_insights():
         db = get_db()  # per-request session
 
@@ -38,11 +132,11 @@ def register(app):
 
         # Build successful and failed lists
         found_ids = {r.id for r in records}
-        successful = [r.to_dict() for r in records]
+        successful = [r.to_dict(native=True) for r in records]
         failed = [{"id": i, "error": "Record not found"} for i in id_list if i not in found_ids]
 
         # Return results with metadata
-        return jsonify({
+        return serialization.render({
             "results": successful,
             "metadata": {
                 "total_requested": len(id_list),
@@ -50,4 +144,181 @@ def register(app):
                 "failed_count": len(failed),
                 "failures": failed
             }
-        }), 200
+        })
+
+    @app.route("/api/v1/bulk/observations", methods=["POST"])
+    def bulk_create_observations():
+        """
+        Ingest many observations with one multi-row INSERT (or natural-key upsert)
+        ---
+        parameters:
+          - name: body
+            in: body
+            required: true
+            schema:
+              type: object
+              properties:
+                observations:
+                  type: array
+                  items:
+                    type: object
+        responses:
+          201:
+            description: IDs of the stored observations, in request order
+          400:
+            description: Missing, oversized or invalid batch
+        """
+        db = get_db()
+        try:
+            data = serialization.load_body() or {}
+        except ValueError as e:
+            return bad_request(str(e))
+        observations = data.get("observations") if isinstance(data, dict) else None
+
+        if not isinstance(observations, list) or not observations:
+            return bad_request("'observations' must be a non-empty list.")
+        if len(observations) > MAX_BULK_INSERT:
+            return bad_request(f"At most {MAX_BULK_INSERT} observations per request.")
+        try:
+            rows = [ingest.normalize(o) for o in observations if isinstance(o, dict)]
+        except ValueError as e:
+            return bad_request(str(e))
+        if len(rows) != len(observations):
+            return bad_request("Every observation must be an object.")
+
+        try:
+            ids = ingest.write_rows(db, rows)
+            db.commit()
+            return serialization.render({"ids": ids, "count": len(set(ids))}, 201)
+        except Exception as e:
+            db.rollback()
+            return jsonify({'error': str(e)}), 500
+
+    @app.route("/api/v1/bulk/observations", methods=["PATCH"])
+    def bulk_update_observations():
+        """
+        Update many observations with one UPDATE ... WHERE statement
+        ---
+        parameters:
+          - name: body
+            in: body
+            required: true
+            schema:
+              type: object
+              properties:
+                ids:
+                  type: array
+                  items:
+                    type: integer
+                filter:
+                  type: object
+                set:
+                  type: object
+                dry_run:
+                  type: boolean
+        responses:
+          200:
+            description: Number of matched and updated rows
+          400:
+            description: Missing selector or invalid fields
+          409:
+            description: The new timestamp would move partitioned records to another month
+        """
+        db = get_db()
+        data = request.get_json() or {}
+        values = data.get("set") or {}
+        try:
+            dry_run = dry_run_requested(data)
+        except ValueError as e:
+            return bad_request(str(e))
+
+        if not isinstance(values, dict) or not values:
+            return bad_request("'set' must be an object with at least one field.")
+        unknown = sorted(set(values) - set(BULK_UPDATABLE))
+        if unknown:
+            return bad_request(f"Fields cannot be bulk updated: {', '.join(unknown)}")
+        if values.get("timestamp"):
+            try:
+                values["timestamp"] = ingest.parse_timestamp(values["timestamp"])
+            except ValueError as e:
+                return bad_request(str(e))
+        if "spectral_indices" in values and isinstance(values["spectral_indices"], dict):
+            values["spectral_indices"] = ",".join(
+                f"{band}={v}" for band, v in parse_spectral_indices(values["spectral_indices"]).items()
+            )
+
+        try:
+            targets = bulk_targets(db, data)
+        except ValueError as e:
+            return bad_request(str(e))
+
+        if values.get("timestamp") and moves_partition(db, targets, values["timestamp"]):
+            # Partition ids encode their month, as for a single-record PUT
+            return jsonify({"error": "timestamp would move records to another partition"}), 409
+
+        try:
+            matched = count_matching(db, targets)
+            if dry_run:
+                return jsonify({"matched": matched, "updated": 0, "dry_run": True}), 200
+
+            updated = 0
+            for table, conditions in targets:
+                if "spectral_indices" in values:
+                    _rewrite_indices(db, table, conditions, values["spectral_indices"])
+                updated += db.execute(table.update().where(*conditions).values(**values)).rowcount
+            db.commit()
+            return jsonify({"matched": matched, "updated": updated, "dry_run": False}), 200
+        except Exception as e:
+            db.rollback()
+            return jsonify({'error': str(e)}), 500
+
+    @app.route("/api/v1/bulk/observations", methods=["DELETE"])
+    def bulk_delete_observations():
+        """
+        Delete many observations with one DELETE ... WHERE statement
+        ---
+        parameters:
+          - name: body
+            in: body
+            required: true
+            schema:
+              type: object
+              properties:
+                ids:
+                  type: array
+                  items:
+                    type: integer
+                filter:
+                  type: object
+                dry_run:
+                  type: boolean
+        responses:
+          200:
+            description: Number of matched and deleted rows
+          400:
+            description: Missing selector
+        """
+        db = get_db()
+        data = request.get_json() or {}
+        try:
+            dry_run = dry_run_requested(data)
+            targets = bulk_targets(db, data)
+        except ValueError as e:
+            return bad_request(str(e))
+
+        try:
+            matched = count_matching(db, targets)
+            if dry_run:
+                return jsonify({"matched": matched, "deleted": 0, "dry_run": True}), 200
+
+            deleted = 0
+            for table, conditions in targets:
+                db.execute(ObservationIndex.__table__.delete().where(
+                    ObservationIndex.observation_id.in_(select(table.c.id).where(*conditions))
+                ))
+                deleted += db.execute(table.delete().where(*conditions)).rowcount
+            db.commit()
+            return jsonify({"matched": matched, "deleted": deleted, "dry_run": False}), 200
+        except Exception as e:
+            db.rollback()
+            return jsonify({'error': str(e)}), 500
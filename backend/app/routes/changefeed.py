@@ -0,0 +1,74 @@
+"""
+Long-poll change feed for observations.
+"""
+import time
+from flask import request, jsonify, g
+from app.changes import ObservationChange, signal
+
+MAX_WAIT_SECONDS = 60
+MAX_CHANGES = 1000
+# signal only hears commits from this process; other workers' are picked up by re-querying
+POLL_SECONDS = 1.0
+
+def get_db():
+    """Helper to get the current request's DB session"""
+    return g.db
+
+def register(app):
+    """
+    Registers the observation change-feed route.
+    """
+
+    @app.route('/api/observations/changes', methods=['GET'])
+    def get_changes():
+        """
+        Changes after a sequence number, optionally waiting for new ones
+        ---
+        parameters:
+          - name: since
+            in: query
+            type: integer
+            required: false
+            description: Last sequence number already seen (default 0)
+          - name: wait
+            in: query
+            type: number
+            required: false
+            description: Seconds to block if nothing is new yet (max 60)
+          - name: limit
+            in: query
+            type: integer
+            required: false
+        responses:
+          200:
+            description: Changes in sequence order and the last sequence number
+        """
+        db = get_db()
+        since = request.args.get('since', 0, type=int)
+        wait = min(max(request.args.get('wait', 0, type=float), 0), MAX_WAIT_SECONDS)
+        limit = min(request.args.get('limit', MAX_CHANGES, type=int), MAX_CHANGES)
+        deadline = time.monotonic() + wait
+
+        try:
+            while True:
+                generation = signal.current()
+                changes = (
+                    db.query(ObservationChange)
+                    .filter(ObservationChange.seq > since)
+                    .order_by(ObservationChange.seq)
+                    .limit(limit)
+                    .all()
+                )
+                remaining = deadline - time.monotonic()
+                if changes or remaining <= 0:
+                    break
+                # Hand the connection back to the pool while blocked
+                db.rollback()
+                signal.wait(generation, min(remaining, POLL_SECONDS))
+
+            return jsonify({
+                "changes": [c.to_dict() for c in changes],
+                "last_seq": changes[-1].seq if changes else since,
+            }), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
@@ -0,0 +1,197 @@
+"""
+Bulk export of observations as Apache Arrow IPC or Parquet.
+
+Rows are read from the database in batches of EXPORT_BATCH_ROWS with a
+server-side cursor, converted to one Arrow record batch each and written to
+the response as they are produced, so memory stays bounded however large the
+date range is. pyarrow is only imported when an export is requested.
+"""
+from datetime import timezone
+from flask import request, jsonify, Response
+from sqlalchemy import select
+from app.db import SessionLocal
+from app.routes.observation import ObservationRecord, ObservationIndex, SPECTRAL_BANDS
+from app.routes.filtering import build_conditions
+import app.partitions as partitions
+
+EXPORT_BATCH_ROWS = 50000
+
+FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+def export_schema(pa):
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("timestamp", pa.timestamp("us", tz="UTC")),
+            ("timezone", pa.string()),
+            ("latitude", pa.float64()),
+            ("longitude", pa.float64()),
+            ("satellite_id", pa.string()),
+            ("product_id", pa.int64()),
+            ("notes", pa.string()),
+        ]
+        + [(band, pa.float64()) for band in SPECTRAL_BANDS]
+    )
+
+def parse_coordinates(value):
+    """'34.05, -118.24' -> (34.05, -118.24); (None, None) if unparseable."""
+    try:
+        lat, lon = (float(part) for part in value.split(","))
+        return lat, lon
+    except (AttributeError, ValueError):
+        return None, None
+
+def record_batch(pa, schema, db, rows, matching):
+    """
+    Builds one typed record batch from observation rows (ordered by id) plus
+    their index values. `matching` selects the ids of every row the export's
+    filter matches.
+    """
+    ids = [row.id for row in rows]
+    bands = {band: {} for band in SPECTRAL_BANDS}
+    # The filter within the batch's id range rather than IN (...), which would bind one
+    # parameter per row; a bare id range could span most of the table for a selective filter.
+    batch_ids = matching.where(matching.selected_columns[0].between(ids[0], ids[-1]))
+    for obs_id, band, value in db.execute(
+        select(ObservationIndex.observation_id, ObservationIndex.band, ObservationIndex.value)
+        .where(ObservationIndex.observation_id.in_(batch_ids))
+    ):
+        if band in bands:
+            bands[band][obs_id] = value
+
+    coordinates = [parse_coordinates(row.coordinates) for row in rows]
+    columns = {
+        "id": ids,
+        # Stored timestamps are UTC wall-clock times
+        "timestamp": [
+            row.timestamp.replace(tzinfo=timezone.utc) if row.timestamp and not row.timestamp.tzinfo else row.timestamp
+            for row in rows
+        ],
+        "timezone": [row.timezone for row in rows],
+        "latitude": [lat for lat, _ in coordinates],
+        "longitude": [lon for _, lon in coordinates],
+        "satellite_id": [row.satellite_id for row in rows],
+        "product_id": [row.product_id for row in rows],
+        "notes": [row.notes for row in rows],
+    }
+    for band in SPECTRAL_BANDS:
+        columns[band] = [bands[band].get(obs_id) for obs_id in ids]
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+class _ChunkSink:
+    """Write-only file object whose contents are drained after every batch."""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def iter_batches(pa, schema, db, args):
+    """Yields record batches for every matching row, table by table, ordered by id."""
+    tables = [ObservationRecord.__table__] + partitions.tables_for_range(
+        db, args.get("start_date"), args.get("end_date")
+    )
+    for table in tables:
+        conditions = build_conditions(table.c, args)
+        statement = select(table).where(*conditions).order_by(table.c.id)
+        matching = select(table.c.id).where(*conditions)
+        result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_ROWS))
+        for rows in result.partitions():
+            yield record_batch(pa, schema, db, rows, matching)
+
+def stream_export(fmt, args):
+    """Generator producing the encoded export, one chunk per record batch."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = export_schema(pa)
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    db = SessionLocal()
+    try:
+        for batch in iter_batches(pa, schema, db, args):
+            writer.write_batch(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+        writer.close()
+        yield sink.drain()
+    finally:
+        db.close()
+
+def register(app):
+    """
+    Registers the observation export route.
+    """
+
+    @app.route("/api/v1/export/observations", methods=["GET"])
+    def export_observations():
+        """
+        Stream observations as Arrow IPC or Parquet
+        ---
+        parameters:
+          - name: format
+            in: query
+            type: string
+            enum: [arrow, parquet]
+            required: false
+          - name: start_date
+            in: query
+            type: string
+            required: false
+          - name: end_date
+            in: query
+            type: string
+            required: false
+          - name: satellite_id
+            in: query
+            type: string
+            required: false
+        responses:
+          200:
+            description: Arrow IPC stream or Parquet file
+          400:
+            description: Unknown format or malformed date
+          501:
+            description: pyarrow is not installed
+        """
+        fmt = request.args.get("format", "arrow")
+        if fmt not in FORMATS:
+            return jsonify({"error": f"Unknown format '{fmt}', use arrow or parquet"}), 400
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return jsonify({"error": "Export requires pyarrow, which is not installed"}), 501
+
+        try:
+            build_conditions(ObservationRecord, request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        mimetype, extension = FORMATS[fmt]
+        return Response(
+            stream_export(fmt, request.args.copy()),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f"attachment; filename=observations.{extension}"},
+        )
@@ -1,49 +1,146 @@
 """
 US-09: Filter and Retrieve Geospatial Observation Data
 """
+from datetime import datetime, timezone
 from flask import request, jsonify, g
-from app.routes.observation import ObservationRecord
+from sqlalchemy import select, union_all, literal_column
+from app.db import reads_from_replica
+from app.routes.observation import ObservationRecord, ObservationIndex, SPECTRAL_BANDS
+import app.partitions as partitions
+import app.search as search
+import app.serialization as serialization
 
 def get_db():
     """Helper to get the current request's DB session"""
     return g.db
 
+# Base statement for the plain filter; the conditions vary only in which
+# filters are present, so the compiled forms stay few and cached
+OBSERVATIONS = select(ObservationRecord)
+
+def parse_date_bound(value):
+    """
+    A start_date/end_date parameter as an aware UTC datetime (naive values are
+    UTC). Compared as a datetime, so it works against timestamp columns on
+    every database. Raises ValueError if it is not ISO 8601.
+    """
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', use ISO 8601 (e.g. 2024-10-01 or 2024-10-01T12:00:00Z)")
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+def build_conditions(columns, args):
+    """
+    Turns the filter query parameters into WHERE clauses.
+    `columns` is ObservationRecord or a table's `.c`, so partitioned tables share the same filters.
+    Raises ValueError for a malformed start_date/end_date.
+    """
+    conditions = []
+    satellite_id = args.get('satellite_id')
+    product_id = args.get('product_id', type=int)
+    timezone = args.get('timezone')
+    start_date = args.get('start_date')
+    end_date = args.get('end_date')
+
+    if satellite_id:
+        conditions.append(columns.satellite_id == satellite_id)
+
+    if product_id is not None:
+        conditions.append(columns.product_id == product_id)
+
+    if timezone:
+        conditions.append(columns.timezone == timezone)
+
+    if start_date:
+        conditions.append(columns.timestamp >= parse_date_bound(start_date))
+
+    if end_date:
+        conditions.append(columns.timestamp <= parse_date_bound(end_date))
+
+    # Spectral index ranges, e.g. ndvi_min=0.6&nbr_max=0.1, run against the
+    # (band, value) index on observation_indices
+    for band in SPECTRAL_BANDS:
+        band_min = args.get(f'{band}_min', type=float)
+        band_max = args.get(f'{band}_max', type=float)
+        if band_min is None and band_max is None:
+            continue
+        matching = select(ObservationIndex.observation_id).where(ObservationIndex.band == band)
+        if band_min is not None:
+            matching = matching.where(ObservationIndex.value >= band_min)
+        if band_max is not None:
+            matching = matching.where(ObservationIndex.value <= band_max)
+        conditions.append(columns.id.in_(matching))
+
+    return conditions
+
+def filter_records(db, args, native=False):
+    """
+    Runs the filter described by the query parameters and returns dicts
+    (timestamps as datetimes when native=True, else ISO strings).
+    Shared by the Flask route and the async ASGI variant (via run_sync).
+    Raises NotImplementedError if q= is used on a database without FTS.
+    """
+    # 0. Keyword search: ranked matches from the FTS index, with snippets
+    q = args.get('q')
+    if q:
+        if not search.available(db.get_bind()):
+            raise NotImplementedError('Full-text search is not available on this database')
+        expression = search.match_expression(q)
+        if not expression:
+            return []
+        limit = min(args.get('limit', 100, type=int), 1000)
+        # Each table has its own index; partitions outside the date range are skipped
+        tables = [ObservationRecord.__table__] + partitions.tables_for_range(
+            db, args.get('start_date'), args.get('end_date')
+        )
+        branches = [
+            select(t, search.snippet(t.name).label('snippet'), search.rank(t.name).label('rank'))
+            .join(search.fts(t.name), search.fts(t.name).c.rowid == t.c.id)
+            .where(search.matches(t.name), *build_conditions(t.c, args))
+            for t in tables
+        ]
+        statement = branches[0] if len(branches) == 1 else union_all(*branches)
+        statement = statement.order_by(literal_column('rank')).limit(limit)
+        results = []
+        for row in db.execute(statement, {"fts_query": expression}):
+            values = dict(row._mapping)
+            snip, score = values.pop('snippet'), values.pop('rank')
+            results.append(dict(ObservationRecord(**values).to_dict(native), snippet=snip, rank=score))
+        return results
+
+    # 1. Partitioned layout: only scan the months overlapping the date range
+    if partitions.enabled():
+        results = partitions.filtered_rows(
+            db,
+            lambda columns: build_conditions(columns, args),
+            args.get('start_date'),
+            args.get('end_date'),
+        )
+        return [obs.to_dict(native) for obs in results]
+
+    # 2. Build the query with any filters present in the request
+    statement = OBSERVATIONS.where(*build_conditions(ObservationRecord, args))
+
+    # 3. Execute query and convert results to a list of dictionaries
+    return [obs.to_dict(native) for obs in db.scalars(statement)]
+
 def register(app):
     """
     Registers the filtering routes for US-09.
     """
-    
+
     @app.route('/api/observations/filter', methods=['GET'])
+    @reads_from_replica
     def filter_observations():
         db = get_db()  # use per-request session
         try:
-            # 1. Get query parameters from the URL
-            satellite_id = request.args.get('satellite_id')
-            timezone = request.args.get('timezone')
-            start_date = request.args.get('start_date')
-            end_date = request.args.get('end_date')
-
-            # 2. Start building the query
-            query = db.query(ObservationRecord)
-
-            # 3. Apply filters if they exist in the request
-            if satellite_id:
-                query = query.filter(ObservationRecord.satellite_id == satellite_id)
-            
-            if timezone:
-                query = query.filter(ObservationRecord.timezone == timezone)
-                
-            if start_date:
-                query = query.filter(ObservationRecord.timestamp >= start_date)
-            
-            if end_date:
-                query = query.filter(ObservationRecord.timestamp <= end_date)
-
-            # 4. Execute query and convert results to a list of dictionaries
-            results = query.all()
-            output = [obs.to_dict() for obs in results]
-
-            return jsonify(output), 200
-
+            return serialization.render(filter_records(db, request.args, native=True))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except NotImplementedError as e:
+            return jsonify({'error': str(e)}), 501
         except Exception as e:
             return jsonify({'error': str(e)}), 500
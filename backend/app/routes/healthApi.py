@@ -2,6 +2,7 @@
 US-05: Basic API Health Endpoints
 """
 from flask import jsonify
+import app.statement_cache as statement_cache
 
 def register(app):
     """
@@ -14,4 +15,15 @@ def register(app):
 
     @app.route('/health')
     def health():
-        return jsonify({"status": "ok"})
\ No newline at end of file
+        return jsonify({"status": "ok"})
+
+    @app.route('/health/statement-cache')
+    def statement_cache_stats():
+        """
+        SQL compilation cache outcomes since startup
+        ---
+        responses:
+          200:
+            description: Executions per cache outcome (hit, miss, ...) and the hit rate
+        """
+        return jsonify(statement_cache.stats.snapshot())
@@ -1,7 +1,53 @@
 from flask import request, jsonify, g
 from datetime import datetime, timezone
-from sqlalchemy import Column, String, DateTime, Integer, Text
-from app.db import Base
+import json
+import re
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger, Boolean, Text, Float, Index, text, select, bindparam
+from sqlalchemy.orm import relationship, validates
+from app.db import Base, reads_from_replica
+
+# Declared band schema for spectral_indices. Values for these bands are stored
+# as typed rows in observation_indices so they can be filtered in SQL.
+SPECTRAL_BANDS = ("ndvi", "nbr", "ndwi", "evi", "savi", "ndbi")
+
+def parse_spectral_indices(value):
+    """
+    Parses spectral index input into {band: float} for the declared bands.
+    Accepts a dict, a JSON object string, or text like "NDVI:0.71, NBR=0.2".
+    """
+    if value is None or value == "":
+        return {}
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = dict(re.findall(r"([A-Za-z0-9_]+)\s*[:=]\s*([-+0-9.eE]+)", value))
+    if not isinstance(value, dict):
+        return {}
+
+    parsed = {}
+    for band, number in value.items():
+        band = str(band).strip().lower()
+        if band not in SPECTRAL_BANDS:
+            continue
+        try:
+            parsed[band] = float(number)
+        except (TypeError, ValueError):
+            continue
+    return parsed
+
+# Observation ids: partitioned ids (YYYYMM * 10**9 + n) need 64 bits. SQLite's
+# INTEGER already is; it must stay INTEGER there to remain the rowid alias.
+ObservationId = Integer().with_variant(BigInteger, "postgresql")
+
+def as_utc_naive(value):
+    """
+    Stored timestamps are UTC. PostgreSQL hands them back aware and SQLite
+    naive; API output uses the naive form on both.
+    """
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
 
 class Product(Base):
     __tablename__ = "products"
@@ -25,53 +71,97 @@ class Subscription(Base):
     id = Column(Integer, primary_key=True)
     user_id = Column(String(100), nullable=False)
     product_id = Column(Integer, nullable=False)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     
     def to_dict(self):
         return {
             "id": self.id,
             "user_id": self.user_id,
             "product_id": self.product_id,
-            "created_at": self.created_at.isoformat() if self.created_at else None
+            "created_at": as_utc_naive(self.created_at).isoformat() if self.created_at else None
         }
 
 class ObservationRecord(Base):
     __tablename__ = "observations"
 
-    id = Column(Integer, primary_key=True)
-    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    id = Column(ObservationId, primary_key=True)
+    timestamp = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     timezone = Column(String(50))
     coordinates = Column(String(255))
     satellite_id = Column(String(100))
-    spectral_indices = Column(String(500))
+    spectral_indices = Column(String(500))  # Raw client text, kept for compatibility
     notes = Column(Text)
     product_id = Column(Integer, nullable=True)
 
-    def to_dict(self):
+    # No foreign key: index rows also belong to ids living in partition tables
+    indices = relationship(
+        "ObservationIndex",
+        primaryjoin="ObservationRecord.id == foreign(ObservationIndex.observation_id)",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+    )
+
+    @validates("spectral_indices")
+    def _sync_indices(self, key, value):
+        """Keeps the typed observation_indices rows in step with the text field."""
+        parsed = parse_spectral_indices(value)
+        self.indices = [ObservationIndex(band=band, value=v) for band, v in parsed.items()]
+        if isinstance(value, dict):
+            value = ",".join(f"{band}={v}" for band, v in parsed.items())
+        return value
+
+    def to_dict(self, native=False):
+        """native=True keeps timestamp a datetime for app.serialization to encode."""
+        timestamp = as_utc_naive(self.timestamp)
         return {
             "id": self.id,
-            "timestamp": self.timestamp.isoformat() if self.timestamp else None,
+            "timestamp": timestamp if native or not timestamp else timestamp.isoformat(),
             "timezone": self.timezone,
             "coordinates": self.coordinates,
             "satellite_id": self.satellite_id,
             "spectral_indices": self.spectral_indices,
+            "indices": {i.band: i.value for i in self.indices},
             "notes": self.notes,
             "product_id": self.product_id,
         }
 
+class ObservationIndex(Base):
+    """One typed spectral index value (e.g. ndvi=0.71) for an observation."""
+    __tablename__ = "observation_indices"
+
+    observation_id = Column(ObservationId, primary_key=True)  # observations.id or a partition table's id
+    band = Column(String(20), primary_key=True)
+    value = Column(Float, nullable=False)
+
+    # Covers "band between x and y" filters without touching the table
+    __table_args__ = (Index("ix_observation_indices_band_value", "band", "value", "observation_id"),)
+
+def normalize_email(email):
+    """Canonical form used for lookups: trimmed and lower-cased."""
+    return email.strip().lower() if isinstance(email, str) else email
+
 class User(Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True)
     email = Column(String(120), unique=True, nullable=False)
+    email_normalized = Column(String(120)) # normalize_email(email), set by the validator below
     password = Column(String(255), nullable=True)  # Nullable for OAuth users
     first_name = Column(String(100))
     last_name = Column(String(100))
     otp_secret = Column(String(100), nullable=True)
-    is_2fa_enabled = Column(Integer, default=0) # SQLite doesn't have Boolean, use Integer (0/1)
-    is_verified = Column(Integer, default=0) # Email verification status
-    otp_code = Column(String(10), nullable=True) # Current OTP
-    otp_created_at = Column(DateTime, nullable=True) # OTP timestamp
+    is_2fa_enabled = Column(Boolean, default=False) # Stored as INTEGER 0/1 on SQLite
+    is_verified = Column(Boolean, default=False) # Email verification status
+    # Pending email OTPs live in app.otp_store; older databases keep unused otp_code/otp_created_at columns
+    token_version = Column(Integer, nullable=False, default=0, server_default=text("0")) # Bumped when entitlements change
+
+    # Case-insensitive uniqueness and lookups
+    __table_args__ = (Index("ux_users_email_normalized", "email_normalized", unique=True),)
+
+    @validates("email")
+    def _normalize_email(self, key, value):
+        self.email_normalized = normalize_email(value)
+        return value
 
     def to_dict(self):
         return {
@@ -83,65 +173,109 @@ class User(Base):
             "is_verified": bool(self.is_verified)
         }
 
-from flask_jwt_extended import jwt_required, get_jwt_identity
+# Hot-path statements, built once at import; SQLAlchemy then reuses their
+# compiled form from the statement cache (see app.statement_cache)
+# Ordered so that databases still holding case-duplicate emails (see
+# migrations.add_missing_indexes) always resolve to the oldest account
+USER_BY_EMAIL = select(User).where(User.email_normalized == bindparam("email")).order_by(User.id).limit(1)
+ALL_PRODUCTS = select(Product)
+ALL_SUBSCRIPTIONS = select(Subscription)
+SUBSCRIPTIONS_BY_USER = select(Subscription).where(Subscription.user_id == bindparam("user_id"))
+
+def find_user(db, email):
+    """The user with this email, ignoring case and surrounding spaces, or None."""
+    return db.scalars(USER_BY_EMAIL, {"email": normalize_email(email)}).first()
+
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 
 def get_db():
     """Helper to get the current request's DB session"""
     return g.db
 
 def register(app):
+    import app.partitions as partitions
+    import app.ingest as ingest
+    import app.serialization as serialization
+    import app.entitlements as entitlements
+    from app.idempotency import idempotent
+
     @app.route("/api/observations", methods=["POST"])
+    @idempotent
     def create_obs():
         db = get_db()
-        data = request.get_json() or {}
+        try:
+            row = ingest.normalize(serialization.load_body() or {})
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        # Convert ISO 8601 timestamp string to datetime
-        if "timestamp" in data and data["timestamp"]:
-            data["timestamp"] = datetime.fromisoformat(
-                data["timestamp"].replace("Z", "+00:00")
-            )
-
-        new_obs = ObservationRecord(**data)
-        db.add(new_obs)
+        # One INSERT (or natural-key upsert) ... RETURNING id
+        obs_id = ingest.write_rows(db, [row])[0]
         db.commit()
-        db.refresh(new_obs)  # ensure ORM maps back the ID
-        return jsonify({"id": new_obs.id}), 201
+        return serialization.render({"id": obs_id}, 201)
 
     @app.route("/api/observations/<int:obs_id>", methods=["GET"])
+    @reads_from_replica
     @jwt_required()
     def get_obs(obs_id):
         current_user = get_jwt_identity()
         db = get_db()
-        obs = db.get(ObservationRecord, obs_id)
+        obs = partitions.get(db, obs_id)
         if not obs:
             return jsonify({"error": "Not found"}), 404
         
-        # Access control: check if user has subscription for the product
+        # Access control: the token's entitlement claims, or a subscription lookup
         if obs.product_id:
-            sub = db.query(Subscription).filter(
-                Subscription.user_id == current_user,
-                Subscription.product_id == obs.product_id
-            ).first()
-            if not sub:
+            if not entitlements.allows(db, get_jwt(), current_user, obs.product_id):
                 return jsonify({"error": "Forbidden: Subscription required"}), 403
 
-        return jsonify(obs.to_dict())
+        return serialization.render(obs.to_dict(native=True))
 
     @app.route("/api/observations/<int:obs_id>", methods=["PUT"])
     def update_obs(obs_id):
         db = get_db()
+        try:
+            data = serialization.load_body() or {}
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected an object"}), 400
+
+        # "indices" is the typed view of spectral_indices that GET returns
+        if "indices" in data:
+            data.setdefault("spectral_indices", data.pop("indices"))
+        unknown = sorted(set(data) - set(ingest.INSERTABLE))
+        if unknown:
+            return jsonify({"error": f"Fields cannot be updated: {', '.join(unknown)}"}), 400
+        if data.get("timestamp") is not None:
+            try:
+                data["timestamp"] = ingest.parse_timestamp(data["timestamp"])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        if isinstance(data.get("spectral_indices"), dict):
+            data["spectral_indices"] = ",".join(
+                f"{band}={v}" for band, v in parse_spectral_indices(data["spectral_indices"]).items()
+            )
+
+        if partitions.partition_for_id(obs_id) is not None:
+            try:
+                updated = partitions.update(db, obs_id, data)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 409
+            if not updated:
+                return jsonify({"error": "Not found"}), 404
+            db.commit()
+            return jsonify({"message": "Updated"}), 200
+
         obs = db.get(ObservationRecord, obs_id)
         
         if not obs:
             return jsonify({"error": "Not found"}), 404
 
         # US-11 logic (Quarterly Lock) removed as per descoping
-        data = request.get_json() or {}
         
         # Update fields dynamically
         for key, value in data.items():
-            if hasattr(obs, key):
-                setattr(obs, key, value)
+            setattr(obs, key, value)
 
         db.commit()
         return jsonify({"message": "Updated"}), 200
@@ -163,6 +297,12 @@ def register(app):
             description: Not found
         """
         db = get_db()
+        if partitions.partition_for_id(obs_id) is not None:
+            if not partitions.delete(db, obs_id):
+                return jsonify({"error": "Not found"}), 404
+            db.commit()
+            return jsonify({"message": "Deleted"}), 200
+
         obs = db.get(ObservationRecord, obs_id)
         if not obs:
             return jsonify({"error": "Not found"}), 404
@@ -172,6 +312,7 @@ def register(app):
         return jsonify({"message": "Deleted"}), 200
 
     @app.route("/api/products", methods=["GET"])
+    @reads_from_replica
     def get_products():
         """
         Get all available products
@@ -181,10 +322,11 @@ def register(app):
             description: A list of products
         """
         db = get_db()
-        products = db.query(Product).all()
+        products = db.scalars(ALL_PRODUCTS)
         return jsonify([p.to_dict() for p in products])
 
     @app.route("/api/subscriptions", methods=["GET"])
+    @reads_from_replica
     def get_subscriptions():
         """
         Get user subscriptions
@@ -201,9 +343,9 @@ def register(app):
         user_id = request.args.get("user_id")
         db = get_db()
         if user_id:
-            subs = db.query(Subscription).filter(Subscription.user_id == user_id).all()
+            subs = db.scalars(SUBSCRIPTIONS_BY_USER, {"user_id": user_id})
         else:
-            subs = db.query(Subscription).all()
+            subs = db.scalars(ALL_SUBSCRIPTIONS)
         return jsonify([s.to_dict() for s in subs])
 
     @app.route("/api/subscriptions", methods=["POST"])
@@ -218,6 +360,36 @@ def register(app):
             product_id=data["product_id"]
         )
         db.add(new_sub)
+        # Tokens issued before this change carry stale entitlement claims
+        entitlements.bump_version(db, new_sub.user_id)
         db.commit()
+        entitlements.versions.invalidate(new_sub.user_id)
         db.refresh(new_sub)
         return jsonify(new_sub.to_dict()), 201
+
+    @app.route("/api/subscriptions/<int:sub_id>", methods=["DELETE"])
+    def delete_subscription(sub_id):
+        """
+        Cancel a subscription
+        ---
+        parameters:
+          - name: sub_id
+            in: path
+            type: integer
+            required: true
+        responses:
+          200:
+            description: Subscription cancelled
+          404:
+            description: Subscription not found
+        """
+        db = get_db()
+        sub = db.get(Subscription, sub_id)
+        if not sub:
+            return jsonify({"error": "Not found"}), 404
+        db.delete(sub)
+        # Tokens issued while it existed still list the product in their claims
+        entitlements.bump_version(db, sub.user_id)
+        db.commit()
+        entitlements.versions.invalidate(sub.user_id)
+        return jsonify({"message": "Deleted"}), 200
@@ -0,0 +1,137 @@
+"""
+Server-Sent Events stream of new observations per product subscription.
+
+A single dispatcher thread per process tails the observation change feed and
+publishes each newly inserted record to the in-process broker, which fans it
+out to the connected clients subscribed to that product. The dispatcher only
+runs once a client has connected, and it also sees inserts committed by other
+workers (within POLL_SECONDS).
+"""
+import json
+import logging
+import threading
+from flask import Response, jsonify, g
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.db import SessionLocal
+from app.changes import ObservationChange, signal
+from app.pubsub import broker
+from app.routes.observation import ObservationRecord
+import app.partitions as partitions
+import app.entitlements as entitlements
+
+POLL_SECONDS = 1.0
+HEARTBEAT_SECONDS = 15
+BATCH_SIZE = 500
+
+def get_db():
+    """Helper to get the current request's DB session"""
+    return g.db
+
+class InsertDispatcher:
+    """Publishes inserted observations from the change feed to the broker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.last_seq = None
+
+    def ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="observation-dispatcher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        db = SessionLocal()
+        try:
+            if self.last_seq is None:
+                latest = db.query(ObservationChange.seq).order_by(ObservationChange.seq.desc()).first()
+                self.last_seq = latest[0] if latest else 0
+            while True:
+                generation = signal.current()
+                try:
+                    published = self.dispatch_once(db)
+                except Exception:
+                    logging.getLogger(__name__).exception("Observation dispatcher failed; retrying")
+                    published = 0
+                db.rollback()
+                if not published:
+                    signal.wait(generation, POLL_SECONDS)
+        finally:
+            db.close()
+
+    def dispatch_once(self, db):
+        """Publishes one batch of new inserts. Returns the number of changes read."""
+        changes = (
+            db.query(ObservationChange)
+            .filter(ObservationChange.seq > self.last_seq)
+            .order_by(ObservationChange.seq)
+            .limit(BATCH_SIZE)
+            .all()
+        )
+        if not changes:
+            return 0
+
+        inserted = {c.observation_id: c.seq for c in changes if c.op == "insert"}
+        plain_ids = [i for i in inserted if partitions.partition_for_id(i) is None]
+        records = db.query(ObservationRecord).filter(ObservationRecord.id.in_(plain_ids)).all() if plain_ids else []
+        records += [r for r in (partitions.get(db, i) for i in inserted if i not in plain_ids) if r]
+
+        for record in sorted(records, key=lambda r: inserted[r.id]):
+            if record.product_id is not None:
+                broker.publish(record.product_id, (inserted[record.id], record.to_dict()))
+        self.last_seq = changes[-1].seq
+        return len(changes)
+
+dispatcher = InsertDispatcher()
+
+def format_event(seq, payload, event="observation"):
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def register(app):
+    """
+    Registers the observation SSE stream.
+    """
+
+    @app.route('/api/observations/stream', methods=['GET'])
+    @jwt_required()
+    def stream_observations():
+        """
+        Stream new observations for the caller's subscribed products (text/event-stream)
+        ---
+        responses:
+          200:
+            description: Server-Sent Events, one "observation" event per new record
+          403:
+            description: No product subscriptions
+        """
+        current_user = get_jwt_identity()
+        db = get_db()
+        product_ids = entitlements.entitled_products(db, current_user)
+        if not product_ids:
+            return jsonify({"error": "Forbidden: Subscription required"}), 403
+
+        subscriber = broker.subscribe(product_ids)
+        dispatcher.ensure_started()
+
+        def events():
+            reported_drops = 0
+            try:
+                yield f"retry: 3000\n: subscribed to products {sorted(product_ids)}\n\n"
+                while True:
+                    item = subscriber.get(timeout=HEARTBEAT_SECONDS)
+                    if subscriber.dropped != reported_drops:
+                        reported_drops = subscriber.dropped
+                        yield format_event(0, {"dropped": reported_drops}, event="lagged")
+                    if item is None:
+                        yield ": keep-alive\n\n"
+                        continue
+                    seq, payload = item
+                    yield format_event(seq, payload)
+            finally:
+                broker.unsubscribe(subscriber)
+
+        return Response(events(), mimetype="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
@@ -0,0 +1,91 @@
+"""
+Full-text search over observation notes.
+
+Every observation table (`observations` and each monthly partition) has an
+SQLite FTS5 external-content index over its notes and satellite_id, named
+<table>_fts: the text lives only in the table, and triggers keep the index in
+step with every insert, update and delete.
+"""
+from sqlalchemy import table, column, literal_column, text
+
+def fts_name(table_name):
+    return f"{table_name}_fts"
+
+def fts(table_name):
+    return table(fts_name(table_name), column("rowid"))
+
+def rank(table_name):
+    return literal_column(f"bm25({fts_name(table_name)})")
+
+def snippet(table_name):
+    return literal_column(f"snippet({fts_name(table_name)}, 0, '[', ']', '...', 12)")
+
+def trigger_ddl(table_name):
+    """CREATE TRIGGER statements keeping <table>_fts in step with `table_name`."""
+    index = fts_name(table_name)
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table_name} BEGIN
+            INSERT INTO {index} (rowid, notes, satellite_id) VALUES (NEW.id, NEW.notes, NEW.satellite_id);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table_name} BEGIN
+            INSERT INTO {index} ({index}, rowid, notes, satellite_id)
+            VALUES ('delete', OLD.id, OLD.notes, OLD.satellite_id);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF notes, satellite_id ON {table_name} BEGIN
+            INSERT INTO {index} ({index}, rowid, notes, satellite_id)
+            VALUES ('delete', OLD.id, OLD.notes, OLD.satellite_id);
+            INSERT INTO {index} (rowid, notes, satellite_id) VALUES (NEW.id, NEW.notes, NEW.satellite_id);
+        END""",
+    ]
+
+def available(engine):
+    return engine.dialect.name == "sqlite"
+
+def match_expression(q):
+    """
+    Turns free text into an FTS5 query: every word must match, as a literal
+    phrase, so user input can't produce FTS syntax errors. A trailing * keeps
+    prefix search ("therm*").
+    """
+    terms = []
+    for word in q.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', "")
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+def matches(table_name):
+    """WHERE clause for a search of `table_name`; bind the expression as :fts_query."""
+    return text(f"{fts_name(table_name)} MATCH :fts_query")
+
+def install_index(conn, table_name):
+    """
+    Creates the FTS index of `table_name` and its triggers. When the triggers
+    were missing (new or recreated table) the index is rebuilt from the table.
+    """
+    index = fts_name(table_name)
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+        f"notes, satellite_id, content='{table_name}', content_rowid='id')"
+    ))
+    existing = conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name = :name"), {"name": f"{index}_insert"}
+    ).first()
+    for statement in trigger_ddl(table_name):
+        conn.execute(text(statement))
+    if not existing:
+        conn.execute(text(f"INSERT INTO {index} ({index}) VALUES ('rebuild')"))
+
+def drop_index(conn, table_name):
+    """Drops the FTS index of a table about to be dropped (its triggers go with the table)."""
+    conn.execute(text(f"DROP TABLE IF EXISTS {fts_name(table_name)}"))
+
+def install(engine):
+    """Creates the FTS indexes and triggers of every observation table on startup."""
+    if not available(engine):
+        return
+    import app.ingest as ingest
+    with engine.begin() as conn:
+        for table_name in ingest.observation_tables(conn):
+            install_index(conn, table_name)
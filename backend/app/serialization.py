@@ -0,0 +1,62 @@
+"""
+Response/request body formats for observation endpoints.
+
+Browsers get JSON; machine clients can send and receive MessagePack by using
+`Content-Type: application/msgpack` / `Accept: application/msgpack`. Both
+formats render the same payloads: routes hand over dicts with native datetime
+values, which become ISO 8601 strings in JSON and MessagePack Timestamp
+extension values (no string formatting or parsing) in MessagePack. Stored
+timestamps without a zone are UTC.
+"""
+from datetime import datetime, timezone
+import msgpack
+from flask import request, current_app, Response
+
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+JSON_MIMETYPE = "application/json"
+
+def _utc(value):
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return current_app.json.default(value)
+
+def _msgpack_default(value):
+    if isinstance(value, datetime):
+        return msgpack.Timestamp.from_datetime(_utc(value))
+    raise TypeError(f"Object of type {type(value).__name__} is not MessagePack serializable")
+
+def dumps_json(payload):
+    return current_app.json.dumps(payload, default=_json_default)
+
+def dumps_msgpack(payload):
+    return msgpack.packb(payload, default=_msgpack_default)
+
+def loads_msgpack(data):
+    """Decodes a MessagePack body; Timestamp values come back as aware datetimes."""
+    return msgpack.unpackb(data, timestamp=3)
+
+def wants_msgpack():
+    """True when the Accept header prefers MessagePack over JSON."""
+    best = request.accept_mimetypes.best_match((JSON_MIMETYPE,) + MSGPACK_MIMETYPES)
+    return best in MSGPACK_MIMETYPES
+
+def render(payload, status=200):
+    """Response in the negotiated format."""
+    if wants_msgpack():
+        return Response(dumps_msgpack(payload), status=status, mimetype=MSGPACK_MIMETYPES[0])
+    return Response(dumps_json(payload) + "\n", status=status, mimetype=JSON_MIMETYPE)
+
+def load_body():
+    """
+    Request body as Python data, from MessagePack or JSON depending on
+    Content-Type. Raises ValueError for an undecodable MessagePack body.
+    """
+    if request.mimetype in MSGPACK_MIMETYPES:
+        try:
+            return loads_msgpack(request.get_data())
+        except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError, ValueError) as e:
+            raise ValueError(f"Invalid MessagePack body: {e}")
+    return request.get_json()
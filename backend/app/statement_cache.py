@@ -0,0 +1,53 @@
+"""
+SQL compilation cache instrumentation.
+
+SQLAlchemy compiles a statement once per distinct structure and reuses the
+compiled form for later executions with different bound values. That only
+pays off if hot routes build the same structure every time, which is why
+their queries are module-level select() constructs with bindparam()s. This
+counts every execution by its cache outcome (ExecutionContext.cache_hit) so
+a regression shows up as a falling hit rate on GET /health/statement-cache.
+"""
+import threading
+from sqlalchemy import event
+from sqlalchemy.engine import default
+
+OUTCOMES = {
+    default.CACHE_HIT: "hit",
+    default.CACHE_MISS: "miss",
+    default.CACHING_DISABLED: "disabled",
+    default.NO_CACHE_KEY: "no_key",
+    default.NO_DIALECT_SUPPORT: "unsupported",
+}
+
+class StatementCacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(OUTCOMES.values(), 0)
+
+    def record(self, outcome):
+        with self._lock:
+            self._counts[OUTCOMES.get(outcome, "no_key")] += 1
+
+    def snapshot(self):
+        """Counts per outcome plus hit_rate over the cacheable (hit or miss) executions."""
+        with self._lock:
+            counts = dict(self._counts)
+        cacheable = counts["hit"] + counts["miss"]
+        counts["hit_rate"] = round(counts["hit"] / cacheable, 4) if cacheable else None
+        return counts
+
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(OUTCOMES.values(), 0)
+
+stats = StatementCacheStats()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        stats.record(context.cache_hit)
+
+def install(engine):
+    """Starts counting cache outcomes for `engine` (a sync Engine; pass async_engine.sync_engine)."""
+    if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
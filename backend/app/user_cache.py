@@ -0,0 +1,63 @@
+"""
+Per-process cache of user profiles keyed by JWT identity (email).
+
+Token validation and profile reads hit `users` on every request; this keeps
+the serialized profile (User.to_dict()) for USER_CACHE_TTL_SECONDS. Routes
+that change a user call invalidate(email) after committing. Other processes
+only see the change once their entry expires, so the TTL is kept short.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from app.routes.observation import find_user
+
+class UserCache:
+    def __init__(self, ttl_seconds=30, max_entries=10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, email):
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None or entry[0] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(email)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, email, profile):
+        with self._lock:
+            self._entries[email] = (time.monotonic() + self.ttl_seconds, profile)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, email):
+        with self._lock:
+            self._entries.pop(email, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+cache = UserCache(
+    ttl_seconds=float(os.getenv("USER_CACHE_TTL_SECONDS", "30")),
+    max_entries=int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000")),
+)
+
+def get_profile(db, email):
+    """User.to_dict() for `email` from the cache, loading it on a miss; None if no such user."""
+    profile = cache.get(email)
+    if profile is None:
+        user = find_user(db, email)
+        if user is None:
+            return None
+        profile = user.to_dict()
+        cache.put(email, profile)
+    return profile
@@ -0,0 +1,3 @@
+from app.asgi import get_asgi_app
+
+app = get_asgi_app()
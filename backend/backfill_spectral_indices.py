@@ -0,0 +1,29 @@
+"""
+Populates observation_indices from the legacy spectral_indices text column.
+Safe to re-run: each record's typed rows are rebuilt from its text.
+"""
+from app.db import SessionLocal, Base, engine
+from app.routes.observation import ObservationRecord
+
+def backfill_spectral_indices(batch_size=1000):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        count = 0
+        query = db.query(ObservationRecord).filter(ObservationRecord.spectral_indices.isnot(None))
+        for obs in query.yield_per(batch_size):
+            # Re-assigning the text re-runs the parser that fills obs.indices
+            obs.spectral_indices = obs.spectral_indices
+            count += 1
+            if count % batch_size == 0:
+                db.flush()
+        db.commit()
+        print(f"Backfilled spectral indices for {count} observation(s).")
+    except Exception as e:
+        db.rollback()
+        print(f"Error backfilling spectral indices: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    backfill_spectral_indices()
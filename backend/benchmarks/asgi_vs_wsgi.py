@@ -0,0 +1,153 @@
+"""
+Load-test harness: WSGI (gunicorn) vs ASGI (uvicorn) read routes.
+
+Starts each deployment as a subprocess, holds N concurrent keep-alive
+connections against GET /api/observations/filter for a fixed duration and
+reports throughput, latency percentiles and server memory per connection
+(RSS growth under load divided by the number of connections).
+
+Usage (from backend/):
+    python benchmarks/asgi_vs_wsgi.py --concurrency 1000 --duration 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def process_tree_rss_kb(pid):
+    """Resident memory of a process and its children, from /proc (Linux only)."""
+    total = 0
+    pids = [pid]
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pids.extend(int(child) for child in f.read().split())
+        except FileNotFoundError:
+            continue
+    return total
+
+
+async def wait_until_up(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+async def drive(base_url, path, concurrency, duration):
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        stop_at = time.monotonic() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.monotonic() < stop_at:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_target(name, command, port, args):
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_until_up(base_url))
+        idle_rss = process_tree_rss_kb(server.pid)
+
+        started = time.monotonic()
+        latencies, errors = asyncio.run(drive(base_url, args.path, args.concurrency, args.duration))
+        elapsed = time.monotonic() - started
+        loaded_rss = process_tree_rss_kb(server.pid)
+
+        return {
+            "target": name,
+            "command": " ".join(command),
+            "concurrency": args.concurrency,
+            "requests": len(latencies),
+            "errors": errors,
+            "rps": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+            "idle_rss_kb": idle_rss,
+            "loaded_rss_kb": loaded_rss,
+            "rss_per_connection_kb": round((loaded_rss - idle_rss) / args.concurrency, 2),
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--path", default="/api/observations/filter?satellite_id=SENTINEL-2")
+    parser.add_argument("--wsgi-workers", type=int, default=2)
+    parser.add_argument("--wsgi-threads", type=int, default=32)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    # Plain HTTP and no rate limits, or the WSGI side just measures 302s/429s
+    os.environ.update({"FLASK_TESTING": "True", "RATELIMIT_ENABLED": "False"})
+
+    report = [
+        run_target("wsgi", [
+            # --preload builds the app (and runs create_all) once, before forking workers
+            sys.executable, "-m", "gunicorn", "wsgi:app", "--preload", "--bind", "127.0.0.1:5101",
+            "--workers", str(args.wsgi_workers), "--threads", str(args.wsgi_threads),
+        ], 5101, args),
+        run_target("asgi", [
+            sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", "5102",
+            "--log-level", "warning",
+        ], 5102, args),
+    ]
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
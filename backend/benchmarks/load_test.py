@@ -0,0 +1,271 @@
+"""
+Mixed-workload load test for the WSGI app.
+
+Seeds a scratch database with N observations (reused on later runs), starts
+the app under gunicorn against it and drives a weighted mix of scenarios from
+C concurrent keep-alive clients for a fixed duration:
+
+  ingest  POST /api/observations
+  filter  GET  /api/observations/filter, one satellite over one day
+  get     GET  /api/observations/<id> with a bearer token
+  bulk    GET  /api/v1/bulk/insights for 50 ids
+  login   POST /login then POST /verify-login-otp (testuser@geoscope.com;
+          logins of that one account are serialised, so their latency
+          includes waiting for each other)
+
+Reports requests, errors, RPS and p50/p95/p99 latency per scenario and
+overall as JSON, tagged with the current git commit so runs can be compared.
+The random streams are seeded, so two runs issue the same request sequence
+per client.
+
+Usage (from backend/):
+    python benchmarks/load_test.py --observations 1000000 --concurrency 64 --duration 60
+    python benchmarks/load_test.py --mix ingest=1,get=4 --output before.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+import httpx
+from asgi_vs_wsgi import BACKEND_DIR, percentile, wait_until_up
+
+sys.path.insert(0, BACKEND_DIR)
+
+SATELLITES = ("SENTINEL-1", "SENTINEL-2", "LANDSAT-8", "LANDSAT-9", "SPOT-7", "MODIS-TERRA", "MODIS-AQUA", "PLEIADES")
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+SPAN_DAYS = 730
+TEST_USER = "testuser@geoscope.com"
+TEST_PASSWORD = "password123"
+TEST_OTP = "123456"  # Fixed login code for the test user (see /login)
+DEFAULT_MIX = "ingest=2,filter=3,get=4,bulk=1,login=1"
+SEED_BATCH = 5000
+
+
+def observation(rng):
+    return {
+        "timestamp": (START + timedelta(seconds=rng.randrange(SPAN_DAYS * 86400))).isoformat(),
+        "timezone": "UTC",
+        "coordinates": f"{rng.uniform(-90, 90):.5f}, {rng.uniform(-180, 180):.5f}",
+        "satellite_id": rng.choice(SATELLITES),
+        "spectral_indices": f"ndvi={rng.uniform(-1, 1):.3f},nbr={rng.uniform(-1, 1):.3f}",
+        "notes": "Load test pass",
+        "product_id": rng.randint(1, 4),
+    }
+
+
+def seed(count):
+    """Fills DATABASE_URL up to `count` observations and subscribes the test user to every product."""
+    from run import get_app
+    from app.db import SessionLocal
+    from app.routes.observation import ObservationRecord, Subscription
+    import app.ingest as ingest
+    from seed_test_user import seed_test_user
+
+    get_app()  # Schema, triggers and the seed products
+    with contextlib.redirect_stdout(sys.stderr):
+        seed_test_user()
+    db = SessionLocal()
+    try:
+        for product_id in (2, 3, 4):
+            if not db.query(Subscription).filter_by(user_id=TEST_USER, product_id=product_id).first():
+                db.add(Subscription(user_id=TEST_USER, product_id=product_id))
+        db.commit()
+
+        existing = initial = db.query(ObservationRecord).count()
+        rng = random.Random(existing)
+        started = time.monotonic()
+        while existing < count:
+            batch = [ingest.normalize(observation(rng)) for _ in range(min(SEED_BATCH, count - existing))]
+            ingest.write_rows(db, batch)
+            db.commit()
+            existing += len(batch)
+            print(f"seeded {existing}/{count}", file=sys.stderr, end="\r")
+        if existing > initial:
+            print(f"\nseeded in {time.monotonic() - started:.1f}s", file=sys.stderr)
+        return existing
+    finally:
+        db.close()
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def ingest_scenario(client, rng, ctx):
+    response = await client.post("/api/observations", json=observation(rng))
+    return response.status_code == 201
+
+
+async def filter_scenario(client, rng, ctx):
+    day = START + timedelta(days=rng.randrange(SPAN_DAYS))
+    response = await client.get("/api/observations/filter", params={
+        "satellite_id": rng.choice(SATELLITES),
+        "start_date": day.date().isoformat(),
+        "end_date": (day + timedelta(days=1)).date().isoformat(),
+    })
+    return response.status_code == 200
+
+
+async def get_scenario(client, rng, ctx):
+    response = await client.get(f"/api/observations/{rng.randint(1, ctx['max_id'])}", headers=ctx["auth"])
+    return response.status_code in (200, 404)  # 404: id deleted or never written
+
+
+async def bulk_scenario(client, rng, ctx):
+    ids = ",".join(str(rng.randint(1, ctx["max_id"])) for _ in range(50))
+    response = await client.get("/api/v1/bulk/insights", params={"ids": ids})
+    return response.status_code == 200
+
+
+async def login_scenario(client, rng, ctx):
+    # One pending login code per account, so logins of the shared test user take turns
+    async with ctx["login_lock"]:
+        response = await client.post("/login", json={"email": TEST_USER, "password": TEST_PASSWORD})
+        if response.status_code != 200:
+            return False
+        response = await client.post("/verify-login-otp", json={"email": TEST_USER, "otp": TEST_OTP})
+        return response.status_code == 200
+
+
+SCENARIOS = {
+    "ingest": ingest_scenario,
+    "filter": filter_scenario,
+    "get": get_scenario,
+    "bulk": bulk_scenario,
+    "login": login_scenario,
+}
+
+
+async def access_token(client):
+    await client.post("/login", json={"email": TEST_USER, "password": TEST_PASSWORD})
+    response = await client.post("/verify-login-otp", json={"email": TEST_USER, "otp": TEST_OTP})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def drive(base_url, mix, concurrency, duration, max_id):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        ctx = {
+            "max_id": max_id,
+            "auth": {"Authorization": f"Bearer {await access_token(client)}"},
+            "login_lock": asyncio.Lock(),
+        }
+        stop_at = time.monotonic() + duration
+
+        async def worker(seed_value):
+            rng = random.Random(seed_value)
+            while time.monotonic() < stop_at:
+                name = rng.choices(names, weights)[0]
+                started = time.perf_counter()
+                try:
+                    ok = await SCENARIOS[name](client, rng, ctx)
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies[name].append(time.perf_counter() - started)
+                else:
+                    errors[name] += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.monotonic() - started
+    return latencies, errors, elapsed
+
+
+def summarize(latencies, errors, elapsed):
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--observations", type=int, default=1_000_000)
+    parser.add_argument("--database", default=os.path.join(BACKEND_DIR, "loadtest.db"),
+                        help="SQLite file to seed and serve; reused if it already holds enough rows")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights, e.g. ingest=1,get=4")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--port", type=int, default=5103)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    # Plain HTTP, no rate limits and no SMTP, for both the seeding process and the server
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.abspath(args.database)}",
+        "OTP_DATABASE_URL": f"sqlite:///{os.path.abspath(args.database)}.otp",
+        "OTP_DELIVERY": "memory",
+        "FLASK_TESTING": "True",
+        "RATELIMIT_ENABLED": "False",
+    })
+    max_id = seed(args.observations)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    command = [
+        sys.executable, "-m", "gunicorn", "wsgi:app", "--preload", "--bind", f"127.0.0.1:{args.port}",
+        "--workers", str(args.workers), "--threads", str(args.threads),
+    ]
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_until_up(base_url))
+        latencies, errors, elapsed = asyncio.run(drive(base_url, mix, args.concurrency, args.duration, max_id))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    report = {
+        "commit": git_commit(),
+        "observations": max_id,
+        "mix": mix,
+        "concurrency": args.concurrency,
+        "duration_s": round(elapsed, 2),
+        "server": " ".join(command[1:]),
+        "scenarios": {name: summarize(latencies[name], errors[name], elapsed) for name in mix},
+        "total": summarize(
+            [value for name in mix for value in latencies[name]], sum(errors.values()), elapsed
+        ),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
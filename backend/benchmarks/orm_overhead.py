@@ -0,0 +1,111 @@
+"""
+Per-request ORM overhead of the hot queries: query chains vs prepared selects.
+
+Runs the lookups behind the token routes (user by email), get_obs (the
+subscription check and the record load) and the filter route against a
+scratch SQLite database, once with the db.query(...) chains the routes used
+to build on every call ("query_chain") and once through the module-level
+select() constructs they use now ("prepared"). Reports microseconds per call
+and the SQL compilation cache hit rate seen by app.statement_cache as JSON.
+
+Usage (from backend/):
+    python benchmarks/orm_overhead.py --calls 5000 --repeat 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from werkzeug.datastructures import MultiDict  # noqa: E402
+from app.db import Base  # noqa: E402
+from app.routes.observation import User, Subscription, ObservationRecord, find_user  # noqa: E402
+from app.routes.filtering import build_conditions, filter_records  # noqa: E402
+import app.entitlements as entitlements  # noqa: E402
+import app.statement_cache as statement_cache  # noqa: E402
+
+USERS = 1000
+OBSERVATIONS = 2000
+FILTER = MultiDict({"satellite_id": "SAT-3", "product_id": "2"})
+
+
+def seed(session):
+    session.add_all(User(email=f"user{i}@bench.test", first_name="B", last_name="U") for i in range(USERS))
+    session.add_all(Subscription(user_id=f"user{i}@bench.test", product_id=i % 4 + 1) for i in range(USERS))
+    session.add_all(
+        ObservationRecord(satellite_id=f"SAT-{i % 10}", product_id=i % 4 + 1, spectral_indices="ndvi=0.5")
+        for i in range(OBSERVATIONS)
+    )
+    session.commit()
+
+
+def query_chain(db, i):
+    email = f"USER{i % USERS}@bench.test"
+    db.query(User).filter(User.email_normalized == email.strip().lower()).first()
+    db.query(Subscription.id).filter(
+        Subscription.user_id == email.lower(), Subscription.product_id == 2
+    ).first()
+    db.query(ObservationRecord).filter(ObservationRecord.id == i % OBSERVATIONS + 1).first()
+    if i % 10 == 0:
+        db.query(ObservationRecord).filter(*build_conditions(ObservationRecord, FILTER)).all()
+
+
+def prepared(db, i):
+    email = f"USER{i % USERS}@bench.test"
+    find_user(db, email)
+    entitlements.has_subscription(db, email.lower(), 2)
+    db.get(ObservationRecord, i % OBSERVATIONS + 1)
+    if i % 10 == 0:
+        filter_records(db, FILTER)
+
+
+def run(Session, workload, calls, repeat):
+    best = None
+    statement_cache.stats.reset()
+    for _ in range(repeat):
+        with Session() as db:
+            started = time.perf_counter()
+            for i in range(calls):
+                workload(db, i)
+                if i % 100 == 99:
+                    db.expunge_all()  # Keep the identity map request-sized
+            elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    snapshot = statement_cache.stats.snapshot()
+    return {
+        "us_per_call": round(best / calls * 1e6, 2),
+        "cache_hit_rate": snapshot["hit_rate"],
+        "cache_misses": snapshot["miss"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        engine = create_engine(f"sqlite:///{os.path.join(scratch, 'bench.db')}")
+        statement_cache.install(engine)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        with Session() as session:
+            seed(session)
+
+        results = {
+            "calls": args.calls,
+            "query_chain": run(Session, query_chain, args.calls, args.repeat),
+            "prepared": run(Session, prepared, args.calls, args.repeat),
+        }
+        engine.dispose()
+    results["speedup"] = round(results["query_chain"]["us_per_call"] / results["prepared"]["us_per_call"], 3)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Fan-out benchmark for the in-process observation broker.
+
+Subscribes N clients (default 10,000) spread over the four products, some of
+them never reading, then publishes events and reports publish latency,
+deliveries per second and how many events the stalled clients dropped.
+
+Usage (from backend/):
+    python benchmarks/pubsub_fanout.py --subscribers 10000 --events 200
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.pubsub import Broker  # noqa: E402
+
+PRODUCTS = (1, 2, 3, 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--queue-size", type=int, default=100)
+    parser.add_argument("--stalled-fraction", type=float, default=0.1,
+                        help="Share of subscribers that never read their queue")
+    parser.add_argument("--readers", type=int, default=8, help="Threads draining the active subscribers")
+    args = parser.parse_args()
+
+    random.seed(7)
+    broker = Broker()
+    subscribers = [
+        broker.subscribe(random.sample(PRODUCTS, random.randint(1, len(PRODUCTS))), maxsize=args.queue_size)
+        for _ in range(args.subscribers)
+    ]
+    stalled_count = int(len(subscribers) * args.stalled_fraction)
+    stalled, active = subscribers[:stalled_count], subscribers[stalled_count:]
+
+    stop = threading.Event()
+    received = [0] * args.readers
+
+    def drain(slot, group):
+        while not stop.is_set():
+            for subscriber in group:
+                while subscriber.get(timeout=0) is not None:
+                    received[slot] += 1
+            time.sleep(0.001)
+
+    readers = [
+        threading.Thread(target=drain, args=(i, active[i::args.readers]), daemon=True)
+        for i in range(args.readers)
+    ]
+    for reader in readers:
+        reader.start()
+
+    payload = {"id": 0, "satellite_id": "LANDSAT-8", "notes": "Thermal anomaly detected in forest"}
+    publish_times = []
+    deliveries = 0
+    started = time.perf_counter()
+    for seq in range(args.events):
+        product_id = PRODUCTS[seq % len(PRODUCTS)]
+        t0 = time.perf_counter()
+        deliveries += broker.publish(product_id, (seq, dict(payload, id=seq, product_id=product_id)))
+        publish_times.append(time.perf_counter() - t0)
+    publish_elapsed = time.perf_counter() - started
+
+    time.sleep(0.5)
+    stop.set()
+    for reader in readers:
+        reader.join()
+
+    publish_times.sort()
+    print(json.dumps({
+        "subscribers": args.subscribers,
+        "stalled_subscribers": stalled_count,
+        "events": args.events,
+        "deliveries": deliveries,
+        "deliveries_per_second": round(deliveries / publish_elapsed),
+        "publish_p50_ms": round(publish_times[len(publish_times) // 2] * 1000, 3),
+        "publish_p99_ms": round(publish_times[int(len(publish_times) * 0.99)] * 1000, 3),
+        "publish_mean_ms": round(statistics.fmean(publish_times) * 1000, 3),
+        "received_by_active": sum(received),
+        "dropped_by_stalled": sum(s.dropped for s in stalled),
+        "max_stalled_queue": max((len(s.events) for s in stalled), default=0),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+JSON vs MessagePack for observation payloads.
+
+Encodes and decodes a list of observation dicts (as the filter route renders
+them) in both formats through app.serialization, and reports payload size
+(raw and gzip), encode and decode time as JSON.
+
+Usage (from backend/):
+    python benchmarks/serialization_formats.py --records 5000 --repeat 20
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask import Flask  # noqa: E402
+import app.serialization as serialization  # noqa: E402
+
+
+def make_records(count):
+    random.seed(7)
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "id": i,
+            "timestamp": start + timedelta(seconds=37 * i),
+            "timezone": "UTC",
+            "coordinates": f"{random.uniform(-90, 90):.5f}, {random.uniform(-180, 180):.5f}",
+            "satellite_id": random.choice(("SENTINEL-2", "LANDSAT-8", "SPOT-7")),
+            "spectral_indices": "ndvi=0.71,nbr=0.2",
+            "indices": {"ndvi": random.random(), "nbr": random.random(), "ndwi": random.random()},
+            "notes": "Routine pass",
+            "product_id": random.randint(1, 4),
+        }
+        for i in range(count)
+    ]
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def measure(encode, decode, records, repeat):
+    body = encode(records)
+    if isinstance(body, str):
+        body = body.encode()
+    return {
+        "bytes": len(body),
+        "gzip_bytes": len(gzip.compress(body, 6)),
+        "encode_ms": round(best_of(repeat, lambda: encode(records)) * 1000, 3),
+        "decode_ms": round(best_of(repeat, lambda: decode(body)) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+    with Flask(__name__).app_context():
+        results = {
+            # JSON clients also have to parse the ISO strings back into datetimes
+            "json": measure(
+                serialization.dumps_json,
+                lambda body: [dict(r, timestamp=datetime.fromisoformat(r["timestamp"])) for r in json.loads(body)],
+                records, args.repeat,
+            ),
+            "msgpack": measure(serialization.dumps_msgpack, serialization.loads_msgpack, records, args.repeat),
+        }
+    results["records"] = args.records
+    results["size_ratio"] = round(results["msgpack"]["bytes"] / results["json"]["bytes"], 3)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+Collapses duplicate scenes so natural-key deduplication can be enforced.
+
+Usage: python dedupe_observations.py
+Within `observations` and each monthly partition, rows sharing satellite_id,
+timestamp and coordinates are reduced to the oldest one (lowest id), then the
+unique natural-key index is created. Run the API with OBSERVATION_DEDUP=true
+so ingest upserts against it.
+"""
+from app.db import engine
+import app.ingest as ingest
+
+def dedupe_observations():
+    with engine.begin() as conn:
+        for table_name in ingest.observation_tables(conn):
+            removed = ingest.collapse_duplicates(conn, table_name)
+            ingest.install_index(conn, table_name)
+            print(f"{table_name}: removed {removed} duplicate(s)")
+    print("Natural-key indexes in place.")
+
+if __name__ == "__main__":
+    dedupe_observations()
@@ -0,0 +1,30 @@
+"""
+Drops observation partitions older than a cutoff month.
+
+Usage: python expire_partitions.py 2024-01-01
+Every monthly table before January 2024 is dropped; rows in the unpartitioned
+`observations` table are not touched.
+"""
+import sys
+from app.db import SessionLocal
+import app.partitions as partitions
+
+def expire_partitions(cutoff):
+    db = SessionLocal()
+    try:
+        dropped = partitions.drop_before(db, cutoff)
+        db.commit()
+        for name in dropped:
+            print(f"Dropped {name}")
+        print(f"{len(dropped)} partition(s) expired.")
+    except Exception as e:
+        db.rollback()
+        print(f"Error expiring partitions: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python expire_partitions.py <YYYY-MM-DD>")
+        sys.exit(1)
+    expire_partitions(sys.argv[1])
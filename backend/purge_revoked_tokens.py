@@ -0,0 +1,25 @@
+"""
+Deletes revocation records for tokens that have expired anyway.
+
+Usage: python purge_revoked_tokens.py
+Keeps revoked_tokens (and each process's bloom filter after its next rebuild)
+proportional to the tokens that are still live.
+"""
+from app.db import SessionLocal, Base, engine
+import app.revocation as revocation
+
+def purge_revoked_tokens():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        removed = revocation.purge_expired(db)
+        db.commit()
+        print(f"Removed {removed} expired revocation(s).")
+    except Exception as e:
+        db.rollback()
+        print(f"Error purging revocations: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    purge_revoked_tokens()
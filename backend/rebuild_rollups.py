@@ -0,0 +1,23 @@
+"""
+Recomputes observation_daily_rollups from the observation tables.
+Run this if the rollups drift (e.g. rows written with triggers disabled).
+"""
+from app.db import engine, Base
+import app.routes.observation  # noqa: F401  (registers the observation models)
+import app.rollups as rollups
+import app.ingest as ingest
+
+def rebuild_rollups():
+    try:
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            # Monthly partitions feed the rollups through their own triggers
+            for table_name in ingest.observation_tables(conn):
+                rollups.install_triggers(conn, table_name)
+            rollups.rebuild(conn)
+        print("Rollups rebuilt.")
+    except Exception as e:
+        print(f"Error rebuilding rollups: {e}")
+
+if __name__ == "__main__":
+    rebuild_rollups()
@@ -1,11 +1,12 @@
-from flask import Flask, g
+from flask import Flask, g, request
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flasgger import Swagger
 from flask_talisman import Talisman
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from app.db import engine, SessionLocal, Base
+from flask_compress import Compress
+from app.db import engine, SessionLocal, Base, sticky
 from dotenv import load_dotenv
 import os
 
@@ -19,7 +20,17 @@ def get_app():
     # JWT Config
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "super-secret-key-change-me")
     app.secret_key = os.getenv("FLASK_SECRET_KEY", "super-secret-flask-key")  # Required for Authlib/Session
-    JWTManager(app)
+    jwt = JWTManager(app)
+
+    # Revoked tokens (by jti): the per-process bloom filter answers the common case
+    import app.revocation as revocation
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        db = g.get("db")
+        if db is not None and db.info.get("read_only"):
+            db = None  # A lagging replica could miss a fresh logout; check the primary
+        return revocation.revocations.is_revoked(jwt_payload.get("jti"), db)
 
     # Security: Talisman (Headers + CSP)
     # Force HTTPS only if NOT in debug mode (Production)
@@ -40,7 +51,8 @@ def get_app():
              content_security_policy=csp, 
              force_https=is_production)
 
-    # Security: Limiter (Rate Limiting)
+    # Security: Limiter (Rate Limiting); RATELIMIT_ENABLED=False turns it off for load tests
+    app.config["RATELIMIT_ENABLED"] = os.getenv("RATELIMIT_ENABLED", "True") != "False"
     limiter = Limiter(
         get_remote_address,
         app=app,
@@ -48,14 +60,34 @@ def get_app():
         storage_uri="memory://"
     )
 
-    # Swagger Documentation
-    Swagger(app)
+    # Response compression: brotli/gzip above a size threshold. Streamed bodies
+    # are compressed chunk by chunk (brotli/deflate); SSE is left alone.
+    app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+    app.config["COMPRESS_ALGORITHM_STREAMING"] = ["br", "deflate"]
+    app.config["COMPRESS_MIN_SIZE"] = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    app.config["COMPRESS_MIMETYPES"] = [
+        "application/json", "application/javascript", "text/html", "text/css", "text/plain", "image/svg+xml",
+    ]
+    Compress(app)
+
+    # Swagger Documentation (spec is compiled once routes are registered)
+    swagger = Swagger(app)
 
     # Import models to register with SQLAlchemy
     from app.routes.observation import ObservationRecord, Product, Subscription
+    import app.rollups as rollups
+    import app.search as search
+    import app.changes as changes
+    import app.ingest as ingest
+    import app.migrations as migrations
 
     # Initialize DB tables
     Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
+    rollups.install(engine)
+    search.install(engine)
+    changes.install(engine)
+    ingest.install(engine)
 
     # Seed initial products if none exist
     db = SessionLocal()
@@ -92,29 +124,49 @@ def get_app():
         db.commit()
     db.close()
 
-    # Create a per-request session
+    # Create a per-request session. Routes marked @reads_from_replica read from
+    # a replica, unless this client committed a write in the last few seconds.
     @app.before_request
     def create_session():
-        g.db = SessionLocal()
+        client = get_remote_address()
+        view = app.view_functions.get(request.endpoint)
+        read_only = getattr(view, "reads_from_replica", False) and not sticky.pinned(client)
+        g.db = SessionLocal(info={"read_only": read_only, "client": client})
 
     @app.teardown_appcontext
     def remove_session(exception=None):
         db = g.pop("db", None)
         if db is not None:
+            if db.info.get("committed"):
+                sticky.pin(db.info["client"])
             db.close()
 
     # Import and register routes
     import app.routes.observation as observation
     import app.routes.filtering as filtering
+    import app.routes.aggregation as aggregation
+    import app.routes.changefeed as changefeed
+    import app.routes.stream as stream
+    import app.routes.bulk12 as bulk12
+    import app.routes.export as export
     import app.routes.healthApi as healthApi
     import app.models.jwtAuth as jwtAuth
 
     # Register routes without passing a long-lived session
     observation.register(app)
     filtering.register(app)
+    aggregation.register(app)
+    changefeed.register(app)
+    stream.register(app)
+    bulk12.register(app)
+    export.register(app)
     healthApi.register(app)
     jwtAuth.register(app)
 
+    # Compile the OpenAPI spec once now that every route is registered
+    import app.openapi as openapi
+    openapi.register(app, swagger)
+
     return app
 
 
@@ -1,7 +1,6 @@
 from app.db import SessionLocal
-from app.routes.observation import User, Subscription
+from app.routes.observation import User, Subscription, find_user
 from werkzeug.security import generate_password_hash
-from datetime import datetime
 
 def seed_test_user():
     db = SessionLocal()
@@ -9,13 +8,13 @@ def seed_test_user():
         email = "testuser@geoscope.com"
         
         # Check if user exists
-        existing_user = db.query(User).filter(User.email == email).first()
+        existing_user = find_user(db, email)
         if existing_user:
             print(f"User {email} already exists.")
             # Ensure password and verification status are correct (optional update)
             existing_user.password = generate_password_hash("password123")
-            existing_user.is_verified = 1
-            existing_user.is_2fa_enabled = 0 # Default to disabled for easy testing initially, enable if testing 2FA
+            existing_user.is_verified = True
+            existing_user.is_2fa_enabled = False # Default to disabled for easy testing initially, enable if testing 2FA
             db.commit()
             print(f"User {email} updated.")
         else:
@@ -24,10 +23,8 @@ def seed_test_user():
                 password=generate_password_hash("password123"),
                 first_name="Test",
                 last_name="User",
-                is_2fa_enabled=0,
-                is_verified=1, # Auto verify
-                otp_code=None,
-                otp_created_at=None
+                is_2fa_enabled=False,
+                is_verified=True # Auto verify
             )
             db.add(new_user)
             db.commit()
@@ -0,0 +1,79 @@
+"""
+Shared test configuration.
+
+The suite runs against DATABASE_URL (SQLite run.db by default). With
+--db-backend=postgresql it runs against a throwaway PostgreSQL server started
+by pytest-postgresql instead (pg_ctl must be on PATH, or pass
+--postgresql-exec):
+
+    python -m pytest --db-backend=postgresql
+
+Tests of features built on FTS5 or the SQLite backup API are marked
+sqlite_only and skipped on other databases.
+"""
+import os
+import socket
+import pytest
+
+# OTP codes go to the in-memory outbox (app.otp_delivery.MemorySink), never to SMTP
+os.environ.setdefault("OTP_DELIVERY", "memory")
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--db-backend", choices=("sqlite", "postgresql"), default="sqlite",
+        help="sqlite: use DATABASE_URL or run.db; postgresql: spawn a server with pytest-postgresql",
+    )
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _postgresql_setting(config, name):
+    return config.getoption(name) or config.getini(name)
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "sqlite_only: needs FTS5 or the SQLite backup API")
+    if config.getoption("db_backend") != "postgresql":
+        return
+    if not any(config.pluginmanager.hasplugin(name) for name in ("pytest_postgresql", "postgresql")):
+        raise pytest.UsageError("--db-backend=postgresql needs pytest-postgresql (pip install pytest-postgresql)")
+
+    # app.db builds its engine at import, so the server's address has to be fixed before collection
+    if not config.getoption("postgresql_port"):
+        config.option.postgresql_port = _free_port()
+    password = _postgresql_setting(config, "postgresql_password")
+    credentials = _postgresql_setting(config, "postgresql_user") + (f":{password}" if password else "")
+    os.environ["DATABASE_URL"] = (
+        f"postgresql+psycopg://{credentials}@{_postgresql_setting(config, 'postgresql_host')}:"
+        f"{config.getoption('postgresql_port')}/{_postgresql_setting(config, 'postgresql_dbname')}"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    from app.db import engine
+    if engine.dialect.name == "sqlite":
+        return
+    skip = pytest.mark.skip(reason=f"SQLite-only feature, not available on {engine.dialect.name}")
+    for item in items:
+        if "sqlite_only" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database_server(request):
+    """Starts PostgreSQL and creates the test database for the session when --db-backend=postgresql."""
+    if request.config.getoption("db_backend") != "postgresql":
+        yield None
+        return
+    from pytest_postgresql.janitor import DatabaseJanitor
+    proc = request.getfixturevalue("postgresql_proc")
+    with DatabaseJanitor(
+        user=proc.user, host=proc.host, port=proc.port, dbname=proc.dbname,
+        version=proc.version, password=proc.password,
+    ):
+        yield proc
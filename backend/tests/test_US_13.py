@@ -7,6 +7,7 @@ import pytest
 from run import get_app
 from app.db import engine, SessionLocal
 from app.routes.observation import User
+import app.otp_delivery as otp_delivery
 from werkzeug.security import generate_password_hash
 from datetime import datetime
 
@@ -78,10 +79,9 @@ def test_valid_token_returns_data(client, db_session):
     json_data = login_response.get_json()
     assert json_data.get('otp_required') is True
     
-    # 2. Get OTP from DB (Simpler than file for unit tests)
-    db_session.refresh(user)
-    otp = user.otp_code
-    assert otp is not None
+    # 2. The code that was sent (OTP_DELIVERY=memory, see conftest.py)
+    otp_delivery.dispatcher.flush(timeout=5)
+    otp = otp_delivery.dispatcher.sink.latest(email).code
     
     # 3. Verify OTP to get Token
     verify_response = client.post('/verify-login-otp', json={
@@ -0,0 +1,62 @@
+"""
+Server-side aggregation endpoint.
+"""
+import os
+import uuid
+import pytest
+from run import get_app
+from app.db import SessionLocal
+import app.partitions as partitions
+
+
+@pytest.fixture
+def client():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_group_by_satellite_and_day(client):
+    satellite = f"AGG-{uuid.uuid4().hex[:8]}"
+    for ts, ndvi in [("2030-05-01T08:00:00", 0.2), ("2030-05-01T20:00:00", 0.6), ("2030-05-02T09:00:00", 0.5)]:
+        client.post('/api/observations', json={
+            "satellite_id": satellite, "timestamp": ts, "spectral_indices": {"ndvi": ndvi}
+        })
+
+    response = client.get(
+        f'/api/observations/aggregate?group_by=satellite_id,day&satellite_id={satellite}'
+        '&metrics=count,min_timestamp,max_timestamp,mean_ndvi'
+    )
+    assert response.status_code == 200
+    rows = response.get_json()
+    assert [(r["day"], r["count"]) for r in rows] == [("2030-05-01", 2), ("2030-05-02", 1)]
+    assert rows[0]["min_timestamp"].startswith("2030-05-01T08:00")
+    assert rows[0]["max_timestamp"].startswith("2030-05-01T20:00")
+    assert rows[0]["mean_ndvi"] == pytest.approx(0.4)
+
+
+def test_unknown_group_key_is_rejected(client):
+    response = client.get('/api/observations/aggregate?group_by=coordinates')
+    assert response.status_code == 400
+
+
+def test_aggregates_include_partitioned_months(client, monkeypatch):
+    satellite = f"AGG-{uuid.uuid4().hex[:8]}"
+    client.post('/api/observations', json={"satellite_id": satellite, "timestamp": "2032-01-31T12:00:00"})
+    monkeypatch.setenv('OBSERVATION_PARTITIONING', 'monthly')
+    for ts in ("2032-02-01T08:00:00", "2032-03-01T08:00:00"):
+        client.post('/api/observations', json={"satellite_id": satellite, "timestamp": ts})
+
+    try:
+        response = client.get(
+            f'/api/observations/aggregate?group_by=month&satellite_id={satellite}'
+            '&start_date=2032-01-01&end_date=2032-02-29'
+        )
+        assert [(r["month"], r["count"]) for r in response.get_json()] == [("2032-01", 1), ("2032-02", 1)]
+    finally:
+        db = SessionLocal()
+        partitions.drop_before(db, "9999-12-01")
+        db.commit()
+        db.close()
@@ -0,0 +1,90 @@
+"""
+Bulk update and delete with single-statement execution.
+"""
+import os
+import uuid
+import pytest
+from run import get_app
+from app.db import SessionLocal
+import app.partitions as partitions
+
+
+@pytest.fixture
+def client():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def _seed(client, satellite, count=3):
+    return [
+        client.post('/api/observations', json={
+            "satellite_id": satellite, "timestamp": f"2030-08-0{i + 1}T00:00:00"
+        }).get_json()["id"]
+        for i in range(count)
+    ]
+
+
+def test_bulk_relabel_by_filter_with_dry_run(client):
+    old, new = f"OLD-{uuid.uuid4().hex[:8]}", f"NEW-{uuid.uuid4().hex[:8]}"
+    _seed(client, old)
+    body = {"filter": {"satellite_id": old, "end_date": "2030-08-02T23:59:59"}, "set": {"satellite_id": new}}
+
+    dry = client.patch('/api/v1/bulk/observations', json=dict(body, dry_run=True)).get_json()
+    assert dry == {"matched": 2, "updated": 0, "dry_run": True}
+    assert len(client.get(f'/api/observations/filter?satellite_id={new}').get_json()) == 0
+
+    done = client.patch('/api/v1/bulk/observations', json=body).get_json()
+    assert done == {"matched": 2, "updated": 2, "dry_run": False}
+    assert len(client.get(f'/api/observations/filter?satellite_id={new}').get_json()) == 2
+    assert len(client.get(f'/api/observations/filter?satellite_id={old}').get_json()) == 1
+
+
+def test_bulk_update_rewrites_spectral_indices(client):
+    satellite = f"IDX-{uuid.uuid4().hex[:8]}"
+    ids = _seed(client, satellite, 2)
+    client.patch('/api/v1/bulk/observations', json={"ids": ids, "set": {"spectral_indices": {"ndvi": 0.7}}})
+    results = client.get(f'/api/observations/filter?satellite_id={satellite}&ndvi_min=0.6').get_json()
+    assert sorted(r["id"] for r in results) == sorted(ids)
+
+
+def test_bulk_delete_by_ids(client):
+    satellite = f"DEL-{uuid.uuid4().hex[:8]}"
+    ids = _seed(client, satellite)
+    response = client.delete('/api/v1/bulk/observations', json={"ids": ids[:2] + [999999]})
+    assert response.get_json() == {"matched": 2, "deleted": 2, "dry_run": False}
+    assert [o["id"] for o in client.get(f'/api/observations/filter?satellite_id={satellite}').get_json()] == ids[2:]
+
+
+def test_bulk_requires_a_selector(client):
+    assert client.delete('/api/v1/bulk/observations', json={}).status_code == 400
+    assert client.delete('/api/v1/bulk/observations', json={"filter": {}}).status_code == 400
+    response = client.patch('/api/v1/bulk/observations', json={"ids": [1], "set": {"id": 5}})
+    assert response.status_code == 400
+
+
+def test_dry_run_must_be_a_boolean(client):
+    body = {"ids": [1], "set": {"notes": "x"}, "dry_run": "false"}
+    assert client.patch('/api/v1/bulk/observations', json=body).status_code == 400
+    assert client.delete('/api/v1/bulk/observations', json={"ids": [1], "dry_run": "false"}).status_code == 400
+
+
+def test_bulk_timestamp_cannot_move_partitioned_records(client, monkeypatch):
+    monkeypatch.setenv('OBSERVATION_PARTITIONING', 'monthly')
+    satellite = f"PART-{uuid.uuid4().hex[:8]}"
+    obs_id = client.post('/api/observations', json={
+        "satellite_id": satellite, "timestamp": "2032-04-10T00:00:00"
+    }).get_json()["id"]
+
+    try:
+        moved = {"ids": [obs_id], "set": {"timestamp": "2032-05-01T00:00:00"}}
+        assert client.patch('/api/v1/bulk/observations', json=moved).status_code == 409
+        same_month = {"ids": [obs_id], "set": {"timestamp": "2032-04-30T00:00:00"}}
+        assert client.patch('/api/v1/bulk/observations', json=same_month).get_json()["updated"] == 1
+    finally:
+        db = SessionLocal()
+        partitions.drop_before(db, "9999-12-01")
+        db.commit()
+        db.close()
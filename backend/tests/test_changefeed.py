@@ -0,0 +1,115 @@
+"""
+Observation change feed and long-poll.
+"""
+import os
+import threading
+import time
+import pytest
+from sqlalchemy import func
+from run import get_app
+from app.db import SessionLocal, engine
+from app.routes.observation import ObservationRecord
+from app.changes import ObservationChange
+
+
+@pytest.fixture
+def client():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def _last_seq():
+    db = SessionLocal()
+    seq = db.query(func.max(ObservationChange.seq)).scalar() or 0
+    db.close()
+    return seq
+
+
+def test_changes_record_create_update_delete(client):
+    since = _last_seq()
+    obs_id = client.post('/api/observations', json={"satellite_id": "FEED-SAT"}).get_json()["id"]
+    client.put(f'/api/observations/{obs_id}', json={"notes": "changed"})
+    client.delete(f'/api/observations/{obs_id}')
+
+    body = client.get(f'/api/observations/changes?since={since}').get_json()
+    assert [(c["observation_id"], c["op"]) for c in body["changes"]] == [
+        (obs_id, "insert"), (obs_id, "update"), (obs_id, "delete")
+    ]
+    assert body["last_seq"] == body["changes"][-1]["seq"]
+
+
+def test_long_poll_wakes_on_commit(client):
+    since = _last_seq()
+    result = {}
+
+    def poll():
+        started = time.monotonic()
+        with client.application.test_client() as poller:
+            result["body"] = poller.get(f'/api/observations/changes?since={since}&wait=10').get_json()
+        result["elapsed"] = time.monotonic() - started
+
+    waiter = threading.Thread(target=poll)
+    waiter.start()
+    time.sleep(0.3)
+    obs_id = client.post('/api/observations', json={"satellite_id": "FEED-SAT"}).get_json()["id"]
+    waiter.join(timeout=10)
+
+    assert [c["observation_id"] for c in result["body"]["changes"]] == [obs_id]
+    assert result["elapsed"] < 5
+
+
+def test_long_poll_sees_commits_from_other_processes(client):
+    since = _last_seq()
+    table = ObservationRecord.__table__
+    result = {}
+
+    def poll():
+        started = time.monotonic()
+        with client.application.test_client() as poller:
+            result["body"] = poller.get(f'/api/observations/changes?since={since}&wait=10').get_json()
+        result["elapsed"] = time.monotonic() - started
+
+    waiter = threading.Thread(target=poll)
+    waiter.start()
+    time.sleep(0.3)
+    # A bare connection, like another worker, never wakes this process's signal
+    with engine.begin() as conn:
+        obs_id = conn.execute(table.insert().values(satellite_id="FEED-SAT").returning(table.c.id)).scalar_one()
+    waiter.join(timeout=10)
+
+    assert [c["observation_id"] for c in result["body"]["changes"]] == [obs_id]
+    assert result["elapsed"] < 5
+
+
+def test_wait_times_out_with_no_changes(client):
+    since = _last_seq()
+    started = time.monotonic()
+    body = client.get(f'/api/observations/changes?since={since}&wait=0.2').get_json()
+    assert body == {"changes": [], "last_seq": since}
+    assert time.monotonic() - started >= 0.2
+
+
+def test_open_writer_does_not_hold_up_other_writers(client):
+    if engine.dialect.name == "sqlite":
+        pytest.skip("SQLite allows one writer at a time")
+    since = _last_seq()
+    table = ObservationRecord.__table__
+    result = {}
+
+    def write():
+        result["id"] = client.application.test_client().post('/api/observations', json={"satellite_id": "FEED-SAT"}).get_json()["id"]
+
+    with engine.connect() as slow:
+        with slow.begin():
+            slow_id = slow.execute(table.insert().values(satellite_id="FEED-SLOW").returning(table.c.id)).scalar_one()
+            writer = threading.Thread(target=write)
+            writer.start()
+            writer.join(timeout=5)
+            assert not writer.is_alive()
+
+    # Seqs follow commit order
+    changes = client.get(f'/api/observations/changes?since={since}').get_json()["changes"]
+    assert [c["observation_id"] for c in changes] == [result["id"], slow_id]
@@ -0,0 +1,32 @@
+"""
+Response compression thresholds.
+"""
+import gzip
+import json
+import os
+import pytest
+from run import get_app
+
+
+@pytest.fixture
+def client():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_large_json_is_compressed(client):
+    for i in range(30):
+        client.post('/api/observations', json={"satellite_id": "GZIP-TEST", "notes": f"compressible notes {i}"})
+    response = client.get('/api/observations/filter?satellite_id=GZIP-TEST', headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert len(json.loads(gzip.decompress(response.data))) >= 30
+
+
+def test_small_responses_are_sent_as_is(client):
+    response = client.get('/api/products', headers={"Accept-Encoding": "gzip, br"})
+    assert "Content-Encoding" not in response.headers
+    assert response.get_json()
@@ -0,0 +1,49 @@
+"""
+Engine selection by URL and the dialect-aware pieces of the schema.
+"""
+import os
+import uuid
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from run import get_app
+from app.db import SessionLocal, engine_options
+from app.routes.aggregation import time_bucket
+from app.routes.observation import ObservationRecord, User
+
+
+@pytest.fixture
+def app():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    return app
+
+
+def test_engine_options_follow_the_url():
+    assert engine_options("sqlite:///run.db") == {"connect_args": {"check_same_thread": False}}
+    assert engine_options("postgresql+psycopg://u@h/db") == {
+        "pool_pre_ping": True, "connect_args": {"options": "-c timezone=UTC"},
+    }
+
+
+def test_time_bucket_compiles_per_dialect():
+    statement = select(time_bucket(ObservationRecord.timestamp, "month"))
+    assert "strftime" in str(statement.compile(dialect=sqlite.dialect()))
+    assert "to_char" in str(statement.compile(dialect=postgresql.dialect()))
+    # Different units must not share a compiled statement
+    assert statement._generate_cache_key().key != select(time_bucket(ObservationRecord.timestamp, "day"))._generate_cache_key().key
+
+
+def test_user_flags_are_booleans(app):
+    email = f"bool-{uuid.uuid4().hex[:8]}@test.com"
+    db = SessionLocal()
+    try:
+        db.add(User(email=email, first_name="B", last_name="L", is_verified=True))
+        db.commit()
+        db.expire_all()
+        user = db.scalars(select(User).where(User.email == email)).one()
+        assert user.is_verified is True
+        assert user.is_2fa_enabled is False
+    finally:
+        db.close()
@@ -0,0 +1,82 @@
+"""
+Natural-key deduplication and upsert on ingest.
+"""
+import os
+import uuid
+import pytest
+from sqlalchemy import text
+from run import get_app
+from app.db import engine
+import app.ingest as ingest
+
+
+@pytest.fixture
+def client(monkeypatch):
+    os.environ['FLASK_TESTING'] = 'True'
+    monkeypatch.setenv('OBSERVATION_DEDUP', 'true')
+    app = get_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+    _drop_index()
+
+
+def _drop_index():
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP INDEX IF EXISTS {ingest.index_name('observations')}"))
+    ingest._indexed_tables.discard('observations')
+
+
+def test_resent_scene_updates_the_existing_row(client):
+    scene = {"satellite_id": f"DUP-{uuid.uuid4().hex[:8]}", "timestamp": "2030-09-01T10:00:00", "coordinates": "1, 2"}
+    first = client.post('/api/observations', json=dict(scene, notes="station A")).get_json()["id"]
+    second = client.post('/api/observations', json=dict(scene, spectral_indices={"ndvi": 0.5})).get_json()["id"]
+
+    assert first == second
+    rows = client.get(f'/api/observations/filter?satellite_id={scene["satellite_id"]}').get_json()
+    assert len(rows) == 1
+    assert rows[0]["notes"] == "station A"  # not cleared by a copy without notes
+    assert rows[0]["indices"] == {"ndvi": 0.5}
+
+
+def test_bulk_ingest_upserts_in_one_batch(client):
+    satellite = f"BULK-{uuid.uuid4().hex[:8]}"
+    batch = [
+        {"satellite_id": satellite, "timestamp": "2030-09-02T00:00:00", "coordinates": "0, 0"},
+        {"satellite_id": satellite, "timestamp": "2030-09-03T00:00:00", "coordinates": "0, 0"},
+        {"satellite_id": satellite, "timestamp": "2030-09-02T00:00:00", "coordinates": "0, 0", "notes": "resent"},
+    ]
+    response = client.post('/api/v1/bulk/observations', json={"observations": batch})
+    assert response.status_code == 201
+    ids = response.get_json()["ids"]
+    assert ids[0] == ids[2] != ids[1]
+
+    again = client.post('/api/v1/bulk/observations', json={"observations": batch[:2]}).get_json()["ids"]
+    assert again == ids[:2]
+    assert len(client.get(f'/api/observations/filter?satellite_id={satellite}').get_json()) == 2
+    rollups = client.get(f'/api/observations/rollups?satellite_id={satellite}').get_json()
+    assert sum(r["count"] for r in rollups) == 2
+
+
+def test_bulk_ingest_rejects_unknown_fields(client):
+    response = client.post('/api/v1/bulk/observations', json={"observations": [{"colour": "red"}]})
+    assert response.status_code == 400
+
+
+def test_table_holding_duplicates_falls_back_to_plain_inserts(monkeypatch):
+    os.environ['FLASK_TESTING'] = 'True'
+    scene = {"satellite_id": f"DUP-{uuid.uuid4().hex[:8]}", "timestamp": "2030-09-04T00:00:00", "coordinates": "3, 4"}
+    _drop_index()
+    client = get_app().test_client()
+    try:
+        client.post('/api/observations', json=scene)
+        client.post('/api/observations', json=scene)
+
+        # The unique index cannot be built over the duplicates
+        monkeypatch.setenv('OBSERVATION_DEDUP', 'true')
+        client = get_app().test_client()
+        assert client.post('/api/observations', json=scene).status_code == 201
+        assert len(client.get(f'/api/observations/filter?satellite_id={scene["satellite_id"]}').get_json()) == 3
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM observations WHERE satellite_id = :s"), {"s": scene["satellite_id"]})
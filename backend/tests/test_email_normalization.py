@@ -0,0 +1,103 @@
+"""
+Case-insensitive email lookups through users.email_normalized.
+"""
+import os
+import uuid
+import pytest
+from sqlalchemy import create_engine, text, inspect
+from sqlalchemy.orm import Session
+from flask_jwt_extended import create_access_token
+from werkzeug.security import generate_password_hash
+from run import get_app
+from app.db import SessionLocal, engine
+from app.routes.observation import User, find_user
+import app.migrations as migrations
+
+
+@pytest.fixture
+def app():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def user_email():
+    email = f"norm-{uuid.uuid4().hex[:8]}@test.com"
+    db = SessionLocal()
+    db.add(User(email=email, password=generate_password_hash("pw"), first_name="N", last_name="M", is_verified=1))
+    db.commit()
+    db.close()
+    return email
+
+
+def test_find_user_ignores_case_and_spaces(user_email):
+    db = SessionLocal()
+    try:
+        assert find_user(db, f"  {user_email.upper()} ").email == user_email
+    finally:
+        db.close()
+
+
+def test_login_with_mixed_case_email(app, user_email):
+    response = app.test_client().post('/login', json={"email": user_email.upper(), "password": "pw"})
+    assert response.status_code == 200
+    assert response.get_json()["email"] == user_email
+
+
+def test_signup_rejects_case_duplicate(app, user_email):
+    response = app.test_client().post('/signup', json={
+        "email": user_email.title(), "password": "pw", "first_name": "N", "last_name": "M"
+    })
+    assert response.status_code == 409
+
+
+def test_upgrade_backfills_and_indexes_old_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR(120) NOT NULL)"))
+        conn.execute(text("INSERT INTO users (email) VALUES (' Old@Test.com')"))
+
+    migrations.upgrade(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT email_normalized FROM users")).scalar() == "old@test.com"
+    assert "ux_users_email_normalized" in {i["name"] for i in inspect(engine).get_indexes("users")}
+
+
+def test_upgrade_skips_index_over_case_duplicates(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR(120) NOT NULL)"))
+        conn.execute(text("INSERT INTO users (email) VALUES ('dup@test.com'), ('DUP@test.com')"))
+
+    migrations.upgrade(engine)
+    assert "ux_users_email_normalized" not in {i["name"] for i in inspect(engine).get_indexes("users")}
+
+    # Until they are merged, lookups resolve to the oldest of the duplicates
+    db = Session(engine)
+    try:
+        assert find_user(db, "Dup@Test.com").email == "dup@test.com"
+    finally:
+        db.close()
+
+
+def test_profile_update_touches_only_the_oldest_case_duplicate(app):
+    email = f"norm-{uuid.uuid4().hex[:8]}@test.com"
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ux_users_email_normalized"))
+        conn.execute(text("INSERT INTO users (email, email_normalized, first_name) VALUES (:a, :n, 'A'), (:b, :n, 'B')"),
+                     {"a": email, "b": email.upper(), "n": email})
+    try:
+        with app.app_context():
+            token = create_access_token(identity=email.upper())
+        response = app.test_client().put('/api/profile', json={"first_name": "C"}, headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert response.get_json()["user"]["email"] == email
+        with engine.connect() as conn:
+            names = conn.execute(text("SELECT first_name FROM users WHERE email_normalized = :n ORDER BY id"), {"n": email})
+            assert [n for (n,) in names] == ["C", "B"]
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM users WHERE email_normalized = :n"), {"n": email})
+        migrations.add_missing_indexes(engine)
@@ -0,0 +1,106 @@
+"""
+Entitlement claims in access tokens and the token-version check.
+"""
+import os
+import uuid
+import pytest
+from flask_jwt_extended import create_access_token, create_refresh_token, decode_token
+from sqlalchemy import create_engine, text, inspect
+from run import get_app
+from app.db import SessionLocal
+from app.routes.observation import ObservationRecord, User
+import app.entitlements as entitlements
+from app.models.jwtAuth import issue_access_token
+import app.migrations as migrations
+
+
+@pytest.fixture
+def app():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    return app
+
+
+def _observation(product_id):
+    db = SessionLocal()
+    obs = ObservationRecord(product_id=product_id, satellite_id="ENT-TEST")
+    db.add(obs)
+    db.commit()
+    obs_id = obs.id
+    db.close()
+    return obs_id
+
+
+def test_get_obs_authorizes_from_claims(app, monkeypatch):
+    obs_id = _observation(2)
+    with app.app_context():
+        token = create_access_token(identity="claims_only_user", additional_claims={"ent": [2], "tv": 0})
+
+    def no_lookup(*args):
+        raise AssertionError("subscription lookup not expected")
+
+    monkeypatch.setattr(entitlements, "has_subscription", no_lookup)
+    response = app.test_client().get(f'/api/observations/{obs_id}', headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+
+def test_stale_token_version_falls_back_to_subscriptions(app):
+    email = f"ent-{uuid.uuid4().hex[:8]}@test.com"
+    db = SessionLocal()
+    db.add(User(email=email, first_name="E", last_name="N"))
+    db.commit()
+    entitlements.bump_version(db, email)
+    db.commit()
+    db.close()
+    entitlements.versions.invalidate(email)
+
+    obs_id = _observation(3)
+    with app.app_context():
+        token = create_access_token(identity=email, additional_claims={"ent": [3], "tv": 0})
+    response = app.test_client().get(f'/api/observations/{obs_id}', headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
+
+
+def test_cancelled_subscription_is_not_trusted_from_issued_token(app):
+    email = f"ent-{uuid.uuid4().hex[:8]}@test.com"
+    db = SessionLocal()
+    db.add(User(email=email, first_name="E", last_name="N"))
+    db.commit()
+    db.close()
+    client = app.test_client()
+    sub_id = client.post('/api/subscriptions', json={"user_id": email, "product_id": 4}).get_json()["id"]
+
+    obs_id = _observation(4)
+    db = SessionLocal()
+    with app.app_context():
+        token = issue_access_token(db, email)
+    db.close()
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get(f'/api/observations/{obs_id}', headers=headers).status_code == 200
+
+    assert client.delete(f'/api/subscriptions/{sub_id}').status_code == 200
+    assert client.get(f'/api/observations/{obs_id}', headers=headers).status_code == 403
+    assert client.delete(f'/api/subscriptions/{sub_id}').status_code == 404
+
+
+def test_refresh_issues_entitlement_claims(app):
+    with app.app_context():
+        refresh = create_refresh_token(identity="partial_user")
+    response = app.test_client().post('/refresh', headers={"Authorization": f"Bearer {refresh}"})
+    with app.app_context():
+        claims = decode_token(response.get_json()["access_token"])
+    assert claims["ent"] == [1, 2]
+    assert claims["tv"] == 0
+
+
+def test_missing_columns_are_added(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR(120) NOT NULL)"))
+        conn.execute(text("INSERT INTO users (email) VALUES ('old@test.com')"))
+
+    assert "users.token_version" in migrations.add_missing_columns(engine)
+    assert "token_version" in {c["name"] for c in inspect(engine).get_columns("users")}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT token_version FROM users")).scalar() == 0
@@ -0,0 +1,97 @@
+"""
+Arrow / Parquet export of observations.
+"""
+import io
+import os
+import uuid
+import pytest
+from sqlalchemy import event
+from run import get_app
+from app.db import engine
+import app.routes.export as export
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def _seed(client, satellite):
+    for day in range(1, 6):
+        client.post('/api/observations', json={
+            "satellite_id": satellite, "timestamp": f"2030-11-0{day}T06:00:00",
+            "coordinates": "34.05, -118.24", "spectral_indices": {"ndvi": day / 10},
+        })
+
+
+def test_arrow_stream_is_typed_and_batched(client, monkeypatch):
+    satellite = f"ARROW-{uuid.uuid4().hex[:8]}"
+    _seed(client, satellite)
+    monkeypatch.setattr(export, "EXPORT_BATCH_ROWS", 2)
+
+    response = client.get(f'/api/v1/export/observations?format=arrow&satellite_id={satellite}')
+    assert response.status_code == 200
+    reader = pa.ipc.open_stream(io.BytesIO(response.data))
+    batches = list(reader)
+    table = pa.Table.from_batches(batches, schema=reader.schema)
+
+    assert len(batches) == 3
+    assert table.num_rows == 5
+    assert table.schema.field("timestamp").type == pa.timestamp("us", tz="UTC")
+    assert table.column("latitude").to_pylist() == [34.05] * 5
+    assert table.column("ndvi").to_pylist() == [0.1, 0.2, 0.3, 0.4, 0.5]
+
+
+def test_parquet_export_honours_date_range(client):
+    satellite = f"PARQUET-{uuid.uuid4().hex[:8]}"
+    _seed(client, satellite)
+    response = client.get(
+        f'/api/v1/export/observations?format=parquet&satellite_id={satellite}'
+        '&start_date=2030-11-02&end_date=2030-11-04'
+    )
+    assert response.headers["Content-Disposition"].endswith("observations.parquet")
+    table = pq.read_table(io.BytesIO(response.data))
+    assert table.num_rows == 2
+    assert table.schema.field("longitude").type == pa.float64()
+
+
+def test_unknown_format_is_rejected(client):
+    assert client.get('/api/v1/export/observations?format=csv').status_code == 400
+
+
+def test_index_values_are_fetched_for_matching_rows_only(client, monkeypatch):
+    wanted, other = f"RANGE-{uuid.uuid4().hex[:8]}", f"OTHER-{uuid.uuid4().hex[:8]}"
+    for day in range(1, 5):
+        for satellite, ndvi in ((wanted, day / 10), (other, -day / 10)):
+            client.post('/api/observations', json={
+                "satellite_id": satellite, "timestamp": f"2030-12-0{day}T06:00:00", "spectral_indices": {"ndvi": ndvi},
+            })
+    monkeypatch.setattr(export, "EXPORT_BATCH_ROWS", 2)
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "FROM observation_indices" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        # The body is produced as it is read
+        data = client.get(f'/api/v1/export/observations?format=arrow&satellite_id={wanted}').data
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    table = pa.ipc.open_stream(io.BytesIO(data)).read_all()
+    assert table.column("ndvi").to_pylist() == [0.1, 0.2, 0.3, 0.4]
+
+    # One bounded query per batch, reading only the interleaved rows the filter matches
+    assert len(statements) == 2
+    with engine.connect() as conn:
+        fetched = [conn.exec_driver_sql(statement, parameters).all() for statement, parameters in statements]
+    assert [len(rows) for rows in fetched] == [2, 2]
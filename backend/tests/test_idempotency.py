@@ -0,0 +1,73 @@
+"""
+Idempotency-Key handling on observation creation.
+"""
+import os
+import threading
+import time
+import uuid
+import pytest
+from run import get_app
+from app.idempotency import IdempotencyStore
+
+
+@pytest.fixture
+def client():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_retry_replays_original_response(client):
+    satellite = f"IDEM-{uuid.uuid4().hex[:8]}"
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    first = client.post('/api/observations', json={"satellite_id": satellite}, headers=headers)
+    retry = client.post('/api/observations', json={"satellite_id": satellite}, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.get_json() == first.get_json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert len(client.get(f'/api/observations/filter?satellite_id={satellite}').get_json()) == 1
+
+
+def test_key_reuse_with_different_body_is_rejected(client):
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    client.post('/api/observations', json={"satellite_id": "A"}, headers=headers)
+    assert client.post('/api/observations', json={"satellite_id": "B"}, headers=headers).status_code == 422
+
+
+def test_concurrent_duplicate_waits_for_first_request():
+    store = IdempotencyStore()
+    entry, is_new = store.begin("k", "body")
+    assert is_new
+    duplicate, duplicate_is_new = store.begin("k", "body")
+    assert duplicate is entry and not duplicate_is_new
+
+    threading.Timer(0.1, store.complete, args=(entry, 201, b'{"id": 1}', "application/json")).start()
+    started = time.monotonic()
+    assert duplicate.done.wait(5)
+    assert duplicate.status == 201 and time.monotonic() - started < 5
+
+
+def test_store_is_bounded_and_expires():
+    store = IdempotencyStore(max_entries=2, ttl_seconds=60)
+    for key in ("a", "b", "c"):
+        entry, _ = store.begin(key, "x")
+        store.complete(entry, 201, b"", "application/json")
+    assert len(store) == 2
+
+    expiring = IdempotencyStore(ttl_seconds=0)
+    expiring.begin("a", "x")
+    _, is_new = expiring.begin("a", "x")
+    assert is_new
+
+
+def test_running_oldest_entry_does_not_stop_eviction():
+    store = IdempotencyStore(max_entries=2, ttl_seconds=60)
+    running, _ = store.begin("running", "x")
+    for i in range(10):
+        entry, _ = store.begin(f"done-{i}", "x")
+        store.complete(entry, 201, b"", "application/json")
+    assert len(store) == 2
+    assert store.begin("running", "x") == (running, False)
@@ -0,0 +1,55 @@
+"""
+Precompiled OpenAPI spec: stays in sync with the registered routes and is
+served with caching headers.
+"""
+import json
+import os
+import re
+import pytest
+from run import get_app
+
+
+@pytest.fixture
+def app():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    return app
+
+
+def _documented_paths(app):
+    """Paths of every route whose docstring carries a Swagger block."""
+    paths = set()
+    for rule in app.url_map.iter_rules():
+        view = app.view_functions[rule.endpoint]
+        if view.__doc__ and '---' in view.__doc__:
+            paths.add(re.sub(r'<(?:[^:<>]+:)?([^<>]+)>', r'{\1}', rule.rule))
+    return paths
+
+
+def test_spec_covers_registered_routes(app):
+    spec = json.loads(app.test_client().get('/apispec_1.json').data)
+    documented = _documented_paths(app)
+    assert documented, "expected at least one documented route"
+    assert documented <= set(spec['paths'])
+    assert set(spec['paths']) <= {
+        re.sub(r'<(?:[^:<>]+:)?([^<>]+)>', r'{\1}', r.rule) for r in app.url_map.iter_rules()
+    }
+
+
+def test_spec_file_matches_served_spec(app):
+    response = app.test_client().get('/apispec_1.json')
+    with open(app.config['OPENAPI_SPEC_PATH'], 'rb') as f:
+        assert f.read() == response.data
+
+
+def test_spec_is_cacheable(app):
+    client = app.test_client()
+    response = client.get('/apispec_1.json')
+    assert response.status_code == 200
+    assert response.cache_control.max_age > 0
+    etag = response.headers['ETag']
+
+    cached = client.get('/apispec_1.json', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
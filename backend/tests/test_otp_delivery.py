@@ -0,0 +1,65 @@
+"""
+OTP delivery sinks and the background dispatcher.
+"""
+import os
+import threading
+import time
+import pytest
+from werkzeug.security import generate_password_hash
+from run import get_app
+from app.db import SessionLocal
+from app.routes.observation import User
+import app.otp_delivery as otp_delivery
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    sink = otp_delivery.MemorySink()
+    monkeypatch.setattr(otp_delivery.dispatcher, "sink", sink)
+    return sink
+
+
+def test_login_code_reaches_the_outbox(outbox):
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    email = "outbox_user@test.com"
+    db = SessionLocal()
+    db.query(User).filter(User.email == email).delete()
+    db.add(User(email=email, password=generate_password_hash("pw"), first_name="O", last_name="B", is_verified=1))
+    db.commit()
+    db.close()
+
+    client = app.test_client()
+    assert client.post('/login', json={"email": email, "password": "pw"}).status_code == 200
+    message = client.get(f'/dev/otp-outbox?email={email}').get_json()
+    assert message["subject"] == "Login Access Code"
+    assert client.post('/verify-login-otp', json={"email": email, "otp": message["code"]}).status_code == 200
+
+
+def test_outbox_is_hidden_outside_testing_and_debug(outbox):
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    assert not app.testing and not app.debug
+    otp_delivery.dispatcher.deliver("someone@test.com", "Login Access Code", "123456")
+    response = app.test_client().get('/dev/otp-outbox?email=someone@test.com')
+    assert response.status_code == 404
+    assert response.get_json() == {"msg": "Not found"}
+
+
+def test_slow_sink_does_not_block_delivery():
+    release = threading.Event()
+
+    class SlowSink(otp_delivery.MemorySink):
+        def send(self, message):
+            release.wait(5)
+            super().send(message)
+
+    dispatcher = otp_delivery.Dispatcher(SlowSink())
+    started = time.monotonic()
+    assert dispatcher.deliver("slow@test.com", "Code", "123456")
+    assert time.monotonic() - started < 0.5
+
+    release.set()
+    assert dispatcher.flush(timeout=5)
+    assert dispatcher.sink.latest("slow@test.com").code == "123456"
@@ -0,0 +1,73 @@
+"""
+Expiring OTP store: expiry, attempt limits and single use.
+"""
+import os
+import subprocess
+import sys
+import time
+import pytest
+from werkzeug.security import generate_password_hash
+from run import get_app
+from app.db import SessionLocal
+from app.routes.observation import User
+import app.otp_store as otp_store
+import app.otp_delivery as otp_delivery
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return otp_store.MemoryOTPStore(ttl_seconds=60, max_attempts=3)
+    return otp_store.SQLiteOTPStore(f"sqlite:///{tmp_path / 'otp.db'}", ttl_seconds=60, max_attempts=3)
+
+
+def test_code_is_single_use(store):
+    store.issue("a@test.com", "login", "111111")
+    assert store.verify("a@test.com", "signup", "111111") == otp_store.MISSING
+    assert store.verify("a@test.com", "login", "111111") == otp_store.OK
+    assert store.verify("a@test.com", "login", "111111") == otp_store.MISSING
+
+
+def test_wrong_guesses_lock_the_code(store):
+    store.issue("b@test.com", "login", "222222")
+    assert [store.verify("b@test.com", "login", "000000") for _ in range(3)] == [otp_store.INVALID] * 3
+    assert store.verify("b@test.com", "login", "222222") == otp_store.LOCKED
+    assert store.verify("b@test.com", "login", "222222") == otp_store.MISSING
+
+
+def test_expired_codes_are_rejected(store):
+    store.ttl_seconds = 0.01
+    store.issue("c@test.com", "login", "333333")
+    time.sleep(0.02)
+    assert store.verify("c@test.com", "login", "333333") == otp_store.EXPIRED
+
+
+def test_login_otp_attempts_are_limited(monkeypatch):
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    email = "otp_store_user@test.com"
+    db = SessionLocal()
+    db.query(User).filter(User.email == email).delete()
+    db.add(User(email=email, password=generate_password_hash("pw"), first_name="O", last_name="T", is_verified=1))
+    db.commit()
+    db.close()
+
+    monkeypatch.setattr(otp_store, "store", otp_store.MemoryOTPStore(max_attempts=1))
+    client = app.test_client()
+    assert client.post('/login', json={"email": email, "password": "pw"}).status_code == 200
+    otp_delivery.dispatcher.flush(timeout=5)
+    code = otp_delivery.dispatcher.sink.latest(email).code
+    wrong = "000000" if code != "000000" else "111111"
+    assert client.post('/verify-login-otp', json={"email": email, "otp": wrong}).status_code == 400
+    assert client.post('/verify-login-otp', json={"email": email, "otp": code}).status_code == 429
+
+
+def test_import_creates_no_database_file(tmp_path):
+    # Run from an unrelated directory: the default store lives next to run.py and only on first use
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=backend)
+    env.pop("OTP_DATABASE_URL", None)
+    script = "import app.otp_store as s; print(s.DEFAULT_DATABASE_URL)"
+    output = subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == f"sqlite:///{os.path.join(backend, 'otp.db')}"
+    assert list(tmp_path.iterdir()) == []
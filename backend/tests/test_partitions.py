@@ -0,0 +1,128 @@
+"""
+Opt-in monthly partitioning of observations.
+"""
+import os
+import uuid
+import pytest
+from sqlalchemy import func
+from flask_jwt_extended import create_access_token
+from run import get_app
+from app.db import SessionLocal
+import app.partitions as partitions
+from app.changes import ObservationChange
+
+
+@pytest.fixture
+def client(monkeypatch):
+    os.environ['FLASK_TESTING'] = 'True'
+    monkeypatch.setenv('OBSERVATION_PARTITIONING', 'monthly')
+    app = get_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        with app.app_context():
+            client.token = create_access_token(identity="partition_user")
+        yield client
+
+    db = SessionLocal()
+    partitions.drop_before(db, "9999-12-01")
+    db.commit()
+    db.close()
+
+
+def _create(client, timestamp, satellite_id="PART-SAT"):
+    response = client.post('/api/observations', json={
+        "timestamp": timestamp, "satellite_id": satellite_id, "notes": "partitioned"
+    })
+    assert response.status_code == 201
+    return response.get_json()["id"]
+
+
+def test_ids_route_to_monthly_partition(client):
+    obs_id = _create(client, "2031-03-15T10:00:00Z")
+    assert partitions.partition_for_id(obs_id) == 203103
+
+    headers = {'Authorization': f'Bearer {client.token}'}
+    response = client.get(f'/api/observations/{obs_id}', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["satellite_id"] == "PART-SAT"
+
+    assert client.put(f'/api/observations/{obs_id}', json={"notes": "changed"}).status_code == 200
+    assert client.put(f'/api/observations/{obs_id}', json={"timestamp": "2031-04-01T00:00:00"}).status_code == 409
+    assert client.delete(f'/api/observations/{obs_id}').status_code == 200
+    assert client.get(f'/api/observations/{obs_id}', headers=headers).status_code == 404
+
+
+def test_date_range_only_touches_overlapping_partitions(client):
+    _create(client, "2031-01-10T00:00:00Z")
+    march_id = _create(client, "2031-03-10T00:00:00Z")
+
+    db = SessionLocal()
+    touched = [t.name for t in partitions.tables_for_range(db, "2031-03-01", "2031-03-31")]
+    db.close()
+    assert touched == ["observations_p203103"]
+
+    response = client.get('/api/observations/filter?satellite_id=PART-SAT&start_date=2031-03-01&end_date=2031-03-31')
+    assert [o["id"] for o in response.get_json()] == [march_id]
+
+
+def test_expiry_drops_whole_partitions(client):
+    _create(client, "2031-01-10T00:00:00Z")
+    _create(client, "2031-02-10T00:00:00Z")
+
+    db = SessionLocal()
+    dropped = partitions.drop_before(db, "2031-02-01")
+    db.commit()
+    remaining = partitions.existing_partitions(db)
+    db.close()
+
+    assert dropped == ["observations_p203101"]
+    assert 203101 not in remaining and 203102 in remaining
+
+
+def test_partitioned_ids_keep_their_spectral_indices(client):
+    # Ids past 2**31 and index rows without a foreign key to `observations`
+    response = client.post('/api/observations', json={
+        "timestamp": "2031-05-02T00:00:00Z", "satellite_id": "PART-SAT", "spectral_indices": {"ndvi": 0.4}
+    })
+    obs_id = response.get_json()["id"]
+    assert obs_id > 2**31
+
+    headers = {'Authorization': f'Bearer {client.token}'}
+    assert client.get(f'/api/observations/{obs_id}', headers=headers).get_json()["indices"] == {"ndvi": 0.4}
+
+
+def test_partition_tables_feed_rollups_and_changes(client):
+    satellite = f"PART-{uuid.uuid4().hex[:8]}"
+    db = SessionLocal()
+    since = db.query(func.max(ObservationChange.seq)).scalar() or 0
+    db.close()
+
+    obs_id = _create(client, "2031-06-05T23:30:00Z", satellite_id=satellite)
+    rollups = client.get(f'/api/observations/rollups?satellite_id={satellite}').get_json()
+    assert [(r["day"], r["count"]) for r in rollups] == [("2031-06-05", 1)]
+    changes = client.get(f'/api/observations/changes?since={since}').get_json()["changes"]
+    assert (obs_id, "insert") in [(c["observation_id"], c["op"]) for c in changes]
+
+    db = SessionLocal()
+    partitions.drop_before(db, "2031-07-01")
+    db.commit()
+    db.close()
+    assert client.get(f'/api/observations/rollups?satellite_id={satellite}').get_json() == []
+
+
+def test_recreated_month_does_not_inherit_expired_indices(client):
+    satellite = f"PART-{uuid.uuid4().hex[:8]}"
+    client.post('/api/observations', json={
+        "timestamp": "2031-01-10T00:00:00Z", "satellite_id": satellite, "spectral_indices": {"ndvi": 0.9}
+    })
+
+    db = SessionLocal()
+    partitions.drop_before(db, "2031-02-01")
+    db.commit()
+    db.close()
+
+    late = _create(client, "2031-01-11T00:00:00Z", satellite_id=satellite)
+    assert partitions.partition_for_id(late) == 203101
+    headers = {'Authorization': f'Bearer {client.token}'}
+    assert client.get(f'/api/observations/{late}', headers=headers).get_json()["indices"] == {}
+    assert client.get(f'/api/observations/filter?satellite_id={satellite}&ndvi_min=0.5').get_json() == []
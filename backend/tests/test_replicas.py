@@ -0,0 +1,96 @@
+"""
+Read replica routing: round-robin over healthy replicas and read-your-writes.
+
+The replica is a second SQLite file refreshed from run.db with the SQLite
+backup API, so it lags the primary until sync() is called.
+"""
+import os
+import uuid
+import pytest
+from run import get_app
+import app.db as db
+
+pytestmark = pytest.mark.sqlite_only
+
+WRITER = {"REMOTE_ADDR": "10.0.0.1"}
+READER = {"REMOTE_ADDR": "10.0.0.2"}
+
+
+@pytest.fixture
+def app():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def replica(tmp_path):
+    engine = db.make_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+
+    def sync():
+        source = db.engine.raw_connection()
+        target = engine.raw_connection()
+        try:
+            source.driver_connection.backup(target.driver_connection)
+        finally:
+            source.close()
+            target.close()
+
+    sync()
+    db.replicas.configure([engine])
+    db.sticky.clear()
+    yield sync
+    db.replicas.configure([])
+    db.sticky.clear()
+    engine.dispose()
+
+
+def _satellite_rows(client, satellite, environ):
+    return client.get(f'/api/observations/filter?satellite_id={satellite}', environ_base=environ).get_json()
+
+
+def test_reads_go_to_replica_and_writers_read_their_writes(app, replica):
+    client = app.test_client()
+    satellite = f"REPL-{uuid.uuid4().hex[:8]}"
+    assert client.post('/api/observations', json={"satellite_id": satellite}, environ_base=WRITER).status_code == 201
+
+    # The writer is pinned to the primary; other clients read the lagging replica
+    assert len(_satellite_rows(client, satellite, WRITER)) == 1
+    assert _satellite_rows(client, satellite, READER) == []
+
+    replica()
+    assert len(_satellite_rows(client, satellite, READER)) == 1
+
+
+def test_unhealthy_replica_falls_back_to_primary(app, replica, tmp_path):
+    broken = db.make_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    db.replicas.configure([broken])
+    satellite = f"REPL-{uuid.uuid4().hex[:8]}"
+    client = app.test_client()
+    client.post('/api/observations', json={"satellite_id": satellite}, environ_base=WRITER)
+
+    assert db.replicas.choose() is None
+    assert len(_satellite_rows(client, satellite, READER)) == 1
+    broken.dispose()
+
+
+def test_round_robin_skips_replicas_marked_down(tmp_path):
+    first = db.make_engine(f"sqlite:///{tmp_path / 'a.db'}")
+    second = db.make_engine(f"sqlite:///{tmp_path / 'b.db'}")
+    pool = db.ReplicaPool([first, second])
+    assert [pool.choose(), pool.choose(), pool.choose()] == [first, second, first]
+
+    pool.mark_down(second)
+    assert [pool.choose(), pool.choose()] == [first, first]
+    first.dispose()
+    second.dispose()
+
+
+def test_writes_in_a_read_only_session_use_the_primary(replica):
+    session = db.SessionLocal(info={"read_only": True})
+    try:
+        assert session.get_bind() is db.replicas.engines[0]
+        assert session.get_bind(clause=db.Base.metadata.tables["products"].update()) is db.engine
+    finally:
+        session.close()
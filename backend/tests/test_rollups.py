@@ -0,0 +1,86 @@
+"""
+Daily rollups maintained on write.
+"""
+import os
+import uuid
+import pytest
+from sqlalchemy import text
+from run import get_app
+from rebuild_rollups import rebuild_rollups
+from app.db import engine, SessionLocal
+import app.partitions as partitions
+import app.rollups as rollups
+
+
+@pytest.fixture
+def client():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def _counts(client, satellite):
+    rows = client.get(f'/api/observations/rollups?satellite_id={satellite}').get_json()
+    return {(r["product_id"], r["day"]): r["count"] for r in rows}
+
+
+def test_rollups_follow_create_update_delete(client):
+    satellite = f"ROLL-{uuid.uuid4().hex[:8]}"
+    first = client.post('/api/observations', json={
+        "satellite_id": satellite, "product_id": 1, "timestamp": "2030-06-01T10:00:00"
+    }).get_json()["id"]
+    client.post('/api/observations', json={
+        "satellite_id": satellite, "product_id": 1, "timestamp": "2030-06-01T12:00:00"
+    })
+    assert _counts(client, satellite) == {(1, "2030-06-01"): 2}
+
+    client.put(f'/api/observations/{first}', json={"product_id": 2})
+    assert _counts(client, satellite) == {(1, "2030-06-01"): 1, (2, "2030-06-01"): 1}
+
+    client.delete(f'/api/observations/{first}')
+    assert _counts(client, satellite) == {(1, "2030-06-01"): 1}
+
+
+def test_put_timestamp_with_offset_lands_on_its_utc_day(client):
+    satellite = f"ROLL-{uuid.uuid4().hex[:8]}"
+    client.post('/api/observations', json={"satellite_id": satellite, "timestamp": "2030-01-01T23:00:00-05:00"})
+    obs_id = client.post('/api/observations', json={
+        "satellite_id": satellite, "timestamp": "2030-01-01T12:00:00"
+    }).get_json()["id"]
+    assert client.put(f'/api/observations/{obs_id}', json={"timestamp": "2030-01-01T23:00:00-05:00"}).status_code == 200
+    assert _counts(client, satellite) == {(None, "2030-01-02"): 2}
+
+    assert client.put(f'/api/observations/{obs_id}', json={"timestamp": 12}).status_code == 400
+
+
+def test_rebuild_matches_incremental_counts(client):
+    satellite = f"ROLL-{uuid.uuid4().hex[:8]}"
+    for day in ("2030-07-01", "2030-07-01", "2030-07-02"):
+        client.post('/api/observations', json={"satellite_id": satellite, "timestamp": f"{day}T00:00:00"})
+    before = _counts(client, satellite)
+
+    with engine.begin() as conn:
+        rollups.rebuild(conn)
+
+    assert _counts(client, satellite) == before == {(None, "2030-07-01"): 2, (None, "2030-07-02"): 1}
+
+
+def test_rebuild_script_reinstalls_partition_triggers(client, monkeypatch):
+    monkeypatch.setenv('OBSERVATION_PARTITIONING', 'monthly')
+    satellite = f"ROLL-{uuid.uuid4().hex[:8]}"
+    client.post('/api/observations', json={"satellite_id": satellite, "timestamp": "2032-08-01T00:00:00"})
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("DROP TRIGGER observations_p203208_rollup_insert ON observations_p203208"
+                              if conn.dialect.name == "postgresql" else "DROP TRIGGER observations_p203208_rollup_insert"))
+
+        rebuild_rollups()
+        client.post('/api/observations', json={"satellite_id": satellite, "timestamp": "2032-08-02T00:00:00"})
+        assert _counts(client, satellite) == {(None, "2032-08-01"): 1, (None, "2032-08-02"): 1}
+    finally:
+        db = SessionLocal()
+        partitions.drop_before(db, "9999-12-01")
+        db.commit()
+        db.close()
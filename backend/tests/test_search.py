@@ -0,0 +1,68 @@
+"""
+Full-text search over observation notes.
+"""
+import os
+import uuid
+import pytest
+from run import get_app
+from app.db import SessionLocal
+import app.partitions as partitions
+from app.search import match_expression
+
+
+@pytest.fixture
+def client():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_match_expression_quotes_user_input():
+    assert match_expression('thermal "anomaly" fore*') == '"thermal" "anomaly" "fore"*'
+    assert match_expression('  ') == ''
+
+
+@pytest.mark.sqlite_only
+def test_keyword_search_returns_ranked_snippets(client):
+    satellite = f"FTS-{uuid.uuid4().hex[:8]}"
+    word = f"kw{uuid.uuid4().hex[:8]}"
+    strong = client.post('/api/observations', json={
+        "satellite_id": satellite, "notes": f"{word} {word} anomaly near the ridge"
+    }).get_json()["id"]
+    weak = client.post('/api/observations', json={
+        "satellite_id": satellite, "notes": f"Routine pass, minor {word} in a long note about clouds and haze"
+    }).get_json()["id"]
+    client.post('/api/observations', json={"satellite_id": satellite, "notes": "Nothing to report"})
+
+    results = client.get(f'/api/observations/filter?q={word}').get_json()
+    assert [r["id"] for r in results] == [strong, weak]
+    assert f"[{word}]" in results[0]["snippet"]
+
+    # Index follows updates and deletes
+    client.put(f'/api/observations/{weak}', json={"notes": "Edited"})
+    client.delete(f'/api/observations/{strong}')
+    assert client.get(f'/api/observations/filter?q={word}').get_json() == []
+
+
+@pytest.mark.sqlite_only
+def test_keyword_search_covers_partitions(client, monkeypatch):
+    monkeypatch.setenv('OBSERVATION_PARTITIONING', 'monthly')
+    word = f"kw{uuid.uuid4().hex[:8]}"
+    plain = client.post('/api/observations', json={"satellite_id": "FTS-SAT", "notes": word}).get_json()["id"]
+    partitioned = client.post('/api/observations', json={
+        "satellite_id": "FTS-SAT", "timestamp": "2032-06-01T00:00:00Z", "notes": f"{word} {word}"
+    }).get_json()["id"]
+
+    try:
+        results = client.get(f'/api/observations/filter?q={word}').get_json()
+        assert [r["id"] for r in results] == [partitioned, plain]
+        assert f"[{word}]" in results[0]["snippet"]
+        ranged = client.get(f'/api/observations/filter?q={word}&start_date=2032-06-01').get_json()
+        assert [r["id"] for r in ranged] == [partitioned]
+    finally:
+        db = SessionLocal()
+        partitions.drop_before(db, "9999-12-01")
+        db.commit()
+        db.close()
@@ -0,0 +1,49 @@
+"""
+MessagePack content negotiation on observation endpoints.
+"""
+import os
+import uuid
+from datetime import datetime, timezone
+import msgpack
+import pytest
+from run import get_app
+
+MSGPACK = "application/msgpack"
+
+
+@pytest.fixture
+def client():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_msgpack_round_trip_with_native_timestamps(client):
+    satellite = f"MSGPACK-{uuid.uuid4().hex[:8]}"
+    observed = datetime(2030, 10, 1, 12, 30, tzinfo=timezone.utc)
+    body = msgpack.packb({"satellite_id": satellite, "timestamp": msgpack.Timestamp.from_datetime(observed)})
+
+    created = client.post('/api/observations', data=body, content_type=MSGPACK, headers={"Accept": MSGPACK})
+    assert created.status_code == 201
+    assert created.mimetype == MSGPACK
+    obs_id = msgpack.unpackb(created.data)["id"]
+
+    listed = client.get(f'/api/observations/filter?satellite_id={satellite}', headers={"Accept": MSGPACK})
+    records = msgpack.unpackb(listed.data, timestamp=3)
+    assert [r["id"] for r in records] == [obs_id]
+    assert records[0]["timestamp"] == observed
+
+
+def test_json_stays_the_default(client):
+    satellite = f"JSON-{uuid.uuid4().hex[:8]}"
+    client.post('/api/observations', json={"satellite_id": satellite, "timestamp": "2030-10-02T08:00:00"})
+    listed = client.get(f'/api/observations/filter?satellite_id={satellite}', headers={"Accept": "*/*"})
+    assert listed.mimetype == "application/json"
+    assert listed.get_json()[0]["timestamp"] == "2030-10-02T08:00:00"
+
+
+def test_malformed_msgpack_is_rejected(client):
+    response = client.post('/api/observations', data=b"\xc1", content_type=MSGPACK)
+    assert response.status_code == 400
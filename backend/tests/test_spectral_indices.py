@@ -0,0 +1,63 @@
+"""
+Typed spectral index storage and SQL-side index filters.
+"""
+import os
+import uuid
+import pytest
+from run import get_app
+from app.db import SessionLocal
+from app.routes.observation import ObservationIndex, parse_spectral_indices
+
+
+@pytest.fixture
+def client():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_parse_accepts_text_json_and_dicts():
+    assert parse_spectral_indices("NDVI:0.71, NBR=0.2") == {"ndvi": 0.71, "nbr": 0.2}
+    assert parse_spectral_indices('{"ndwi": 0.3, "unknown": 1}') == {"ndwi": 0.3}
+    assert parse_spectral_indices({"EVI": "0.5"}) == {"evi": 0.5}
+    assert parse_spectral_indices("not indices") == {}
+
+
+def test_indices_are_stored_as_typed_rows_and_filterable(client):
+    satellite = f"IDX-{uuid.uuid4().hex[:8]}"
+    high = client.post('/api/observations', json={
+        "satellite_id": satellite, "spectral_indices": "NDVI:0.82, NBR=0.1"
+    }).get_json()["id"]
+    low = client.post('/api/observations', json={
+        "satellite_id": satellite, "spectral_indices": {"ndvi": 0.3}
+    }).get_json()["id"]
+
+    db = SessionLocal()
+    rows = db.query(ObservationIndex).filter(ObservationIndex.observation_id == high).all()
+    db.close()
+    assert {r.band: r.value for r in rows} == {"ndvi": 0.82, "nbr": 0.1}
+
+    results = client.get(f'/api/observations/filter?satellite_id={satellite}&ndvi_min=0.6').get_json()
+    assert [o["id"] for o in results] == [high]
+    assert results[0]["indices"] == {"ndvi": 0.82, "nbr": 0.1}
+
+    # Updating the text rewrites the typed rows
+    client.put(f'/api/observations/{low}', json={"spectral_indices": "ndvi=0.9"})
+    results = client.get(f'/api/observations/filter?satellite_id={satellite}&ndvi_min=0.6').get_json()
+    assert sorted(o["id"] for o in results) == sorted([high, low])
+
+
+def test_update_accepts_indices_and_rejects_unknown_fields(client):
+    obs_id = client.post('/api/observations', json={"satellite_id": "IDX-PUT"}).get_json()["id"]
+
+    assert client.put(f'/api/observations/{obs_id}', json={"indices": {"ndvi": 0.4}}).status_code == 200
+    db = SessionLocal()
+    rows = db.query(ObservationIndex).filter(ObservationIndex.observation_id == obs_id).all()
+    db.close()
+    assert {r.band: r.value for r in rows} == {"ndvi": 0.4}
+
+    response = client.put(f'/api/observations/{obs_id}', json={"colour": "red"})
+    assert response.status_code == 400
+    assert "colour" in response.get_json()["error"]
@@ -0,0 +1,46 @@
+"""
+Statement cache instrumentation and the prepared hot-path queries.
+"""
+import os
+import pytest
+from run import get_app
+from app.db import SessionLocal
+from app.routes.observation import find_user
+import app.entitlements as entitlements
+import app.statement_cache as statement_cache
+
+
+@pytest.fixture
+def app():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    return app
+
+
+def test_repeated_lookups_hit_the_compiled_cache(app):
+    db = SessionLocal()
+    try:
+        find_user(db, "warm@test.com")
+        entitlements.has_subscription(db, "warm@test.com", 1)
+        statement_cache.stats.reset()
+        for i in range(5):
+            find_user(db, f"user{i}@test.com")
+            entitlements.has_subscription(db, f"user{i}@test.com", i)
+    finally:
+        db.close()
+    snapshot = statement_cache.stats.snapshot()
+    assert snapshot["hit"] == 10
+    assert snapshot["miss"] == 0
+    assert snapshot["hit_rate"] == 1.0
+
+
+def test_health_reports_cache_stats(app):
+    statement_cache.stats.reset()
+    assert statement_cache.stats.snapshot()["hit_rate"] is None
+    client = app.test_client()
+    client.get('/api/products')
+    client.get('/api/products')
+    body = client.get('/health/statement-cache').get_json()
+    assert body["hit"] >= 1
+    assert 0 < body["hit_rate"] <= 1
@@ -0,0 +1,63 @@
+"""
+Observation fan-out to SSE subscribers.
+"""
+import os
+import pytest
+from flask_jwt_extended import create_access_token
+from run import get_app
+from app.pubsub import Broker, broker
+from app.routes.stream import dispatcher
+
+
+@pytest.fixture
+def client():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_publish_only_reaches_product_subscribers():
+    local = Broker()
+    wildfire = local.subscribe([2])
+    crops = local.subscribe([1, 3])
+    assert local.publish(2, "fire") == 1
+    assert wildfire.get(timeout=0) == "fire"
+    assert crops.get(timeout=0) is None
+
+
+def test_slow_subscriber_drops_oldest_without_blocking():
+    local = Broker()
+    slow = local.subscribe([1], maxsize=3)
+    for i in range(5):
+        local.publish(1, i)
+    assert slow.dropped == 2
+    assert [slow.get(timeout=0) for _ in range(3)] == [2, 3, 4]
+
+
+def test_new_observation_is_fanned_out(client):
+    subscriber = broker.subscribe([2])
+    try:
+        dispatcher.ensure_started()
+        # Let the dispatcher pick its starting point before inserting
+        for _ in range(50):
+            if dispatcher.last_seq is not None:
+                break
+            subscriber.get(timeout=0.05)
+        obs_id = client.post('/api/observations', json={
+            "satellite_id": "LANDSAT-8", "product_id": 2, "notes": "Thermal anomaly"
+        }).get_json()["id"]
+
+        seq, payload = subscriber.get(timeout=5)
+        assert payload["id"] == obs_id
+        assert seq > 0
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+def test_stream_requires_a_subscription(client):
+    with client.application.app_context():
+        token = create_access_token(identity="none_user")
+    response = client.get('/api/observations/stream', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 403
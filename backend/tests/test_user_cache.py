@@ -0,0 +1,57 @@
+"""
+User profile cache and the stateless token validation mode.
+"""
+import os
+import uuid
+import pytest
+from flask_jwt_extended import create_access_token
+from run import get_app
+from app.db import SessionLocal
+from app.routes.observation import User
+import app.user_cache as user_cache
+
+
+@pytest.fixture
+def app():
+    os.environ['FLASK_TESTING'] = 'True'
+    app = get_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def auth(app):
+    email = f"cache-{uuid.uuid4().hex[:8]}@test.com"
+    db = SessionLocal()
+    db.add(User(email=email, first_name="Ada", last_name="Lovelace", is_verified=1))
+    db.commit()
+    db.close()
+    with app.app_context():
+        token = create_access_token(identity=email)
+    yield email, {"Authorization": f"Bearer {token}"}
+    user_cache.cache.invalidate(email)
+
+
+def test_profile_change_invalidates_cached_user(app, auth):
+    email, headers = auth
+    client = app.test_client()
+    assert client.post('/token/validate', headers=headers).get_json()["user"]["first_name"] == "Ada"
+    hits = user_cache.cache.hits
+    client.post('/token/validate', headers=headers)
+    assert user_cache.cache.hits == hits + 1
+
+    updated = client.put('/api/profile', json={"first_name": "Augusta"}, headers=headers)
+    assert updated.get_json()["user"]["first_name"] == "Augusta"
+    assert client.post('/token/validate', headers=headers).get_json()["user"]["first_name"] == "Augusta"
+
+
+def test_stateless_validation_skips_the_user_lookup(app, auth, monkeypatch):
+    email, headers = auth
+
+    def fail(*args):
+        raise AssertionError("stateless validation must not load the user")
+
+    monkeypatch.setattr(user_cache, "get_profile", fail)
+    response = app.test_client().post('/token/validate?mode=stateless', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["user"] == email
@@ -29,10 +29,15 @@ def test_login_flow():
 
         print("Login successful, OTP required.")
 
-        # 2. Verify OTP
+        # 2. Verify OTP (read from the dev outbox when the server runs with OTP_DELIVERY=memory;
+        # the test user's code is otherwise fixed)
+        otp = "123456"
+        outbox = requests.get(f"{BASE_URL}/dev/otp-outbox", params={"email": "testuser@geoscope.com"})
+        if outbox.status_code == 200:
+            otp = outbox.json()["code"]
         verify_payload = {
             "email": "testuser@geoscope.com",
-            "otp": "123456"
+            "otp": otp
         }
         
         response = requests.post(f"{BASE_URL}/verify-login-otp", json=verify_payload)
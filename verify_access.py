@@ -1,7 +1,6 @@
 import requests
 import json
 import random
-import time
 
 BASE_URL = "http://127.0.0.1:5001"
 
@@ -20,17 +19,15 @@ def test_full_flow():
         print(f"Signup Failed: {res.status_code} {res.text}")
         return
 
-    print("Signup Success. Waiting for OTP file...")
-    time.sleep(1) 
-    
-    # 2. Get OTP
-    try:
-        with open("backend/backend_otp.txt", "r") as f:
-            otp = f.read().strip()
-        print(f"[2] Retrieved OTP: {otp}")
-    except Exception as e:
-        print(f"Failed to read OTP: {e}")
+    print("Signup Success. Fetching OTP from the dev outbox...")
+
+    # 2. Get OTP (the backend must run with OTP_DELIVERY=memory)
+    res = requests.get(f"{BASE_URL}/dev/otp-outbox", params={"email": email})
+    if res.status_code != 200:
+        print(f"Failed to read OTP: {res.status_code} {res.text}")
         return
+    otp = res.json()["code"]
+    print(f"[2] Retrieved OTP: {otp}")
 
     # 3. Verify Email
     print("[3] Verifying Email...")